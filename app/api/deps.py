@@ -2,46 +2,69 @@
 Dependencies for the API endpoints.
 """
 
-from typing import Generator, Optional, Dict, Any
+from typing import Generator, Optional, Dict, Any, Tuple
 
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
-import requests
 
 from app import models, schemas
 from app.api.CurrentUserContext import CurrentUserContext
 from app.config.settings import settings
-from app.db.session import SessionLocal
+from app.db.routing import READ_YOUR_WRITES_COOKIE, user_key_from_authorization
+from app.db.session import SessionLocal, read_your_writes
+from app.db.unit_of_work import unit_of_work
 from app.utils.security import ALGORITHM
 from app.utils.keycloak import keycloak_handler
+from app.utils.token_cache import token_cache
 
 _token_base = settings.KEYCLOAK_SERVER_URL.rstrip("/") if settings.KEYCLOAK_SERVER_URL else "http://localhost"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{_token_base}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/token")
 
 
 
-def get_db() -> Generator:
+def get_db(request: Request) -> Generator:
     """
-    Get database session.
+    Get database session. Reads of GET requests may be served by a replica
+    (see app.db.routing); a committed write is flagged on ``request.state``
+    so the response can pin the user to the primary.
     """
     try:
         db = SessionLocal()
+        user_key = user_key_from_authorization(request.headers.get("authorization"))
+        db.bind_request(
+            method=request.method,
+            sticky=read_your_writes.is_sticky(
+                user_key, request.cookies.get(READ_YOUR_WRITES_COOKIE)
+            ),
+            on_write=lambda: setattr(request.state, "db_wrote", True),
+        )
         yield db
     finally:
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> models.User:
+def request_unit(db: Session = Depends(get_db)) -> Generator:
     """
-    Get the current user from the database using the provided token.
-    Validates the token with Keycloak and retrieves the user information.
+    Request-level unit of work: commits once when the endpoint has returned
+    (or rolls back if it raised). Installed on the API router with
+    ``scope="function"`` so the commit happens before the response is sent.
+    """
+    with unit_of_work(db):
+        yield db
+
+
+def _authenticate(db: Session, token: str) -> Tuple[models.User, Dict[str, Any]]:
+    """
+    Resolve the active user and the claims of a token. Successful lookups
+    are cached per token (see app.utils.token_cache).
     Raises HTTPException if the token is invalid or user is not found.
     """
+    cached = token_cache.get(db, token)
+    if cached is not None:
+        return cached
     try:
         # Validamos el token con Keycloak
         user_info = keycloak_handler.validate_token(token)
@@ -82,6 +105,19 @@ def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Could not validate credentials: {str(e)}",
         )
+    token_cache.put(token, user_info, user)
+    return user, user_info
+
+
+def get_current_user(
+    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+) -> models.User:
+    """
+    Get the current user from the database using the provided token.
+    Validates the token with Keycloak and retrieves the user information.
+    Raises HTTPException if the token is invalid or user is not found.
+    """
+    user, _ = _authenticate(db, token)
     return user
 
 
@@ -93,46 +129,7 @@ def get_current_user_with_token(
     Validates the token with Keycloak and retrieves the user information.
     Raises HTTPException if the token is invalid or user is not found.
     """
-    try:
-        # Validamos el token con Keycloak
-        user_info = keycloak_handler.validate_token(token)
-        if not user_info:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Invalid authentication credentials",
-            )
-        
-        # Obtenemos el ID de Keycloak del usuario
-        keycloak_id = user_info.get("sub")
-        if not keycloak_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Could not extract user ID from token",
-            )
-        
-        # Buscamos el usuario en nuestra base de datos usando el ID de Keycloak
-        user = db.query(models.User).filter(models.User.keycloak_id == keycloak_id).first()
-        if not user:
-            # Podríamos crear automáticamente el usuario si no existe,
-            # pero vamos a requerir registro manual por ahora
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, 
-                detail="User not found in system"
-            )
-        
-        if not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, 
-                detail="Inactive user"
-            )
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"Could not validate credentials: {str(e)}",
-        )
+    user, user_info = _authenticate(db, token)
     return CurrentUserContext(
             user=user,
             access_token=token,
@@ -4,11 +4,11 @@ Endpoints for analysis operations
 
 from typing import List, Any
 
-from alembic.util import status
 from app.api.CurrentUserContext import CurrentUserContext
 from app.services.vantage_6 import Vantage6Service
-from app.utils.constants import TOKEN_V6
-from fastapi import APIRouter, Depends, HTTPException
+from app.utils.v6_token import get_v6_token, get_v6_token_async
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 import logging
 
@@ -19,16 +19,27 @@ from app.schemas.algorithms import Algorithm as AlgorithmSchema
 from app.schemas.algorithms import AlgorithmUpdate
 from app.schemas.CohortListRequest import CohortListRequest
 from app import schemas
+from app.utils.etag import tagged_json
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 service_vantage6 = Vantage6Service()
 
+_algorithm_list = TypeAdapter(List[AlgorithmSchema])
+
+
+def _algorithm_list_response(request: Request, algorithms) -> Any:
+    body = _algorithm_list.dump_json(
+        _algorithm_list.validate_python(algorithms, from_attributes=True)
+    )
+    return tagged_json(request, body)
+
 
 @router.get("/", response_model=List[schemas.algorithms.Algorithm])
 def get_all_algorithms(
     *,
     db: Session = Depends(get_db),
+    request: Request,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
@@ -36,7 +47,7 @@ def get_all_algorithms(
     """
     try:
         algorithms = algorithm_service.get_all_algorithm(db=db)
-        return algorithms
+        return _algorithm_list_response(request, algorithms)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -51,6 +62,7 @@ def get_by_cohort(
     *,
     db: Session = Depends(get_db),
     cohort_id: int,
+    request: Request,
     current_user: User = Depends(get_current_user),
 ) -> any:
     """
@@ -61,7 +73,7 @@ def get_by_cohort(
         algorithms = algorithm_service.get_algorithms_by_cohort(
             db=db, cohort_id=cohort_id
         )
-        return algorithms
+        return _algorithm_list_response(request, algorithms)
 
     except Exception as e:
 
@@ -82,7 +94,7 @@ async def get_algorithms_by_cohorts(
     try:
 
         algorithms = await algorithm_service.get_algorithms_with_status_async(
-            db, request.cohort_ids, TOKEN_V6
+            db, request.cohort_ids, await get_v6_token_async()
         )
 
         return algorithms
@@ -142,7 +154,7 @@ def get_algorithm_statistics(
 ) -> Any:
     try:
         algorithms = algorithm_service.get_algorithm_statistics(
-            access_token=TOKEN_V6, task_id=task_id
+            access_token=get_v6_token(), task_id=task_id
         )
         return algorithms
     except Exception as e:
@@ -167,7 +179,7 @@ def get_task_status_with_timeout(
         access_token = current_user.access_token
 
         result = service_vantage6.get_task_status_with_timeout(
-            db=db, access_token=TOKEN_V6, task_id=task_id
+            db=db, access_token=get_v6_token(), task_id=task_id
         )
         logger.info("Status task for task_id=%s: %s", task_id, result)
         if not result:
@@ -4,18 +4,32 @@ Endpoints for analysis operations
 
 from typing import Any, List, Dict
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
 from sqlalchemy.orm import Session
 
 from app import schemas
 from app.api.deps import get_current_user, get_db, get_current_user_with_token
 from app.models.user import User
+from app.models.analysis import Analysis
 from app.services.analysis import analysis_service
 from app.api import CurrentUserContext
-from app.utils.constants import TOKEN_V6
+from app.utils.v6_token import get_v6_token
+from app.utils.responses import serialize_rows
+from app.utils.etag import check_row_version
 
 router = APIRouter()
 
+ANALYSIS_FIELDS = [
+    "id",
+    "analysis_name",
+    "analysis_description",
+    "user_id",
+    "workspace_id",
+    "expiring_date",
+    "creation_date",
+    "update_date",
+]
+
 
 @router.post("/", response_model=schemas.Analysis, status_code=status.HTTP_201_CREATED)
 def create_analysis(
@@ -55,7 +69,7 @@ def create_analysis(
         access_token = current_user.access_token
 
         analysis = analysis_service.create_with_history_v2(
-            db=db, obj_in=analysis_in, user_id=user.id, access_token=TOKEN_V6
+            db=db, obj_in=analysis_in, user_id=user.id, access_token=get_v6_token()
         )
         return analysis
     except ValueError as e:
@@ -75,26 +89,7 @@ def get_analyses(
     """
     analyses = analysis_service.get_multi(db=db, skip=skip, limit=limit)
 
-    # Return a safely-serialized list to avoid strict Pydantic validation issues
-    # when tests provide minimal fake objects (no DB/ORM instance).
-    def serialize(a: Any) -> Dict[str, Any]:
-        fields = [
-            "id",
-            "analysis_name",
-            "analysis_description",
-            "user_id",
-            "workspace_id",
-            "expiring_date",
-            "creation_date",
-            "update_date",
-        ]
-        return {
-            k: getattr(a, k)
-            for k in fields
-            if hasattr(a, k) and getattr(a, k) is not None
-        }
-
-    return [serialize(a) for a in analyses]
+    return serialize_rows(analyses, ANALYSIS_FIELDS)
 
 
 @router.get("/{analysis_id}", response_model=schemas.analysis.Analysis)
@@ -102,11 +97,17 @@ def get_analysis(
     *,
     db: Session = Depends(get_db),
     analysis_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Obtains an analysis by ID.
+    Answers 304 when If-None-Match matches the analysis' current version.
     """
+    cached = check_row_version(request, response, db, Analysis, analysis_id)
+    if cached is not None:
+        return cached
     analysis = analysis_service.get(db=db, id=analysis_id)
     if not analysis:
         raise HTTPException(
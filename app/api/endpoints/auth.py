@@ -6,6 +6,7 @@ import logging
 from typing import Any, Dict
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
@@ -15,6 +16,7 @@ from app.api.deps import get_current_user, get_db
 from app.models.user import User
 from app.models.organization import Organization
 from app.models.user_type import UserType
+from app.utils.keycloak import keycloak_handler
 from app.utils.metrics_logger import log_event
 
 logger = logging.getLogger(__name__)
@@ -25,8 +27,103 @@ router = APIRouter()
 auth_service = AuthService()
 
 
+def _sync_user(db: Session, username: str, user_info: Dict[str, Any]) -> None:
+    """
+    Create the user on first login, or update it with the latest Keycloak
+    information. Runs in the threadpool, as it uses the sync DB session.
+    """
+    keycloak_id = user_info.get("sub")
+    user = db.query(User).filter(User.keycloak_id == keycloak_id).first()
+    org_name = user_info.get("coe_name")
+    org_id = None
+    if org_name:
+        org = (
+            db.query(Organization).filter(Organization.org_name == org_name).first()
+        )
+        if org:
+            org_id = org.id
+
+    if not user:
+        # Get default user type for new users
+        default_user_type_id = None
+
+        # First try to find "Usuario estándar"
+        default_user_type = (
+            db.query(UserType)
+            .filter(UserType.description == "Usuario estándar")
+            .first()
+        )
+        if default_user_type:
+            default_user_type_id = default_user_type.id
+        else:
+            # If not found, try to get any available user type
+            any_user_type = db.query(UserType).first()
+            if any_user_type:
+                default_user_type_id = any_user_type.id
+            else:
+                logger.warning(
+                    "No user types found in database, creating user without user_type_id"
+                )
+        user = User(
+            keycloak_id=keycloak_id,
+            username=username,
+            email=user_info.get("email", ""),
+            first_name=user_info.get("given_name", ""),
+            last_name=user_info.get("family_name", ""),
+            user_type_id=default_user_type_id,
+            organization_id=org_id,
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        log_event("auth", "login", user_id=str(user.id), center=org_name)
+    else:
+        # User exists, check if any information needs to be updated
+        needs_update = False
+        # Check for changes in user information
+        new_email = user_info.get("email", "")
+        new_first_name = user_info.get("given_name", "")
+        new_last_name = user_info.get("family_name", "")
+        if user.email != new_email:
+            user.email = new_email
+            needs_update = True
+        if user.first_name != new_first_name:
+            user.first_name = new_first_name
+            needs_update = True
+        if user.last_name != new_last_name:
+            user.last_name = new_last_name
+            needs_update = True
+        # Update username if it has changed
+        if user.username != username:
+            user.username = username
+            needs_update = True
+        # If user doesn't have a user_type_id, assign the default one
+        if user.user_type_id is None:
+            default_user_type = (
+                db.query(UserType)
+                .filter(UserType.description == "Usuario estándar")
+                .first()
+            )
+            if not default_user_type:
+                user.user_type_id = 4  # Fallback to ID 4
+            else:
+                user.user_type_id = default_user_type.id
+            needs_update = True
+
+        if user.organization_id != org_id:
+            user.organization_id = org_id
+            needs_update = True
+
+        # Save changes if any updates were made
+        if needs_update:
+            db.commit()
+            db.refresh(user)
+
+        log_event("auth", "login", user_id=str(user.id), center=org_name)
+
+
 @router.post("/login", response_model=Dict[str, Any])
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ) -> Any:
     """
@@ -50,19 +147,17 @@ def login(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username and password cannot be empty",
             )
-        result = auth_service.authenticate(form_data.username, form_data.password)
+        result = await auth_service.authenticate(form_data.username, form_data.password)
         # Get user information from Keycloak using the access token
-        from app.utils.keycloak import keycloak_handler
-
         access_token = result.get("access_token")
-        user_info = keycloak_handler.validate_token(access_token)
+        # May fetch the realm's JWKS on a key-cache miss (blocking).
+        user_info = await run_in_threadpool(keycloak_handler.validate_token, access_token)
         if not user_info:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="No se pudo obtener la información del usuario de Keycloak",
             )
 
-        # If the user is not found in the database, create a new user
         keycloak_id = user_info.get("sub")
         if not keycloak_id:
             raise HTTPException(
@@ -70,95 +165,9 @@ def login(
                 detail="ID de usuario de Keycloak no encontrado",
             )
 
-        user = db.query(User).filter(User.keycloak_id == keycloak_id).first()
-        org_name = user_info.get("coe_name")
-        org_id = None
-        if org_name:
-            org = (
-                db.query(Organization).filter(Organization.org_name == org_name).first()
-            )
-            if org:
-                org_id = org.id
-
-        if not user:
-            # Get default user type for new users
-            default_user_type_id = None
-
-            # First try to find "Usuario estándar"
-            default_user_type = (
-                db.query(UserType)
-                .filter(UserType.description == "Usuario estándar")
-                .first()
-            )
-            if default_user_type:
-                default_user_type_id = default_user_type.id
-            else:
-                # If not found, try to get any available user type
-                any_user_type = db.query(UserType).first()
-                if any_user_type:
-                    default_user_type_id = any_user_type.id
-                else:
-                    logger.warning(
-                        "No user types found in database, creating user without user_type_id"
-                    )
-            user = User(
-                keycloak_id=keycloak_id,
-                username=form_data.username,
-                email=user_info.get("email", ""),
-                first_name=user_info.get("given_name", ""),
-                last_name=user_info.get("family_name", ""),
-                user_type_id=default_user_type_id,
-                organization_id=org_id,
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-            log_event("auth", "login", user_id=str(user.id), center=org_name)
-            result["keycloak_id"] = keycloak_id
-        else:
-            # User exists, check if any information needs to be updated
-            needs_update = False
-            # Check for changes in user information
-            new_email = user_info.get("email", "")
-            new_first_name = user_info.get("given_name", "")
-            new_last_name = user_info.get("family_name", "")
-            if user.email != new_email:
-                user.email = new_email
-                needs_update = True
-            if user.first_name != new_first_name:
-                user.first_name = new_first_name
-                needs_update = True
-            if user.last_name != new_last_name:
-                user.last_name = new_last_name
-                needs_update = True
-            # Update username if it has changed
-            if user.username != form_data.username:
-                user.username = form_data.username
-                needs_update = True
-            # If user doesn't have a user_type_id, assign the default one
-            if user.user_type_id is None:
-                default_user_type = (
-                    db.query(UserType)
-                    .filter(UserType.description == "Usuario estándar")
-                    .first()
-                )
-                if not default_user_type:
-                    user.user_type_id = 4  # Fallback to ID 4
-                else:
-                    user.user_type_id = default_user_type.id
-                needs_update = True
-
-            if user.organization_id != org_id:
-                user.organization_id = org_id
-                needs_update = True
-
-            # Save changes if any updates were made
-            if needs_update:
-                db.commit()
-                db.refresh(user)
-
-            log_event("auth", "login", user_id=str(user.id), center=org_name)
-            result["keycloak_id"] = keycloak_id
+        # If the user is not found in the database, create a new user
+        await run_in_threadpool(_sync_user, db, form_data.username, user_info)
+        result["keycloak_id"] = keycloak_id
 
         return result
     except HTTPException as e:
@@ -171,12 +180,12 @@ def login(
 
 
 @router.post("/refresh-token", response_model=Dict[str, Any])
-def refresh_token(refresh_token: str, db: Session = Depends(get_db)) -> Any:
+async def refresh_token(refresh_token: str) -> Any:
     """
     Updates an access token using the refresh token.
     """
     try:
-        result = auth_service.refresh_token(refresh_token)
+        result = await auth_service.refresh_token(refresh_token)
         return result
     except HTTPException as e:
         raise e
@@ -196,12 +205,12 @@ def get_current_user_info(current_user: User = Depends(get_current_user)) -> Any
 
 
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
-def logout(refresh_token: str, db: Session = Depends(get_db)) -> None:
+async def logout(refresh_token: str) -> None:
     """
     Logs out the user by invalidating the token.
     """
     try:
-        auth_service.logout(refresh_token)
+        await auth_service.logout(refresh_token)
         log_event("auth", "logout")
     except HTTPException as e:
         raise e
@@ -5,7 +5,7 @@ Endpoints for cohort operations
 from typing import Any, List, Dict
 
 from app.services.vantage_6 import Vantage6Service
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 
 from app import db, schemas
@@ -17,8 +17,10 @@ from app.models.cohort import Cohort
 from app.services.cohort import CohortService
 
 router = APIRouter()
-from app.utils.constants import TOKEN_V6
+from app.utils.v6_token import get_v6_token
 from app.utils.metrics_logger import log_event
+from app.utils.responses import serialize_rows
+from app.utils.etag import check_row_version
 
 # Initialize the cohort service
 cohort_service = CohortService(Cohort)
@@ -28,6 +30,20 @@ import logging
 logger = logging.getLogger(__name__)
 service_vantage = Vantage6Service()
 
+COHORT_FIELDS = [
+    "id",
+    "cohort_name",
+    "cohort_description",
+    "cohort_query",
+    "creation_date",
+    "update_date",
+    "status",
+    "user_id",
+    "analysis_id",
+    "workspace_id",
+    "query_execution_id",
+]
+
 
 @router.post("/", response_model=schemas.Cohort, status_code=status.HTTP_201_CREATED)
 def create_cohort(
@@ -69,27 +85,7 @@ def get_cohorts(
     """
     cohorts = cohort_service.get_all_cohorts(db=db, skip=skip, limit=limit)
 
-    def serialize(c: Any) -> Dict[str, Any]:
-        fields = [
-            "id",
-            "cohort_name",
-            "cohort_description",
-            "cohort_query",
-            "creation_date",
-            "update_date",
-            "status",
-            "user_id",
-            "analysis_id",
-            "workspace_id",
-            "query_execution_id",
-        ]
-        return {
-            k: getattr(c, k)
-            for k in fields
-            if hasattr(c, k) and getattr(c, k) is not None
-        }
-
-    return [serialize(c) for c in cohorts]
+    return serialize_rows(cohorts, COHORT_FIELDS)
 
 
 @router.get("/{cohort_id}", response_model=schemas.cohort.Cohort)
@@ -97,11 +93,17 @@ def get_cohort(
     *,
     db: Session = Depends(get_db),
     cohort_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Obtains a cohort by ID.
+    Answers 304 when If-None-Match matches the cohort's current version.
     """
+    cached = check_row_version(request, response, db, Cohort, cohort_id)
+    if cached is not None:
+        return cached
     cohort = cohort_service.get_cohort_by_id(db=db, cohort_id=cohort_id)
     if not cohort:
         raise HTTPException(
@@ -218,7 +220,7 @@ def create_cohort(
         # access_token = current_user.access_token
 
         cohort = cohort_service.create_with_history_v2(
-            db=db, obj_in=cohort_in, user_id=user.id  # , access_token=TOKEN_V6
+            db=db, obj_in=cohort_in, user_id=user.id  # , access_token=get_v6_token()
         )
         log_event(
             "cohort",
@@ -256,7 +258,7 @@ def get_dataframe_status(
                 detail=f"Cohort with ID {cohort_id} not found",
             )
         status_task = service_vantage.get_status_by_task_id(
-            access_token=TOKEN_V6, task_id=cohort.task_id_vantage
+            access_token=get_v6_token(), task_id=cohort.task_id_vantage
         )
 
         if not status_task:
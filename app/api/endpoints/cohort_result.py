@@ -2,7 +2,7 @@
 Endpoints for cohort result operations
 """
 
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional
 from app.models.cohort import Cohort
 from app.schemas.cohort_result import CohortResult
 from app.services.cohort import CohortService
@@ -14,7 +14,7 @@ from app.api.deps import get_current_user, get_db, get_current_user_with_token
 from app.api import CurrentUserContext
 from app.models.user import User
 from app.services.cohort_result import cohort_result_service
-from app.utils.constants import COE_TOKEN_MAP, TOKEN_V6
+from app.utils.v6_token import get_v6_token
 import logging
 
 router = APIRouter()
@@ -41,7 +41,7 @@ def create_cohort_result(
     Creates a new cohort result.
     """
     try:
-        access_token = TOKEN_V6
+        access_token = get_v6_token()
 
         cohort_result = cohort_result_service.create_for_cohort(
             db=db,
@@ -194,7 +194,7 @@ def bulk_create_cohort_results(
     Skips any data_ids that already exist for the cohort.
     """
     try:
-        access_token = TOKEN_V6
+        access_token = get_v6_token()
         cohort_results = cohort_result_service.bulk_create_for_cohort(
             db=db,
             cohort_id=cohort_id,
@@ -213,64 +213,20 @@ def get_coes_results_by_by_cohort(
     *,
     db: Session = Depends(get_db),
     cohort_id: int = Path(..., description="ID of the cohort"),
-    skip: int = 0,
-    limit: int = 100,
     current_user: User = Depends(get_current_user),
-) -> Dict[str, List[str]]:
+) -> Dict[str, Any]:
     """
-    Gets all cohort results for a specific cohort with pagination.
+    Gets the CoEs that responded for a cohort, the ones still missing and
+    the patient count sent by each CoE.
     """
 
     cohort = cohort_service.get(db, cohort_id)
     if not cohort:
-        return {"responded": [], "missing": []}
-
-    cohort_results = cohort_result_service.get_by_cohort(
-        db=db, cohort_id=cohort_id, skip=skip, limit=limit
-    )
-
-    responded: Set[str] = set()
-
-    for result in cohort_results:
-        data_items = getattr(result, "data_id", None)
-        if not data_items:
-            continue
-
-        for data in data_items:
-            token = data.get("token")
-            if not token:
-                continue
-
-            center = COE_TOKEN_MAP.get(token)
-            if center:
-                responded.add(center)
-
-    # --- Expected ---
-    expected: Set[str] = cohort_result_service._get_expected_coes(db, cohort)
-
-    # --- Missing ---
-    missing = expected - responded
-
-    return {
-        "responded": sorted(responded),
-        "missing": sorted(missing),
-    }
-
-    centers: list[str] = []
-
-    for result in cohort_results:
-        data_items = getattr(result, "data_id", None)
-
-        if not data_items:
-            continue
-
-        for data in data_items:
-            token = data.get("token")
-            if not token:
-                continue
-
-            center = COE_TOKEN_MAP.get(token)
-            if center:
-                centers.append(center)
+        return {
+            "responded": [],
+            "missing": [],
+            "patient_counts": {},
+            "counts": {"responded": 0, "missing": 0, "expected": 0},
+        }
 
-    return centers
+    return cohort_result_service.get_coe_responses(db, cohort=cohort)
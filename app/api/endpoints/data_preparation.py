@@ -4,12 +4,20 @@ from app.services.algorithms import algorithm_service
 from app import schemas
 import time
 import asyncio
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from app.api.deps import get_current_user, get_db, get_current_user_with_token
 from app.models.user import User
 from app.api import CurrentUserContext
-from app.utils.constants import TOKEN_V6
+from app.utils.etag import (
+    RESULT_CACHE_CONTROL,
+    etag_matches,
+    make_etag,
+    not_modified,
+    tagged_json,
+)
+from app.utils.responses import dumps
+from app.utils.v6_token import get_v6_token
 from typing import Any, List, Dict
 import logging
 
@@ -45,7 +53,7 @@ def get_available_organizations(
     available for task submission (whitelist + online check).
     """
     try:
-        result = service.get_available_organizations(access_token=TOKEN_V6)
+        result = service.get_available_organizations(access_token=get_v6_token())
         return result
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -67,7 +75,7 @@ def get_variables_dataframe(
         access_token = current_user.access_token
 
         status_task = service.get_variables_dataframe(
-            access_token=TOKEN_V6, dataframe_id=dataframe_id
+            access_token=get_v6_token(), dataframe_id=dataframe_id
         )
 
         if not status_task:
@@ -102,7 +110,7 @@ def create_data_preparation_summary(
         access_token = current_user.access_token
 
         summary_task = service.data_preparation(
-            db=db, access_token=TOKEN_V6, data_preparation_in=data_preparation
+            db=db, access_token=get_v6_token(), data_preparation_in=data_preparation
         )
 
         if not summary_task:
@@ -138,7 +146,7 @@ def create_data_preparation_crosstab(
 
         summary_task = service.create_crosstab(
             db=db,
-            access_token=TOKEN_V6,
+            access_token=get_v6_token(),
             crosstab_preparation_in=crosstab_preparation_data,
         )
 
@@ -171,7 +179,7 @@ def create_coxph(
     try:
         result = service.create_coxph(
             db=db,
-            access_token=TOKEN_V6,
+            access_token=get_v6_token(),
             coxph_in=coxph_data,
         )
 
@@ -204,7 +212,7 @@ def create_glm(
     try:
         result = service.create_glm(
             db=db,
-            access_token=TOKEN_V6,
+            access_token=get_v6_token(),
             glm_in=glm_data,
         )
 
@@ -242,7 +250,7 @@ def create_kaplan_meier(
 
         result = service.create_kaplan_meier(
             db=db,
-            access_token=TOKEN_V6,
+            access_token=get_v6_token(),
             km_in=km_data,
         )
 
@@ -279,7 +287,7 @@ def create_data_preparation_t_test(
 
         t_test_task = service.create_t_test(
             db=db,
-            access_token=TOKEN_V6,
+            access_token=get_v6_token(),
             t_test_in=t_test_data,
         )
 
@@ -343,7 +351,7 @@ def get_status_task(
         access_token = current_user.access_token
 
         status_task = service.get_status_by_task_id(
-            access_token=TOKEN_V6, task_id=task_id
+            access_token=get_v6_token(), task_id=task_id
         )
 
         if not status_task:
@@ -374,7 +382,9 @@ def get_run_task(
         user = current_user.user
         access_token = current_user.access_token
 
-        result = service.get_run_by_task_id(access_token=TOKEN_V6, task_id=task_id)
+        result = service.get_run_by_task_id(
+            access_token=get_v6_token(), task_id=task_id
+        )
         logger.info("Status task for task_id=%s: %s", task_id, result)
         if not result:
             raise HTTPException(status_code=404, detail="No status for the task id")
@@ -389,22 +399,34 @@ def get_run_task(
 def get_result_task(
     *,
     task_id: int,
+    request: Request,
+    response: Response,
     current_user: CurrentUserContext = Depends(get_current_user_with_token),
 ) -> Any:
     """
     Check the status of the API.
     Returns a JSON response indicating the service is working correctly.
+    A decoded result never changes, so it is tagged by task id and a
+    matching If-None-Match is answered with 304 without calling Vantage6.
     """
+    etag = make_etag("v6-result", task_id)
+    if etag_matches(request, etag):
+        return not_modified(etag, RESULT_CACHE_CONTROL)
 
     try:
         user = current_user.user
         access_token = current_user.access_token
 
-        status_task = service.get_result_task_id(access_token=TOKEN_V6, task_id=task_id)
+        status_task = service.get_result_task_id(
+            access_token=get_v6_token(), task_id=task_id
+        )
 
         if not status_task:
             raise HTTPException(status_code=404, detail="No status for the task id")
 
+        if "error" not in status_task.result:
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = RESULT_CACHE_CONTROL
         return status_task
 
     except ValueError as e:
@@ -426,7 +448,7 @@ def get_subtasks(
         user = current_user.user
         access_token = current_user.access_token
 
-        status_task = service.get_subtasks(access_token=TOKEN_V6, task_id=task_id)
+        status_task = service.get_subtasks(access_token=get_v6_token(), task_id=task_id)
 
         if not status_task:
             raise HTTPException(status_code=404, detail="No subtasks for the task id")
@@ -460,7 +482,7 @@ def create_basic_arithmetic(
 
         result = service.create_basic_arithmetic(
             db,
-            access_token=TOKEN_V6,
+            access_token=get_v6_token(),
             basic_arithmetic_in=basic_arithmetic_data,
         )
 
@@ -498,7 +520,7 @@ def create_merge_categories(
 
         result = service.create_merge_categories(
             db,
-            access_token=TOKEN_V6,
+            access_token=get_v6_token(),
             merge_categories_in=merge_categories_data,
         )
 
@@ -536,7 +558,7 @@ def create_one_hot_encoding(
 
         result = service.create_one_hot_encoding(
             db,
-            access_token=TOKEN_V6,
+            access_token=get_v6_token(),
             one_hot_encoding_in=one_hot_encoding_data,
         )
 
@@ -570,7 +592,7 @@ def create_merge_variables(
     try:
         result = service.create_merge_variables(
             db,
-            access_token=TOKEN_V6,
+            access_token=get_v6_token(),
             merge_variables_in=merge_variables_data,
         )
 
@@ -602,7 +624,7 @@ def create_to_boolean(
     try:
         result = service.create_to_boolean(
             db,
-            access_token=TOKEN_V6,
+            access_token=get_v6_token(),
             to_boolean_in=to_boolean_data,
         )
 
@@ -648,7 +670,7 @@ def create_timedelta(
 
         result = service.create_timedelta(
             db,
-            access_token=TOKEN_V6,
+            access_token=get_v6_token(),
             timedelta_in=timedelta_data,
         )
 
@@ -667,6 +689,7 @@ def create_timedelta(
 def get_subtask_results(
     *,
     task_id: int,
+    request: Request,
     current_user: CurrentUserContext = Depends(get_current_user_with_token),
 ) -> Any:
     """
@@ -679,10 +702,12 @@ def get_subtask_results(
         access_token = current_user.access_token
 
         status_task = service.get_subtask_results(
-            access_token=TOKEN_V6, subtask_id=task_id
+            access_token=get_v6_token(), subtask_id=task_id
         )
 
-        return status_task
+        # Decoded results can be large; encode them straight to bytes. Runs
+        # may still be pending, so the ETag is a hash of the body.
+        return tagged_json(request, dumps(status_task))
 
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
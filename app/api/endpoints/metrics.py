@@ -2,19 +2,26 @@
 Endpoints for querying and exporting usage metrics.
 """
 
-import csv
-import io
+import importlib.util
 import logging
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from sqlalchemy import select, and_
 
 from app.api.deps import get_current_user
 from app.models.user import User
-from app.utils.metrics_logger import _get_engine, _metric_events_table
+from app.utils.metrics_export import EXPORT_FORMATS
+from app.utils.metrics_logger import (
+    ROLLUP_DIMENSIONS,
+    ROLLUP_GRANULARITIES,
+    _get_engine,
+    _metric_events_table,
+    _metric_rollups_table,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +32,13 @@ EXPORT_COLUMNS = [
     "workspace_id", "disease_type", "cohort_id", "cohort_size",
     "algorithm_type", "coe_response_time_ms", "message",
 ]
+EXPORT_BATCH_SIZE = 1000
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
 
 
 def _build_filters(
@@ -36,6 +50,9 @@ def _build_filters(
 ):
     conditions = []
     t = _metric_events_table
+    # Compare against timestamptz constants so the planner can prune
+    # metric_events partitions; naive datetimes are taken as UTC.
+    from_date, to_date = _as_utc(from_date), _as_utc(to_date)
     if module:
         conditions.append(t.c.module == module)
     if action:
@@ -83,19 +100,27 @@ def get_logs(
         raise HTTPException(status_code=500, detail="Error querying metrics")
 
 
-@router.get("/export")
-def export_logs(
+@router.get("/aggregate", response_model=List[Dict[str, Any]])
+def get_aggregates(
+    granularity: str = Query("hour"),
     module: Optional[str] = Query(None),
     action: Optional[str] = Query(None),
     center: Optional[str] = Query(None),
+    disease_type: Optional[str] = Query(None),
     from_date: Optional[datetime] = Query(None),
     to_date: Optional[datetime] = Query(None),
+    limit: int = Query(1000, le=10000),
     current_user: User = Depends(get_current_user),
-):
+) -> Any:
     """
-    Export usage metric events as CSV. All filters are optional.
-    Returns a downloadable CSV file.
+    Query pre-aggregated metrics per hour or day. All filters are optional.
+    Results are ordered by bucket ascending.
     """
+    if granularity not in ROLLUP_GRANULARITIES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"granularity must be one of {', '.join(ROLLUP_GRANULARITIES)}",
+        )
     engine = _get_engine()
     if engine is None:
         raise HTTPException(
@@ -103,27 +128,130 @@ def export_logs(
             detail="Metrics database not configured",
         )
     try:
-        t = _metric_events_table
-        conditions = _build_filters(module, action, center, from_date, to_date)
-        stmt = select(*[t.c[col] for col in EXPORT_COLUMNS]).order_by(t.c.timestamp.asc())
-        if conditions:
-            stmt = stmt.where(and_(*conditions))
-        with engine.connect() as conn:
-            rows = conn.execute(stmt).fetchall()
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(EXPORT_COLUMNS)
-        for row in rows:
-            writer.writerow(list(row))
-
-        output.seek(0)
-        filename = f"raven_metrics_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={filename}"},
+        t = _metric_rollups_table
+        conditions = [t.c.granularity == granularity]
+        filters = {
+            "module": module,
+            "action": action,
+            "center": center,
+            "disease_type": disease_type,
+        }
+        for name, value in filters.items():
+            if value:
+                conditions.append(t.c[name] == value)
+        if from_date:
+            conditions.append(t.c.bucket >= from_date)
+        if to_date:
+            conditions.append(t.c.bucket <= to_date)
+        stmt = (
+            select(*[t.c[col] for col in t.c.keys() if col not in ("id", "granularity")])
+            .where(and_(*conditions))
+            .order_by(t.c.bucket.asc())
+            .limit(limit)
         )
+        with engine.connect() as conn:
+            rows = conn.execute(stmt).mappings().all()
+        # Rollups store missing dimensions as ''.
+        return [
+            {k: (v or None) if k in ROLLUP_DIMENSIONS else v for k, v in row.items()}
+            for row in rows
+        ]
+    except Exception as exc:
+        logger.error("[METRICS] Error querying aggregates: %s", exc)
+        raise HTTPException(status_code=500, detail="Error querying metrics")
+
+
+def _stream_rows(engine, stmt) -> Iterator[List[Any]]:
+    """
+    Yield lists of rows from a server-side cursor, EXPORT_BATCH_SIZE at a
+    time. Closing the generator closes the cursor and the connection.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=EXPORT_BATCH_SIZE
+        ).execute(stmt)
+        try:
+            for partition in result.partitions():
+                yield partition
+        finally:
+            result.close()
+
+
+async def _iterate_in_threadpool(chunks: Iterator[Any]) -> AsyncIterator[Any]:
+    """
+    Drive a blocking generator from the threadpool and close it when the
+    client goes away, so an abandoned download releases its DB cursor.
+    """
+    done = object()
+    try:
+        while True:
+            chunk = await run_in_threadpool(next, chunks, done)
+            if chunk is done:
+                return
+            yield chunk
     except Exception as exc:
-        logger.error("[METRICS] Error exporting logs: %s", exc)
-        raise HTTPException(status_code=500, detail="Error exporting metrics")
+        logger.error("[METRICS] Error streaming export: %s", exc)
+        raise
+    finally:
+        await run_in_threadpool(chunks.close)
+
+
+@router.get("/export")
+def export_logs(
+    module: Optional[str] = Query(None),
+    action: Optional[str] = Query(None),
+    center: Optional[str] = Query(None),
+    from_date: Optional[datetime] = Query(None),
+    to_date: Optional[datetime] = Query(None),
+    format: str = Query("csv"),
+    columns: Optional[str] = Query(None, description="Comma-separated subset of columns"),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Export usage metric events as CSV, NDJSON, Parquet or Arrow IPC. All
+    filters are optional and only the requested columns are selected.
+    Rows are streamed from a server-side cursor as a downloadable file.
+    """
+    export_format = EXPORT_FORMATS.get(format)
+    if export_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"format must be one of {', '.join(EXPORT_FORMATS)}",
+        )
+    selected = EXPORT_COLUMNS
+    if columns:
+        selected = [col.strip() for col in columns.split(",") if col.strip()]
+        unknown = [col for col in selected if col not in EXPORT_COLUMNS]
+        if unknown or not selected:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unknown export columns: {', '.join(unknown)}",
+            )
+    if export_format.needs_pyarrow and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"The {format} format requires pyarrow to be installed",
+        )
+    engine = _get_engine()
+    if engine is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Metrics database not configured",
+        )
+    t = _metric_events_table
+    conditions = _build_filters(module, action, center, from_date, to_date)
+    stmt = select(*[t.c[col] for col in selected]).order_by(t.c.timestamp.asc())
+    if conditions:
+        stmt = stmt.where(and_(*conditions))
+
+    types = {col: t.c[col].type for col in selected}
+    chunks = export_format.encoder(selected, types, _stream_rows(engine, stmt))
+    filename = (
+        f"raven_metrics_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+        f".{export_format.extension}"
+    )
+    return StreamingResponse(
+        _iterate_in_threadpool(chunks),
+        media_type=export_format.media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
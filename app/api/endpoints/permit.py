@@ -4,7 +4,7 @@ Endpoints for permit operations
 
 from typing import Any, List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from sqlalchemy import any_
 
@@ -15,6 +15,7 @@ from app.models.permit import Permit
 from app.services.permit import permit_service
 from app.utils.constants import PermitStatus
 from app.utils.metrics_logger import log_event
+from app.utils.etag import check_row_version
 
 router = APIRouter()
 
@@ -55,11 +56,17 @@ def get_permit(
     *,
     db: Session = Depends(get_db),
     permit_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Obtains a permit by ID.
+    Answers 304 when If-None-Match matches the permit's current version.
     """
+    cached = check_row_version(request, response, db, Permit, permit_id)
+    if cached is not None:
+        return cached
     permit = permit_service.get(db=db, id=permit_id)
     if not permit:
         raise HTTPException(
@@ -4,7 +4,7 @@ Endpoints for operations with workspaces
 
 from typing import Any, List, Optional, Dict
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_
 
@@ -15,16 +15,35 @@ from app.models.user import User
 from app.models.workspace import Workspace
 from app.schemas.workspace import WorkspaceCreateV2
 
-from app.models.user_team import UserTeam
 from app.services.workspace import workspace_service
 from app.services.analysis import analysis_service
 from app.services.analysis_orchestrator import workspace_orchestrator_service
+from app.services.workspace_visibility import visible_workspaces_query
 from app.models.analysis import Analysis
-from app.utils.constants import TOKEN_V6
+from app.utils.v6_token import get_v6_token
 from app.utils.metrics_logger import log_event
+from app.utils.responses import serialize_rows
+from app.utils.etag import check_row_version
 
 router = APIRouter()
 
+WORKSPACE_FIELDS = [
+    "id",
+    "name",
+    "description",
+    "version",
+    "creation_date",
+    "creator_id",
+    "team_ids",
+    "update_date",
+    "metadata_search",
+    "data_access",
+    "data_analysis",
+    "result_report",
+    "v6_study_id",
+    "status",
+]
+
 
 # @router.post("/", response_model=schemas.Workspace, status_code=status.HTTP_201_CREATED)
 # def create_workspace(
@@ -59,7 +78,10 @@ def create_workspace_v2(
     user = current_user.user
     access_token = current_user.access_token
     workspace = workspace_orchestrator_service.create_workspace_full(
-        db=db, workspace_in=workspace_in, user_id=user.id, access_token=TOKEN_V6
+        db=db,
+        workspace_in=workspace_in,
+        user_id=user.id,
+        access_token=get_v6_token(),
     )
     return workspace
 
@@ -69,11 +91,22 @@ def get_workspace(
     *,
     db: Session = Depends(get_db),
     workspace_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Obtains a workspace by ID.
+    Answers 304 when If-None-Match matches the workspace's current version.
     """
+    cached = check_row_version(request, response, db, Workspace, workspace_id)
+    if cached is not None:
+        log_event(
+            "workspace", "access",
+            user_id=str(current_user.id),
+            workspace_id=workspace_id,
+        )
+        return cached
     workspace = workspace_service.get(db=db, id=workspace_id)
     if not workspace:
         raise HTTPException(
@@ -114,49 +147,12 @@ def get_workspaces(
         except ValueError:
             return []
 
-        # Build the filtered query; INFO: In production uses DB; in tests FakeSession returns empty
-        query = db.query(Workspace)
-
-        user_team_ids = [
-            str(team_id[0])
-            for team_id in db.query(UserTeam.team_id)
-            .filter(UserTeam.user_id == user_id_int)
-            .all()
-        ]
-
-        creator_filter = Workspace.creator_id == user_id_int
-        if user_team_ids:
-            team_filter = Workspace.team_ids.op("&&")(user_team_ids)
-            query = query.filter(or_(creator_filter, team_filter))
-        else:
-            query = query.filter(creator_filter)
-
-        workspaces = query.offset(skip).limit(limit).all()
-
-    def serialize(w: Any) -> Dict[str, Any]:
-        fields = [
-            "id",
-            "name",
-            "description",
-            "version",
-            "creation_date",
-            "creator_id",
-            "team_ids",
-            "update_date",
-            "metadata_search",
-            "data_access",
-            "data_analysis",
-            "result_report",
-            "v6_study_id",
-            "status",
-        ]
-        return {
-            k: getattr(w, k)
-            for k in fields
-            if hasattr(w, k) and getattr(w, k) is not None
-        }
-
-    return [serialize(w) for w in workspaces]
+        # Creator or team member; team membership is cached per user
+        workspaces = (
+            visible_workspaces_query(db, user_id_int).offset(skip).limit(limit).all()
+        )
+
+    return serialize_rows(workspaces, WORKSPACE_FIELDS)
 
 
 @router.delete("/{workspace_id}", status_code=status.HTTP_200_OK)
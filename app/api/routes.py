@@ -2,7 +2,9 @@
 Main configuration of API routes
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from app.api.deps import request_unit
 
 from app.api.endpoints import (
     algorithms,
@@ -20,7 +22,8 @@ from app.api.endpoints import (
     metrics,
 )
 
-api_router = APIRouter()
+# Every request commits once, through the request-level unit of work.
+api_router = APIRouter(dependencies=[Depends(request_unit, scope="function")])
 
 # Endpoint to check service status
 api_router.include_router(
@@ -0,0 +1,127 @@
+"""
+Request-scoped loader for entities that are looked up repeatedly while
+handling a single request (workspace, analysis, cohort, permit, metadata).
+
+The loader lives in ``session.info`` so it shares the lifetime of the
+request's session. Lookups by primary key go through ``Session.get`` and are
+served from the identity map once loaded; lookups by ``workspace_id`` are
+memoized here, including misses, until the session flushes, commits or
+rolls back.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app.models.analysis import Analysis
+from app.models.cohort import Cohort
+from app.models.metadata_search import MetadataSearch
+from app.models.permit import Permit
+from app.models.workspace import Workspace
+from app.utils.constants import PermitStatus
+
+_LOADER_KEY = "request_loader"
+_MISSING = object()
+
+
+class RequestLoader:
+    """Per-session cache of entities, dataloader style."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._by_key: Dict[Tuple[str, Any], Any] = {}
+
+    def _get_by_id(self, model, id: Any):
+        if id is None:
+            return None
+        return self.db.get(model, id)
+
+    def _memoize(self, key: Tuple[str, Any], load: Callable[[], Any]):
+        value = self._by_key.get(key, _MISSING)
+        if value is _MISSING:
+            value = load()
+            self._by_key[key] = value
+        return value
+
+    def workspace(self, workspace_id: Any) -> Optional[Workspace]:
+        return self._get_by_id(Workspace, workspace_id)
+
+    def analysis(self, analysis_id: Any) -> Optional[Analysis]:
+        return self._get_by_id(Analysis, analysis_id)
+
+    def cohort(self, cohort_id: Any) -> Optional[Cohort]:
+        return self._get_by_id(Cohort, cohort_id)
+
+    def cohorts(self, cohort_ids: Iterable[Any]) -> List[Cohort]:
+        """
+        Load several cohorts, querying only the ids not already in the
+        identity map. Keeps the order of ``cohort_ids`` and skips unknown ids.
+        """
+        ids = list(dict.fromkeys(cohort_ids))
+        found = {}
+        for cohort_id in ids:
+            cached = self._cached_identity(Cohort, cohort_id)
+            if cached is not None:
+                found[cohort_id] = cached
+        missing = [i for i in ids if i not in found]
+        if missing:
+            for cohort in self.db.query(Cohort).filter(Cohort.id.in_(missing)).all():
+                found[cohort.id] = cohort
+        return [found[i] for i in ids if i in found]
+
+    def _cached_identity(self, model, id: Any):
+        identity_map = getattr(self.db, "identity_map", None)
+        if identity_map is None:
+            return None
+        return identity_map.get(identity_key(model, id))
+
+    def granted_permit(self, workspace_id: Any) -> Optional[Permit]:
+        return self._memoize(
+            ("granted_permit", workspace_id),
+            lambda: self.db.query(Permit)
+            .filter(
+                Permit.workspace_id == workspace_id,
+                Permit.status == PermitStatus.GRANTED,
+            )
+            .first(),
+        )
+
+    def metadata_search(self, workspace_id: Any) -> Optional[MetadataSearch]:
+        return self._memoize(
+            ("metadata_search", workspace_id),
+            lambda: self.db.query(MetadataSearch)
+            .filter(MetadataSearch.workspace_id == workspace_id)
+            .first(),
+        )
+
+    def clear(self) -> None:
+        self._by_key.clear()
+
+
+def get_loader(db: Session) -> RequestLoader:
+    """
+    Return the loader bound to this session, creating it on first use.
+    Sessions without ``info`` (test doubles) get a throwaway loader.
+    """
+    info = getattr(db, "info", None)
+    if info is None:
+        return RequestLoader(db)
+    loader = info.get(_LOADER_KEY)
+    if loader is None or loader.db is not db:
+        loader = RequestLoader(db)
+        info[_LOADER_KEY] = loader
+    return loader
+
+
+@event.listens_for(Session, "after_flush")
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _clear_loader(session: Session, *args) -> None:
+    # A flush may have written a permit or metadata row that was memoized as
+    # missing, and rolled back rows may no longer exist; drop memoized
+    # lookups so the next access hits the database again.
+    loader = session.info.get(_LOADER_KEY)
+    if loader is not None:
+        loader.clear()
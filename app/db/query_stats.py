@@ -0,0 +1,60 @@
+"""
+Per-request SQL statement counting.
+
+A cursor event on the engine bumps a counter held in a context variable.
+The HTTP middleware opens a counter per request and records the total in a
+Prometheus histogram; with DB_QUERY_COUNT_HEADER it is also sent in the
+``X-DB-Query-Count`` response header.
+"""
+
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "raven_db_queries_per_request",
+    "Number of SQL statements executed while handling a request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250),
+)
+
+
+class QueryCounter:
+    """Mutable holder so that threadpool workers update the request's count."""
+
+    __slots__ = ("count",)
+
+    def __init__(self) -> None:
+        self.count = 0
+
+
+_current_counter: ContextVar[Optional[QueryCounter]] = ContextVar(
+    "db_query_counter", default=None
+)
+
+
+def start_counting() -> QueryCounter:
+    counter = QueryCounter()
+    _current_counter.set(counter)
+    return counter
+
+
+def current_query_count() -> int:
+    counter = _current_counter.get()
+    return counter.count if counter else 0
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+def install_query_counter(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _count_statement):
+        event.listen(engine, "before_cursor_execute", _count_statement)
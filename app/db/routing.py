@@ -0,0 +1,233 @@
+"""
+Read-replica routing.
+
+``RoutingSession`` sends ORM reads of read-only requests (GET/HEAD) to a
+healthy replica and everything else to the primary. Flushes, DML and
+``session.connection()`` (Core statements such as the history INSERT)
+always use the primary, and once a session has written it stays there.
+
+Read-your-writes: when a request commits a write, the response carries a
+signed cookie with the time of the write, bound to the user (the token's
+``sub``). For the sticky window the user's GETs read from the primary, on
+whichever worker serves them and across token refreshes. The signature
+uses SECRET_KEY, which must therefore be shared by all workers.
+
+Replicas are health checked with ``SELECT 1`` at most once per interval;
+an unhealthy or disconnected replica is skipped and reads fall back to the
+primary until it passes a check again.
+"""
+
+import hashlib
+import hmac
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from jose import jwt
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+READ_ONLY_METHODS = frozenset({"GET", "HEAD"})
+
+
+class _Replica:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.healthy = True
+        self.checked_at = 0.0
+
+
+class ReplicaPool:
+    """Round-robin over replicas that passed their last health check."""
+
+    def __init__(self, uris: List[str], *, health_interval: float):
+        self.health_interval = health_interval
+        self._replicas = [_Replica(self._create_engine(uri)) for uri in uris]
+        self._cycle = itertools.cycle(range(len(self._replicas)))
+        self._lock = threading.Lock()
+        for replica in self._replicas:
+            event.listen(replica.engine, "handle_error", self._on_error(replica))
+
+    @staticmethod
+    def _create_engine(uri: str) -> Engine:
+        if uri.startswith("sqlite"):
+            return create_engine(uri)
+        return create_engine(
+            uri, pool_pre_ping=True, connect_args={"connect_timeout": 3}
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self._replicas)
+
+    @property
+    def engines(self) -> List[Engine]:
+        return [replica.engine for replica in self._replicas]
+
+    def _on_error(self, replica: _Replica):
+        def handle_error(context):
+            if context.is_disconnect:
+                logger.warning("[DB] Replica %s disconnected", replica.engine.url)
+                replica.healthy = False
+                replica.checked_at = time.monotonic()
+
+        return handle_error
+
+    def _check(self, replica: _Replica) -> bool:
+        now = time.monotonic()
+        if now - replica.checked_at < self.health_interval:
+            return replica.healthy
+        replica.checked_at = now
+        try:
+            with replica.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except Exception as exc:  # noqa: BLE001 - any failure means unhealthy
+            if replica.healthy:
+                logger.warning(
+                    "[DB] Replica %s failed health check: %s", replica.engine.url, exc
+                )
+            replica.healthy = False
+        else:
+            if not replica.healthy:
+                logger.info("[DB] Replica %s is healthy again", replica.engine.url)
+            replica.healthy = True
+        return replica.healthy
+
+    def choose(self) -> Optional[Engine]:
+        for _ in range(len(self._replicas)):
+            with self._lock:
+                replica = self._replicas[next(self._cycle)]
+            if self._check(replica):
+                return replica.engine
+        return None
+
+
+READ_YOUR_WRITES_COOKIE = "raven_rw"
+
+
+class ReadYourWrites:
+    """Signed last-write markers, carried by the client in a cookie."""
+
+    def __init__(self, secret: str, window: float):
+        self._secret = secret.encode()
+        self.window = window
+
+    def _signature(self, user_key: str, written_at: int) -> str:
+        message = f"{user_key}:{written_at}".encode()
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()
+
+    def issue(self, user_key: str, written_at: Optional[float] = None) -> str:
+        written_at = int(time.time() if written_at is None else written_at)
+        return f"{written_at}.{self._signature(user_key, written_at)}"
+
+    def is_sticky(self, user_key: Optional[str], cookie: Optional[str]) -> bool:
+        if not user_key or not cookie:
+            return False
+        written_at, _, signature = cookie.partition(".")
+        if not written_at.isdigit():
+            return False
+        expected = self._signature(user_key, int(written_at))
+        if not hmac.compare_digest(signature, expected):
+            return False
+        return int(written_at) + self.window >= time.time()
+
+
+def user_key_from_authorization(authorization: Optional[str]) -> Optional[str]:
+    """
+    The ``sub`` of the bearer token, read without verification: it only
+    selects whose read-your-writes cookie is checked, never grants access.
+    """
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        claims = jwt.get_unverified_claims(authorization[7:].strip())
+    except Exception:  # noqa: BLE001 - not a JWT, no stickiness
+        return None
+    sub = claims.get("sub")
+    return str(sub) if sub else None
+
+
+class RoutingSession(Session):
+    """Session whose reads can be served by a replica."""
+
+    def __init__(
+        self,
+        *args,
+        replicas: Optional[ReplicaPool] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self._replica_bind: Optional[Engine] = None
+
+    def bind_request(
+        self,
+        *,
+        method: str,
+        sticky: bool = False,
+        on_write: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """
+        Let reads of a read-only request use a replica, unless the caller
+        wrote recently (``sticky``). ``on_write`` is called after a commit
+        that wrote, to pin the caller to the primary.
+        """
+        self.info["on_write"] = on_write
+        if method.upper() in READ_ONLY_METHODS and not sticky:
+            self.info["read_only"] = True
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.replicas
+            and self.info.get("read_only")
+            and not self.info.get("wrote")
+            and not self._flushing
+            # No clause: session.connection(), used for Core writes.
+            and clause is not None
+            and not getattr(clause, "is_dml", False)
+        ):
+            if self._replica_bind is None:
+                self._replica_bind = self.replicas.choose()
+            if self._replica_bind is not None:
+                return self._replica_bind
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_wrote(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_dml_wrote(orm_execute_state):
+    state = orm_execute_state
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_begin")
+def _watch_core_writes(session, transaction, connection):
+    """Core DML on the session's primary connection also counts as a write."""
+    if session.replicas and connection.engine in session.replicas.engines:
+        return
+
+    def before_execute(conn, clauseelement, multiparams, params, execution_options):
+        if getattr(clauseelement, "is_dml", False):
+            session.info["wrote"] = True
+
+    event.listen(connection, "before_execute", before_execute)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_writer_to_primary(session):
+    if not session.info.pop("wrote", False):
+        return
+    # Later reads in this request must see the write as well.
+    session.info["read_only"] = False
+    on_write = session.info.get("on_write")
+    if on_write is not None:
+        on_write()
@@ -9,10 +9,30 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.config.settings import settings
+from app.db.query_stats import install_query_counter
+from app.db.routing import ReadYourWrites, ReplicaPool, RoutingSession
 
 # Create database connection
 engine = create_engine(settings.DATABASE_URI, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+install_query_counter(engine)
+
+replica_pool = ReplicaPool(
+    settings.replica_uris, health_interval=settings.DATABASE_REPLICA_HEALTH_INTERVAL
+)
+for _replica_engine in replica_pool.engines:
+    install_query_counter(_replica_engine)
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    replicas=replica_pool,
+)
+
+read_your_writes = ReadYourWrites(
+    settings.SECRET_KEY, settings.DATABASE_REPLICA_STICKY_SECONDS
+)
 
 
 def get_db() -> Generator:
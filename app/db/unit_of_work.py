@@ -0,0 +1,48 @@
+"""
+Unit of work: one commit per request instead of one per statement.
+
+Every API request runs inside a request-level unit (``request_unit`` in
+app.api.deps) that commits once after the endpoint returned and before the
+response is sent. Service methods wrap their writes in ``unit_of_work(db)``
+and only flush; outside a request (scripts, background jobs) the outermost
+block commits (or rolls back on error) itself.
+
+``savepoint=True`` on a nested block runs it inside a SAVEPOINT, so a
+failure there can be caught without losing the enclosing work.
+``checkpoint(db)`` commits the work done so far; it is only used right
+before a slow remote call so that no transaction is held open during it.
+"""
+
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy.orm import Session
+
+_DEPTH_KEY = "unit_of_work_depth"
+
+
+@contextmanager
+def unit_of_work(db: Session, *, savepoint: bool = False) -> Iterator[Session]:
+    depth = db.info.get(_DEPTH_KEY, 0)
+    db.info[_DEPTH_KEY] = depth + 1
+    try:
+        if depth == 0:
+            try:
+                yield db
+                db.commit()
+            except BaseException:
+                db.rollback()
+                raise
+        elif savepoint:
+            with db.begin_nested():
+                yield db
+        else:
+            yield db
+            db.flush()
+    finally:
+        db.info[_DEPTH_KEY] = depth
+
+
+def checkpoint(db: Session) -> None:
+    """Commit the enclosing unit's work so far; later work commits at its end."""
+    db.commit()
@@ -9,6 +9,7 @@ from app.models.user_type import UserType
 from app.models.team import Team
 from app.models.user_team import UserTeam
 from app.models.workspace import Workspace
+from app.models.workspace_visibility import WorkspaceVisibility
 from app.models.permit import Permit
 from app.models.workspace_history import WorkspaceHistory
 from app.models.metadata_search import MetadataSearch
@@ -16,6 +17,8 @@ from app.models.analysis import Analysis
 from app.models.cohort import Cohort
 from app.models.algorithm import Algorithm
 from app.models.cohort_result import CohortResult
+from app.models.cohort_result_execution import CohortResultExecution
+from app.models.cohort_coe_response import CohortCoeResponse
 from app.models.cohort_algorithm import CohortAlgorithm
 
 __all__ = [
@@ -26,6 +29,7 @@ __all__ = [
     "Team",
     "UserTeam",
     "Workspace",
+    "WorkspaceVisibility",
     "Permit",
     "WorkspaceHistory",
     "MetadataSearch",
@@ -33,5 +37,7 @@ __all__ = [
     "Cohort",
     "Algorithm",
     "CohortResult",
+    "CohortResultExecution",
+    "CohortCoeResponse",
     "CohortAlgorithm"
 ]
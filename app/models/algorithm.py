@@ -2,9 +2,26 @@
 Algorithm model for the database
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime
+import hashlib
+from typing import Iterable, Optional
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Text,
+    DateTime,
+    cast,
+    event,
+    inspect,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Session, relationship
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.models.base import Base
 
@@ -32,6 +49,9 @@ class Algorithm(Base):
     col_var = Column(Text, nullable=True)
     row_var_list = Column(Text, nullable=True)
 
+    # sha256 of the sorted cohort ids, kept in sync with `cohorts`
+    cohort_signature = Column(String(64), index=True, nullable=True)
+
     # Relationships
     # relationships
     cohorts = relationship(
@@ -39,3 +59,108 @@ class Algorithm(Base):
         secondary="cohort_algorithms",
         back_populates="algorithms",
     )
+
+
+def cohort_signature(cohort_ids: Iterable[int]) -> Optional[str]:
+    """
+    Canonical signature of a cohort set: sha256 of the sorted, unique ids
+    joined by commas. None for an empty set. Must match the SQL used by
+    refresh_cohort_signatures and the backfill migration.
+    """
+    ids = sorted({int(cohort_id) for cohort_id in cohort_ids})
+    if not ids:
+        return None
+    return hashlib.sha256(",".join(map(str, ids)).encode()).hexdigest()
+
+
+def refresh_cohort_signatures(db: Session, algorithm_ids: Iterable[int]) -> None:
+    """
+    Recompute signatures in SQL after cohort_algorithms rows were changed
+    with bulk statements that bypass the ORM collections.
+    """
+    from app.models.cohort_algorithm import CohortAlgorithm
+
+    algorithm_ids = list(algorithm_ids)
+    if not algorithm_ids:
+        return
+    joined_ids = func.string_agg(
+        cast(CohortAlgorithm.cohort_id, Text),
+        aggregate_order_by(literal(","), CohortAlgorithm.cohort_id),
+    )
+    signature = (
+        select(func.encode(func.sha256(func.convert_to(joined_ids, "UTF8")), "hex"))
+        .where(CohortAlgorithm.algorithm_id == Algorithm.id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(Algorithm)
+        .where(Algorithm.id.in_(algorithm_ids))
+        .values(cohort_signature=signature)
+        .execution_options(synchronize_session=False)
+    )
+
+
+_PENDING_SIGNATURES_KEY = "pending_cohort_signatures"
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_cohort_signatures(session, flush_context, instances):
+    """Recompute the signature of algorithms whose cohort links changed."""
+    from app.models.cohort import Cohort
+
+    # Left over if the previous flush failed before after_flush.
+    session.info.pop(_PENDING_SIGNATURES_KEY, None)
+    touched = set()
+    pending = set()
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Algorithm):
+            if obj in session.new or inspect(obj).attrs.cohorts.history.has_changes():
+                touched.add(obj)
+        elif isinstance(obj, Cohort):
+            history = inspect(obj).attrs.algorithms.history
+            touched.update(history.added or ())
+            touched.update(history.deleted or ())
+    for obj in session.deleted:
+        if isinstance(obj, Cohort):
+            # The flush removes the cohort's links; the remaining ones are
+            # only known afterwards.
+            pending.update(obj.algorithms)
+
+    for algorithm in touched:
+        if any(cohort.id is None for cohort in algorithm.cohorts):
+            # Cohorts inserted by this flush get their ids only during it.
+            pending.add(algorithm)
+        else:
+            algorithm.cohort_signature = cohort_signature(
+                cohort.id for cohort in algorithm.cohorts
+            )
+    pending -= set(session.deleted)
+    if pending:
+        session.info[_PENDING_SIGNATURES_KEY] = pending
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_pending_cohort_signatures(session, flush_context):
+    """
+    Signatures deferred by _sync_cohort_signatures, computed from the
+    cohort_algorithms rows as they are after the flush.
+    """
+    from app.models.cohort_algorithm import CohortAlgorithm
+
+    pending = session.info.pop(_PENDING_SIGNATURES_KEY, None)
+    if not pending:
+        return
+    links = CohortAlgorithm.__table__
+    table = Algorithm.__table__
+    connection = session.connection()
+    for algorithm in pending:
+        cohort_ids = connection.execute(
+            select(links.c.cohort_id).where(links.c.algorithm_id == algorithm.id)
+        ).scalars()
+        signature = cohort_signature(cohort_ids)
+        connection.execute(
+            update(table)
+            .where(table.c.id == algorithm.id)
+            .values(cohort_signature=signature)
+        )
+        set_committed_value(algorithm, "cohort_signature", signature)
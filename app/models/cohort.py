@@ -38,6 +38,12 @@ class Cohort(Base):
     analysis = relationship("Analysis", back_populates="cohorts")
     workspace = relationship("Workspace", back_populates="cohorts")
     results = relationship("CohortResult", back_populates="cohort")
+    executions = relationship(
+        "CohortResultExecution", back_populates="cohort", passive_deletes=True
+    )
+    coe_responses = relationship(
+        "CohortCoeResponse", back_populates="cohort", passive_deletes=True
+    )
     algorithms = relationship(
         "Algorithm", secondary="cohort_algorithms", back_populates="cohorts"
     )
@@ -0,0 +1,37 @@
+"""
+CohortCoeResponse model for the database
+"""
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import relationship
+
+from app.models.base import Base
+
+
+class CohortCoeResponse(Base):
+    """Latest response of each CoE for a cohort, maintained on ingest."""
+
+    __tablename__ = "cohort_coe_responses"
+    __table_args__ = (
+        UniqueConstraint("cohort_id", "coe", name="uq_cohort_coe_responses_cohort_coe"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cohort_id = Column(
+        Integer, ForeignKey("cohorts.id", ondelete="CASCADE"), nullable=False
+    )
+    coe = Column(String(50), nullable=False)
+    token = Column(String(32), nullable=False)
+    responded_at = Column(DateTime(timezone=True), nullable=False)
+    patient_count = Column(Integer, nullable=False, default=0)
+    last_execution_date = Column(String)
+
+    # Relationships
+    cohort = relationship("Cohort", back_populates="coe_responses")
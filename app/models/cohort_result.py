@@ -2,19 +2,50 @@
 CohortResult model for the database
 """
 
-from sqlalchemy import Column, Integer, ForeignKey
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, ForeignKey, func, literal, select
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by
+from sqlalchemy.orm import column_property, relationship
 
 from app.models.base import Base
+from app.models.cohort_result_execution import CohortResultExecution
 
 
 class CohortResult(Base):
     __tablename__ = "cohort_results"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    data_id = Column(JSONB, nullable=False, server_default="[]")
+    # Legacy column; no longer written (see data_id below).
+    legacy_data_id = Column("data_id", JSONB, nullable=False, server_default="[]")
     cohort_id = Column(Integer, ForeignKey("cohorts.id", ondelete="CASCADE"), nullable=False)
 
+    # Manifest of the executions received for the cohort, in arrival order.
+    # Derived from cohort_result_executions on load, so a CoE submission only
+    # writes that CoE's rows instead of rewriting a JSONB document.
+    data_id = column_property(
+        select(
+            func.coalesce(
+                func.jsonb_agg(
+                    aggregate_order_by(
+                        func.jsonb_build_object(
+                            "token",
+                            CohortResultExecution.token,
+                            "execution_date",
+                            CohortResultExecution.execution_date,
+                            "patient_count",
+                            func.cardinality(CohortResultExecution.patient_ids),
+                            "received_at",
+                            CohortResultExecution.received_at,
+                        ),
+                        CohortResultExecution.id,
+                    )
+                ),
+                literal([], JSONB),
+            )
+        )
+        .where(CohortResultExecution.cohort_id == cohort_id)
+        .correlate_except(CohortResultExecution)
+        .scalar_subquery()
+    )
+
     # Relationships
     cohort = relationship("Cohort", back_populates="results")
@@ -0,0 +1,41 @@
+"""
+CohortResultExecution model for the database
+"""
+
+from sqlalchemy import (
+    ARRAY,
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+
+from app.models.base import Base
+
+
+class CohortResultExecution(Base):
+    """One execution submitted by a CoE for a cohort (normalized patient ids)."""
+
+    __tablename__ = "cohort_result_executions"
+    __table_args__ = (
+        Index("ix_cohort_result_executions_cohort_token", "cohort_id", "token"),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    cohort_id = Column(
+        Integer, ForeignKey("cohorts.id", ondelete="CASCADE"), nullable=False
+    )
+    token = Column(String(32), nullable=False)
+    execution_date = Column(String)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Text so that alphanumeric CoE ids are kept; see app.utils.patient_ids.
+    patient_ids = Column(ARRAY(Text), nullable=False, server_default="{}")
+
+    # Relationships
+    cohort = relationship("Cohort", back_populates="executions")
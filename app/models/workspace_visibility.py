@@ -0,0 +1,27 @@
+"""
+WorkspaceVisibility model for the database
+"""
+
+from sqlalchemy import Column, ForeignKey, Index, Integer
+
+from app.models.base import Base
+
+
+class WorkspaceVisibility(Base):
+    """
+    Denormalized (user, workspace) pairs a user can see: workspaces they
+    created or that list one of their teams. Kept in sync on every write;
+    listings read it when WORKSPACE_VISIBILITY_TABLE is enabled.
+    """
+
+    __tablename__ = "workspace_visibility"
+    __table_args__ = (
+        Index("ix_workspace_visibility_workspace_id", "workspace_id"),
+    )
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    workspace_id = Column(
+        Integer, ForeignKey("workspaces.id", ondelete="CASCADE"), primary_key=True
+    )
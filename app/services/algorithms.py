@@ -11,21 +11,18 @@ from urllib import response
 import json
 
 from app import db
-from app.api.endpoints import algorithms
-from app.models.algorithm import Algorithm
+from app.models.algorithm import Algorithm, cohort_signature
 from app.schemas.algorithms import (
     AlgorithmCreate,
     AlgorithmUpdate,
 )
 from app.services.vantage_6 import Vantage6Service
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, selectinload
 from app.models.cohort_algorithm import CohortAlgorithm
 from app.services.base import BaseService
 from app.models.cohort import Cohort
 from app.services.cohort import CohortService
 from app.utils.constants import ALGORITHMS
-from sqlalchemy.orm import joinedload
 import httpx
 
 logger = logging.getLogger(__name__)
@@ -81,91 +78,24 @@ class AlgorithmService(BaseService[Algorithm, AlgorithmCreate, AlgorithmUpdate])
     def get_algorithms_by_exact_cohort_list(
         self, db: Session, cohort_ids: list[int]
     ) -> List[Algorithm]:
-
-        subq = (
-            db.query(
-                CohortAlgorithm.algorithm_id,
-                func.count(CohortAlgorithm.cohort_id).label("total_cohorts"),
-            )
-            .group_by(CohortAlgorithm.algorithm_id)
-            .subquery()
-        )
+        """Algorithms linked to exactly this set of cohorts (signature lookup)."""
 
         logger.info(
-            "[ALGORITHMS] GET to get_algorithms_by_exact_cohort_list with cohort_ids: %s and subquery: %s",
+            "[ALGORITHMS] GET to get_algorithms_by_exact_cohort_list with cohort_ids: %s",
             cohort_ids,
-            subq,
         )
 
-        match_count_subq = (
-            db.query(
-                CohortAlgorithm.algorithm_id,
-                func.count(CohortAlgorithm.cohort_id).label("match_count"),
-            )
-            .filter(CohortAlgorithm.cohort_id.in_(cohort_ids))
-            .group_by(CohortAlgorithm.algorithm_id)
-            .subquery()
-        )
+        signature = cohort_signature(cohort_ids)
+        if signature is None:
+            return []
 
-        query = (
+        return (
             db.query(Algorithm)
-            .options(joinedload(Algorithm.cohorts))
-            .join(subq, Algorithm.id == subq.c.algorithm_id)
-            .join(match_count_subq, Algorithm.id == match_count_subq.c.algorithm_id)
-            .filter(subq.c.total_cohorts == len(cohort_ids))
-            .filter(match_count_subq.c.match_count == len(cohort_ids))
-            .distinct()  # 🔥 FIX DUPLICADOS
-        )
-
-        logger.info(
-            "[ALGORITHMS] Query for get_algorithms_by_exact_cohort_list: %s",
-            query,
+            .options(selectinload(Algorithm.cohorts))
+            .filter(Algorithm.cohort_signature == signature)
+            .all()
         )
 
-        return query.all()
-
-    # def get_algorithms_by_exact_cohort_list(
-    #     self, db: Session, cohort_ids: list[int]
-    # ) -> List[Algorithm]:
-
-    #     logger.info(
-    #         "[ALGORITHMS] GET to get_algorithms_by_exact_cohort_list with cohort_ids: %s",
-    #         cohort_ids,
-    #     )
-    #     # Subquery: contar cohort_ids por algoritmo
-    #     subq = (
-    #         db.query(
-    #             CohortAlgorithm.algorithm_id,
-    #             func.count(CohortAlgorithm.cohort_id).label("total_cohorts"),
-    #         )
-    #         .group_by(CohortAlgorithm.algorithm_id)
-    #         .subquery()
-    #     )
-
-    #     # Subquery: contar cuántos de los cohort_ids pasados están presentes
-    #     match_count_subq = (
-    #         db.query(
-    #             CohortAlgorithm.algorithm_id,
-    #             func.count(CohortAlgorithm.cohort_id).label("match_count"),
-    #         )
-    #         .filter(CohortAlgorithm.cohort_id.in_(cohort_ids))
-    #         .group_by(CohortAlgorithm.algorithm_id)
-    #         .subquery()
-    #     )
-
-    #     # Unimos las subqueries con Algorithm y filtramos por exact match
-    #     query = (
-    #         db.query(Algorithm)
-    #         .join(subq, Algorithm.id == subq.c.algorithm_id)
-    #         .join(match_count_subq, Algorithm.id == match_count_subq.c.algorithm_id)
-    #         .filter(subq.c.total_cohorts == len(cohort_ids))
-    #         .filter(match_count_subq.c.match_count == len(cohort_ids))
-    #     )
-
-    #     algorithms = query.all()
-
-    #     return algorithms
-
     async def get_algorithms_with_status_async(
         self, db: Session, cohort_ids: list[int], access_token: str
     ) -> List[Algorithm]:
@@ -192,19 +122,13 @@ class AlgorithmService(BaseService[Algorithm, AlgorithmCreate, AlgorithmUpdate])
             "[ALGORITHMS] GET to is_summary_cohort_list with cohort_ids: %s",
             cohort_ids,
         )
-        # Subquery: contar cohort_ids por algoritmo
-        query = (
-            db.query(Algorithm)
-            .join(CohortAlgorithm)
-            .filter(Algorithm.method_name == ALGORITHMS.SUMMARY)
-            .group_by(Algorithm.id)
-            .having(func.count(CohortAlgorithm.cohort_id) == len(cohort_ids))
-            .having(
-                func.count(
-                    func.nullif(CohortAlgorithm.cohort_id.in_(cohort_ids), False)
-                )
-                == len(cohort_ids)
-            )
+        signature = cohort_signature(cohort_ids)
+        if signature is None:
+            return []
+
+        query = db.query(Algorithm).filter(
+            Algorithm.cohort_signature == signature,
+            Algorithm.method_name == ALGORITHMS.SUMMARY,
         )
         return query.all()
 
@@ -256,22 +180,14 @@ class AlgorithmService(BaseService[Algorithm, AlgorithmCreate, AlgorithmUpdate])
             "[ALGORITHMS] GET to are_ready_dataframes_cohort_list with cohort_ids: %s",
             cohort_ids,
         )
-        # Subquery: contar cohort_ids por algoritmo
-        query = (
-            db.query(Algorithm)
-            .join(CohortAlgorithm)
-            .filter(Algorithm.method_name == ALGORITHMS.SUMMARY)
-            .group_by(Algorithm.id)
-            .having(func.count(CohortAlgorithm.cohort_id) == len(cohort_ids))
-            .having(
-                func.count(
-                    func.nullif(CohortAlgorithm.cohort_id.in_(cohort_ids), False)
-                )
-                == len(cohort_ids)
-            )
-        )
+        signature = cohort_signature(cohort_ids)
+        if signature is None:
+            return []
 
-        algorithms = query.all()
+        query = db.query(Algorithm).filter(
+            Algorithm.cohort_signature == signature,
+            Algorithm.method_name == ALGORITHMS.SUMMARY,
+        )
 
         return query.all()
 
@@ -11,9 +11,9 @@ from sqlalchemy import func
 
 from app.models.analysis import Analysis
 from app.models.workspace import Workspace
-from app.models.workspace_history import WorkspaceHistory
 from app.schemas.analysis import AnalysisCreate, AnalysisUpdate
 from app.services.base import BaseService
+from app.services.workspace_history import record_history
 from app.models.cohort import Cohort
 from app.services.cohort import CohortService
 
@@ -54,15 +54,14 @@ class AnalysisService(BaseService[Analysis, AnalysisCreate, AnalysisUpdate]):
         db.flush()
 
         # Crear historial
-        workspace_history = WorkspaceHistory(
-            date=datetime.now(timezone.utc),
+        record_history(
+            db,
             action="Analysis created",
             phase="Data Analysis",
             description=f"A new analysis has been created: '{db_obj.analysis_name}'",
             creator_id=user_id,
             workspace_id=obj_in.workspace_id,
         )
-        db.add(workspace_history)
         db.commit()
         db.refresh(db_obj)
 
@@ -120,15 +119,14 @@ class AnalysisService(BaseService[Analysis, AnalysisCreate, AnalysisUpdate]):
             action = "Analysis updated"
             description = f"Analysis '{updated_analysis.analysis_name}' has been updated. Changes: {', '.join(changes)}"
 
-            workspace_history = WorkspaceHistory(
-                date=datetime.now(timezone.utc),
+            record_history(
+                db,
                 phase="Data Analysis",
                 action=action,
                 description=description,
                 creator_id=user_id,
                 workspace_id=updated_analysis.workspace_id,
             )
-            db.add(workspace_history)
 
         db.commit()
         db.refresh(updated_analysis)
@@ -164,15 +162,14 @@ class AnalysisService(BaseService[Analysis, AnalysisCreate, AnalysisUpdate]):
         deleted_analysis = self.remove(db, id=analysis_id)
 
         # Create workspace history entry
-        workspace_history = WorkspaceHistory(
-            date=datetime.now(timezone.utc),
+        record_history(
+            db,
             action="Analysis deleted",
             phase="Data Analysis",
             description=f"Analysis '{analysis_name}' has been deleted",
             creator_id=user_id,
             workspace_id=workspace_id,
         )
-        db.add(workspace_history)
         db.commit()
 
         return deleted_analysis
@@ -207,15 +204,14 @@ class AnalysisService(BaseService[Analysis, AnalysisCreate, AnalysisUpdate]):
         deleted_analysis = self.remove(db, id=analysis_id)
 
         # Create workspace history entry
-        workspace_history = WorkspaceHistory(
-            date=datetime.now(timezone.utc),
+        record_history(
+            db,
             action="Analysis deleted",
             phase="Data Analysis",
             description=f"Analysis '{analysis_name}' has been deleted",
             creator_id=user_id,
             workspace_id=workspace_id,
         )
-        db.add(workspace_history)
         db.commit()
 
         return deleted_analysis
@@ -307,15 +303,14 @@ class AnalysisService(BaseService[Analysis, AnalysisCreate, AnalysisUpdate]):
         db.flush()
 
         # Crear historial
-        workspace_history = WorkspaceHistory(
-            date=datetime.now(timezone.utc),
+        record_history(
+            db,
             action="Analysis created",
             phase="Data Analysis",
             description=f"A new analysis has been created: '{db_obj.analysis_name}'",
             creator_id=user_id,
             workspace_id=obj_in.workspace_id,
         )
-        db.add(workspace_history)
         db.commit()
         db.refresh(db_obj)
 
@@ -3,24 +3,32 @@ Keycloak Authentication Service
 """
 
 from typing import Dict, Any, Optional
-import requests
+import httpx
 from fastapi import HTTPException, status
 
 from app.config.settings import settings
-from app.utils.keycloak import keycloak_handler
+from app.utils.keycloak import KEYCLOAK_REQUEST_SECONDS, keycloak_handler
 
 
 class AuthService:
     """
-    Keycloak Authentication Service
+    Keycloak Authentication Service.
+    Calls go through the shared async Keycloak client (pooled connections,
+    KEYCLOAK_HTTP_TIMEOUT), so a slow Keycloak never blocks a worker thread.
     """
-    
-    def authenticate(self, username: str, password: str) -> Dict[str, Any]:
+
+    @staticmethod
+    def _openid_path(endpoint: str) -> str:
+        return f"/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/{endpoint}"
+
+    async def _post(self, operation: str, endpoint: str, data: Dict[str, Any]) -> httpx.Response:
+        with KEYCLOAK_REQUEST_SECONDS.labels(operation).time():
+            return await keycloak_handler.async_http.post(self._openid_path(endpoint), data=data)
+
+    async def authenticate(self, username: str, password: str) -> Dict[str, Any]:
         """
         Authenticate a user with Keycloak using username and password
         """
-        url = f"{settings.KEYCLOAK_SERVER_URL}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/token"
-        
         data = {
             "client_id": settings.KEYCLOAK_CLIENT_ID,
             "client_secret": settings.KEYCLOAK_CLIENT_SECRET,
@@ -28,10 +36,10 @@ class AuthService:
             "username": username,
             "password": password
         }
-        
+
         try:
-            response = requests.post(url, data=data)
-            
+            response = await self._post("login", "token", data)
+
             if response.status_code == 200:
                 return response.json()
             else:
@@ -43,34 +51,32 @@ class AuthService:
                         detail = error_description
                 except:
                     pass
-                    
+
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail=detail,
                     headers={"WWW-Authenticate": "Bearer"}
                 )
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error connecting to authentication server: {str(e)}"
             )
-    
-    def refresh_token(self, refresh_token: str) -> Dict[str, Any]:
+
+    async def refresh_token(self, refresh_token: str) -> Dict[str, Any]:
         """
         Refresh a token using the refresh_token
         """
-        url = f"{settings.KEYCLOAK_SERVER_URL}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/token"
-        
         data = {
             "client_id": settings.KEYCLOAK_CLIENT_ID,
             "client_secret": settings.KEYCLOAK_CLIENT_SECRET,
             "grant_type": "refresh_token",
             "refresh_token": refresh_token
         }
-        
+
         try:
-            response = requests.post(url, data=data)
-            
+            response = await self._post("refresh_token", "token", data)
+
             if response.status_code == 200:
                 return response.json()
             else:
@@ -79,33 +85,31 @@ class AuthService:
                     detail="Error refreshing token",
                     headers={"WWW-Authenticate": "Bearer"}
                 )
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error connecting to authentication server: {str(e)}"
             )
-    
-    def logout(self, refresh_token: str) -> None:
+
+    async def logout(self, refresh_token: str) -> None:
         """
         Logout a user by invalidating the refresh token
         """
-        url = f"{settings.KEYCLOAK_SERVER_URL}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/logout"
-        
         data = {
             "client_id": settings.KEYCLOAK_CLIENT_ID,
             "client_secret": settings.KEYCLOAK_CLIENT_SECRET,
             "refresh_token": refresh_token
         }
-        
+
         try:
-            response = requests.post(url, data=data)
-            
+            response = await self._post("logout", "logout", data)
+
             if response.status_code != 204 and response.status_code != 200:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail="Error logging out"
                 )
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error connecting to authentication server: {str(e)}"
@@ -9,6 +9,7 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
+from app.db.unit_of_work import unit_of_work
 from app.models.base import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -29,9 +30,10 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
         """
-        Get a record by id.
+        Get a record by id. Served from the session's identity map when the
+        row was already loaded in this request.
         """
-        return db.query(self.model).filter(self.model.id == id).first()
+        return db.get(self.model, id)
 
     def get_multi(
         self, db: Session, *, skip: int = 0, limit: int = 100
@@ -47,9 +49,8 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)  # type: ignore
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        with unit_of_work(db):
+            db.add(db_obj)
         return db_obj
 
     def update(
@@ -67,19 +68,18 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        with unit_of_work(db):
+            for field in obj_data:
+                if field in update_data:
+                    setattr(db_obj, field, update_data[field])
+            db.add(db_obj)
         return db_obj
 
     def remove(self, db: Session, *, id: int) -> ModelType:
         """
         Remove a record.
         """
-        obj = db.query(self.model).get(id)
-        db.delete(obj)
-        db.commit()
+        obj = db.get(self.model, id)
+        with unit_of_work(db):
+            db.delete(obj)
         return obj
\ No newline at end of file
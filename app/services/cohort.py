@@ -7,12 +7,13 @@ from typing import List, Optional
 
 from sqlalchemy.orm import Session
 
+from app.db.unit_of_work import unit_of_work
 from app.models.cohort import Cohort
 from app.models.workspace import Workspace
 from app.models.analysis import Analysis
-from app.models.workspace_history import WorkspaceHistory
 from app.schemas.cohort import CohortCreate, CohortUpdate, CohortStatusUpdate
 from app.services.base import BaseService
+from app.services.workspace_history import record_history
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,7 +27,7 @@ class CohortService(BaseService[Cohort, CohortCreate, CohortUpdate]):
         """
         Create a new cohort and log the creation in the workspace history.
         """
-        try:
+        with unit_of_work(db):
 
             # Check if the workspace exists
 
@@ -53,25 +54,17 @@ class CohortService(BaseService[Cohort, CohortCreate, CohortUpdate]):
             obj_in_data["workspace_id"] = workspace_id
             db_obj = Cohort(**obj_in_data)
             db.add(db_obj)
-            db.commit()
-            db.refresh(db_obj)
 
             # Log the creation in the workspace history
-            history_entry = WorkspaceHistory(
+            record_history(
+                db,
                 workspace_id=workspace.id,
                 action="Create new cohort",
                 phase="Data Analysis / Cohort Builder",
                 creator_id=user_id,
-                date=datetime.now(timezone.utc),
                 description=f"A new cohort has been created: {db_obj.cohort_name}.",
             )
-            db.add(history_entry)
-            db.commit()
-            db.refresh(db_obj)
-            return db_obj
-        except Exception as e:
-            db.rollback()
-            raise
+        return db_obj
 
     def get_all_cohorts(
         self, db: Session, skip: int = 0, limit: int = 100
@@ -93,37 +86,35 @@ class CohortService(BaseService[Cohort, CohortCreate, CohortUpdate]):
         """
         Update the status of a cohort and log the change in workspace history.
         """
-        cohort = db.query(Cohort).filter(Cohort.id == cohort_id).first()
-        if not cohort:
-            raise ValueError(f"Cohort {cohort_id} not found")
-
-        # Update the cohort status
-        obj_in_data = obj_in.model_dump()
-        cohort.status = obj_in_data.get("status", cohort.status)
-        if not obj_in_data.get("update_date"):
-            cohort.update_date = datetime.now(timezone.utc)
-        db.add(cohort)
-        db.commit()
-
-        # Log the status change in the workspace history
-        workspace = (
-            db.query(Workspace).filter(Workspace.id == cohort.workspace_id).first()
-        )
-        if workspace:
-            history_entry = WorkspaceHistory(
-                workspace_id=workspace.id,
-                action="Cohort Status Updated",
-                phase="Data Analysis",
-                creator_id=user_id,
-                date=datetime.now(timezone.utc),
-                description=f"Cohort {cohort.id} status updated to {cohort.status}.",
-            )
-            db.add(history_entry)
-            db.commit()
-        else:
-            raise ValueError(
-                f"Workspace {cohort.workspace_id} not found for cohort {cohort_id}"
+        with unit_of_work(db):
+            cohort = db.query(Cohort).filter(Cohort.id == cohort_id).first()
+            if not cohort:
+                raise ValueError(f"Cohort {cohort_id} not found")
+
+            # Update the cohort status
+            obj_in_data = obj_in.model_dump()
+            cohort.status = obj_in_data.get("status", cohort.status)
+            if not obj_in_data.get("update_date"):
+                cohort.update_date = datetime.now(timezone.utc)
+            db.add(cohort)
+
+            # Log the status change in the workspace history
+            workspace = (
+                db.query(Workspace).filter(Workspace.id == cohort.workspace_id).first()
             )
+            if workspace:
+                record_history(
+                    db,
+                    workspace_id=workspace.id,
+                    action="Cohort Status Updated",
+                    phase="Data Analysis",
+                    creator_id=user_id,
+                    description=f"Cohort {cohort.id} status updated to {cohort.status}.",
+                )
+            else:
+                raise ValueError(
+                    f"Workspace {cohort.workspace_id} not found for cohort {cohort_id}"
+                )
 
         return cohort
 
@@ -133,39 +124,37 @@ class CohortService(BaseService[Cohort, CohortCreate, CohortUpdate]):
         """
         Update a cohort and log the change in workspace history.
         """
-        cohort = db.query(Cohort).filter(Cohort.id == cohort_id).first()
-        if not cohort:
-            raise ValueError(f"Cohort {cohort_id} not found")
+        with unit_of_work(db):
+            cohort = db.query(Cohort).filter(Cohort.id == cohort_id).first()
+            if not cohort:
+                raise ValueError(f"Cohort {cohort_id} not found")
 
-        # Update the cohort fields
-        for field, value in obj_in.model_dump(exclude_unset=True).items():
-            setattr(cohort, field, value)
+            # Update the cohort fields
+            for field, value in obj_in.model_dump(exclude_unset=True).items():
+                setattr(cohort, field, value)
 
-        if not obj_in.update_date:
-            cohort.update_date = datetime.now(timezone.utc)
+            if not obj_in.update_date:
+                cohort.update_date = datetime.now(timezone.utc)
 
-        db.add(cohort)
-        db.commit()
+            db.add(cohort)
 
-        # Log the update in the workspace history
-        workspace = (
-            db.query(Workspace).filter(Workspace.id == cohort.workspace_id).first()
-        )
-        if workspace:
-            history_entry = WorkspaceHistory(
-                workspace_id=workspace.id,
-                action="Cohort Updated",
-                phase="Data Analysis",
-                creator_id=user_id,
-                date=datetime.now(timezone.utc),
-                description=f"Cohort {cohort.id} updated.",
-            )
-            db.add(history_entry)
-            db.commit()
-        else:
-            raise ValueError(
-                f"Workspace {cohort.workspace_id} not found for cohort {cohort_id}"
+            # Log the update in the workspace history
+            workspace = (
+                db.query(Workspace).filter(Workspace.id == cohort.workspace_id).first()
             )
+            if workspace:
+                record_history(
+                    db,
+                    workspace_id=workspace.id,
+                    action="Cohort Updated",
+                    phase="Data Analysis",
+                    creator_id=user_id,
+                    description=f"Cohort {cohort.id} updated.",
+                )
+            else:
+                raise ValueError(
+                    f"Workspace {cohort.workspace_id} not found for cohort {cohort_id}"
+                )
 
         return cohort
 
@@ -173,32 +162,31 @@ class CohortService(BaseService[Cohort, CohortCreate, CohortUpdate]):
         """
         Delete a cohort and log the deletion in the workspace history.
         """
-        cohort = db.query(Cohort).filter(Cohort.id == cohort_id).first()
-        if not cohort:
-            raise ValueError(f"Cohort {cohort_id} not found")
+        with unit_of_work(db):
+            cohort = db.query(Cohort).filter(Cohort.id == cohort_id).first()
+            if not cohort:
+                raise ValueError(f"Cohort {cohort_id} not found")
 
-        db.delete(cohort)
-        db.commit()
+            db.delete(cohort)
 
-        # Log the deletion in the workspace history
-        workspace = (
-            db.query(Workspace).filter(Workspace.id == cohort.workspace_id).first()
-        )
-        if workspace:
-            history_entry = WorkspaceHistory(
-                workspace_id=workspace.id,
-                action="Cohort Deleted",
-                phase="Data Analysis",
-                creator_id=user_id,
-                date=datetime.now(timezone.utc),
-                description=f"Cohort {cohort.id} deleted.",
-            )
-            db.add(history_entry)
-            db.commit()
-        else:
-            raise ValueError(
-                f"Workspace {cohort.workspace_id} not found for cohort {cohort_id}"
+            # Log the deletion in the workspace history
+            workspace = (
+                db.query(Workspace).filter(Workspace.id == cohort.workspace_id).first()
             )
+            if workspace:
+                record_history(
+                    db,
+                    workspace_id=workspace.id,
+                    action="Cohort Deleted",
+                    phase="Data Analysis",
+                    creator_id=user_id,
+                    description=f"Cohort {cohort.id} deleted.",
+                )
+            else:
+                raise ValueError(
+                    f"Workspace {cohort.workspace_id} not found for cohort {cohort_id}"
+                )
+
         return None
 
     def get_cohort_by_id(self, db: Session, cohort_id: int) -> Optional[Cohort]:
@@ -231,7 +219,7 @@ class CohortService(BaseService[Cohort, CohortCreate, CohortUpdate]):
         """
         Create a new cohort and log the creation in the workspace history.
         """
-        try:
+        with unit_of_work(db):
 
             analysis = (
                 db.query(Analysis).filter(Analysis.id == obj_in.analysis_id).first()
@@ -261,23 +249,15 @@ class CohortService(BaseService[Cohort, CohortCreate, CohortUpdate]):
             )
             db_obj = Cohort(**obj_in_data)
             db.add(db_obj)
-            db.commit()
-            db.refresh(db_obj)
 
             # Log the creation in the workspace history
-            history_entry = WorkspaceHistory(
+            record_history(
+                db,
                 workspace_id=workspace.id,
                 action="Create new cohort",
                 phase="Data Analysis / Cohort Builder",
                 creator_id=user_id,
-                date=datetime.now(timezone.utc),
                 description=f"A new cohort has been created: {db_obj.cohort_name}.",
             )
-            db.add(history_entry)
-            db.commit()
-            db.refresh(db_obj)
-
-            return db_obj
-        except Exception as e:
-            db.rollback()
-            raise
+
+        return db_obj
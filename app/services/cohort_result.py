@@ -5,18 +5,23 @@ Service for cohort result operations
 from typing import Any, List, Optional, Set
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import datetime, timezone
 import logging
 
+from app.db.loader import get_loader
+from app.db.unit_of_work import checkpoint, unit_of_work
 from app.models.cohort_result import CohortResult
+from app.models.cohort_result_execution import CohortResultExecution
+from app.models.cohort_coe_response import CohortCoeResponse
 from app.models.cohort import Cohort
-from app.models.analysis import Analysis
-from app.models.algorithm import Algorithm
+from app.models.algorithm import Algorithm, refresh_cohort_signatures
 from app.models.cohort_algorithm import CohortAlgorithm
-from app.models.metadata_search import MetadataSearch
-from app.models.permit import Permit
-from app.models.workspace import Workspace
-from app.schemas.cohort_result import CohortResultCreate, CohortResultUpdate
+from app.schemas.cohort_result import (
+    CohortResultCreate,
+    CohortResultUpdate,
+    ExecutionEntry,
+)
 from app.services.base import BaseService
 from app.services.vantage_6 import vantage6_service
 from app.utils.constants import (
@@ -24,7 +29,6 @@ from app.utils.constants import (
     typeOfDiseases,
     COE_TOKEN_MAP,
     COE_TOKEN_ORG_MAP,
-    PermitStatus,
 )
 from app.utils.metrics_logger import log_event
 
@@ -39,14 +43,7 @@ class CohortResultService(
 
     def _get_expected_coes(self, db: Session, cohort: Cohort) -> Set[str]:
         """Get COE center names expected from the granted permit for this workspace."""
-        permit = (
-            db.query(Permit)
-            .filter(
-                Permit.workspace_id == cohort.workspace_id,
-                Permit.status == PermitStatus.GRANTED,
-            )
-            .first()
-        )
+        permit = get_loader(db).granted_permit(cohort.workspace_id)
         if not permit or not permit.coes_granted:
             return set()
         return set(permit.coes_granted)
@@ -72,6 +69,7 @@ class CohortResultService(
             CohortAlgorithm.cohort_id == cohort_id
         ).delete()
 
+        relinked_ids = []
         for alg_id in algorithm_ids:
             still_linked = (
                 db.query(CohortAlgorithm)
@@ -80,52 +78,193 @@ class CohortResultService(
             )
             if still_linked == 0:
                 db.query(Algorithm).filter(Algorithm.id == alg_id).delete()
+            else:
+                relinked_ids.append(alg_id)
+        refresh_cohort_signatures(db, relinked_ids)
 
-        db.commit()
+        db.flush()
         logger.info(
             "[CREATE_COHORT_RESULT] Deleted all analyses for cohort_id=%s (count=%d)",
             cohort_id,
             len(algorithm_ids),
         )
 
-    def _collect_patient_ids_from_jsonb(self, executions: list) -> List[int]:
-        ids: List[int] = []
-        for entry in executions or []:
-            ids.extend(entry.get("patient_ids", []))
-        return list(dict.fromkeys(ids))
+    def _store_executions(
+        self,
+        db: Session,
+        *,
+        cohort_id: int,
+        token: str,
+        entries: list,
+        received_at: datetime,
+    ) -> dict[str, int]:
+        """Replace the executions stored for one CoE token.
+        Only the rows of this token are touched; other CoEs are not rewritten.
+        Returns how many patients were retained/added/removed compared with
+        the previous run of the same token.
+        """
+        from app.utils.patient_ids import as_text_ids, compare_runs, merge_unique
+
+        previous_ids = merge_unique(
+            *(
+                ids
+                for _, ids in self._stored_patient_ids(
+                    db, cohort_id=cohort_id, token=token
+                )
+            )
+        )
+
+        executions = [
+            (e, merge_unique(as_text_ids(e.patient_ids), keep_order=True))
+            for e in entries
+        ]
+
+        db.query(CohortResultExecution).filter(
+            CohortResultExecution.cohort_id == cohort_id,
+            CohortResultExecution.token == token,
+        ).delete(synchronize_session=False)
+
+        db.add_all(
+            [
+                CohortResultExecution(
+                    cohort_id=cohort_id,
+                    token=token,
+                    execution_date=e.execution_date,
+                    received_at=received_at,
+                    patient_ids=ids.tolist(),
+                )
+                for e, ids in executions
+            ]
+        )
+        db.flush()
+
+        return compare_runs(
+            previous_ids, merge_unique(*(ids for _, ids in executions))
+        )
+
+    def _replace_coe_executions(
+        self,
+        db: Session,
+        *,
+        cohort_id: int,
+        coe: str,
+        token: str,
+        entries: list,
+    ) -> dict[str, int]:
+        """Store a CoE's executions and update its cohort_coe_responses row."""
+        now_utc = datetime.now(timezone.utc)
+        run_delta = self._store_executions(
+            db,
+            cohort_id=cohort_id,
+            token=token,
+            entries=entries,
+            received_at=now_utc,
+        )
+        self._record_coe_response(
+            db,
+            cohort_id=cohort_id,
+            coe=coe,
+            token=token,
+            responded_at=now_utc,
+            patient_count=run_delta["retained"] + run_delta["added"],
+            last_execution_date=max(
+                (e.execution_date for e in entries if e.execution_date), default=None
+            ),
+        )
+        return run_delta
+
+    def _record_coe_response(
+        self,
+        db: Session,
+        *,
+        cohort_id: int,
+        coe: str,
+        token: str,
+        responded_at: datetime,
+        patient_count: int,
+        last_execution_date: Optional[str],
+    ) -> None:
+        """Upsert the CoE's row in the cohort_coe_responses projection."""
+        values = {
+            "token": token,
+            "responded_at": responded_at,
+            "patient_count": patient_count,
+            "last_execution_date": last_execution_date,
+        }
+        stmt = pg_insert(CohortCoeResponse).values(
+            cohort_id=cohort_id, coe=coe, **values
+        )
+        db.execute(
+            stmt.on_conflict_do_update(
+                constraint="uq_cohort_coe_responses_cohort_coe", set_=values
+            )
+        )
+
+    def get_coe_responses(
+        self, db: Session, *, cohort: Cohort
+    ) -> dict[str, Any]:
+        """Responded/missing CoEs of a cohort, read from the projection."""
+        rows = (
+            db.query(CohortCoeResponse.coe, CohortCoeResponse.patient_count)
+            .filter(CohortCoeResponse.cohort_id == cohort.id)
+            .all()
+        )
+        patient_counts = {coe: patient_count for coe, patient_count in rows}
+        expected = self._get_expected_coes(db, cohort)
+        missing = expected - patient_counts.keys()
+        return {
+            "responded": sorted(patient_counts),
+            "missing": sorted(missing),
+            "patient_counts": patient_counts,
+            "counts": {
+                "responded": len(patient_counts),
+                "missing": len(missing),
+                "expected": len(expected),
+            },
+        }
+
+    def _stored_patient_ids(
+        self, db: Session, *, cohort_id: int, token: Optional[str] = None
+    ) -> List[tuple]:
+        """(token, patient_ids) of the stored executions, in arrival order."""
+        query = db.query(
+            CohortResultExecution.token, CohortResultExecution.patient_ids
+        ).filter(CohortResultExecution.cohort_id == cohort_id)
+        if token is not None:
+            query = query.filter(CohortResultExecution.token == token)
+        return query.order_by(CohortResultExecution.id).all()
 
     def _collect_patient_ids_for_cohort(
         self, db: Session, *, cohort_id: int
-    ) -> List[int]:
-        cohort_result = (
-            db.query(CohortResult).filter(CohortResult.cohort_id == cohort_id).first()
-        )
-        if not cohort_result or not cohort_result.data_id:
-            return []
-        return self._collect_patient_ids_from_jsonb(cohort_result.data_id)
+    ) -> List[Any]:
+        """Distinct patient ids of the cohort, in first-seen order."""
+        from app.utils.patient_ids import from_text_ids, merge_unique
+
+        rows = self._stored_patient_ids(db, cohort_id=cohort_id)
+        ids = merge_unique(*(ids for _, ids in rows), keep_order=True)
+        return from_text_ids(ids.tolist())
 
     def _collect_patient_ids_by_org(
         self, db: Session, *, cohort_id: int
-    ) -> dict[int, List[int]]:
+    ) -> dict[int, List[Any]]:
         """Build {v6_org_id: [patient_ids]} from stored executions.
         Only includes centers that have a V6 node in COE_TOKEN_ORG_MAP.
-        Multiple executions from the same center are merged and deduplicated.
+        Multiple executions from the same center are merged and deduplicated,
+        keeping the first-seen order and the type each id was sent with.
         """
-        cohort_result = (
-            db.query(CohortResult).filter(CohortResult.cohort_id == cohort_id).first()
-        )
-        if not cohort_result or not cohort_result.data_id:
-            return {}
+        from app.utils.patient_ids import from_text_ids, merge_unique
 
-        org_patient_ids: dict[int, List[int]] = {}
-        for entry in cohort_result.data_id:
-            token = entry.get("token")
+        ids_by_org: dict[int, list] = {}
+        for token, ids in self._stored_patient_ids(db, cohort_id=cohort_id):
             org_id = COE_TOKEN_ORG_MAP.get(token)
-            if org_id is None:
+            if org_id is None or not ids:
                 continue
-            existing = org_patient_ids.get(org_id, [])
-            all_ids = existing + entry.get("patient_ids", [])
-            org_patient_ids[org_id] = list(dict.fromkeys(all_ids))
+            ids_by_org.setdefault(org_id, []).append(ids)
+
+        org_patient_ids: dict[int, List[Any]] = {
+            org_id: from_text_ids(merge_unique(*id_sets, keep_order=True).tolist())
+            for org_id, id_sets in ids_by_org.items()
+        }
 
         logger.info(
             "[COLLECT_PATIENT_IDS_BY_ORG] For cohort_id=%s collected patient IDs by org: %s",
@@ -141,12 +280,36 @@ class CohortResultService(
         cohort: Cohort,
         access_token: str,
     ) -> None:
-        cohort.status = CohortStatus.EXECUTED.value
-        db.add(cohort)
-        db.commit()
-        db.refresh(cohort)
+        with unit_of_work(db):
+            cohort.status = CohortStatus.EXECUTED.value
+            db.add(cohort)
+        try:
+            # A failure here must not lose the ingested results.
+            with unit_of_work(db, savepoint=True):
+                request = self._v6_dataframe_request(db, cohort=cohort)
+        finally:
+            # The results and the new status are committed before the V6
+            # round-trip, which is the only part run outside a transaction;
+            # the ids it returns commit with the rest of the request.
+            checkpoint(db)
 
-        analysis = db.query(Analysis).filter(Analysis.id == cohort.analysis_id).first()
+        createDataFrameResponse = vantage6_service.create_new_cohort(
+            db=db, access_token=access_token, **request
+        )
+
+        if createDataFrameResponse.dataframe_id in (None, -1):
+            raise RuntimeError("Failed to create cohort in Vantage6")
+
+        with unit_of_work(db):
+            cohort.dataframe_vantage_id = createDataFrameResponse.dataframe_id
+            cohort.task_id_vantage = createDataFrameResponse.task_id
+            cohort.vantage6_cohort_name = createDataFrameResponse.cohort_name
+            db.add(cohort)
+
+    def _v6_dataframe_request(self, db: Session, *, cohort: Cohort) -> dict:
+        """Arguments of ``create_new_cohort`` for the cohort, read from the DB."""
+        loader = get_loader(db)
+        analysis = loader.analysis(cohort.analysis_id)
         if not analysis:
             raise ValueError(
                 f"Analysis {cohort.analysis_id} not found for cohort {cohort.id}"
@@ -157,11 +320,7 @@ class CohortResultService(
                 f"Analysis {analysis.id} does not have a Vantage6 session ID"
             )
 
-        metadata = (
-            db.query(MetadataSearch)
-            .filter(MetadataSearch.workspace_id == cohort.workspace_id)
-            .first()
-        )
+        metadata = loader.metadata_search(cohort.workspace_id)
         if not metadata:
             raise ValueError(f"Metadata for workspace {cohort.workspace_id} not found")
 
@@ -189,31 +348,19 @@ class CohortResultService(
             analysis.session_id_vantage,
         )
 
-        workspace = (
-            db.query(Workspace).filter(Workspace.id == cohort.workspace_id).first()
-        )
+        workspace = loader.workspace(cohort.workspace_id)
         # study_id = workspace.v6_study_id if workspace else None
 
-        createDataFrameResponse = vantage6_service.create_new_cohort(
-            db=db,
-            access_token=access_token,
-            session_id=analysis.session_id_vantage,
-            features=features,
-            patient_ids_by_org=patient_ids_by_org,
-            workspace_id=workspace.id,
-            cohort_name=cohort.cohort_name,
-        )
-
-        if createDataFrameResponse.dataframe_id in (None, -1):
-            raise RuntimeError("Failed to create cohort in Vantage6")
-
-        cohort.dataframe_vantage_id = createDataFrameResponse.dataframe_id
-        cohort.task_id_vantage = createDataFrameResponse.task_id
-        cohort.vantage6_cohort_name = createDataFrameResponse.cohort_name
-
-        db.add(cohort)
-        db.commit()
-        db.refresh(cohort)
+        return {
+            "authorized_org_ids": vantage6_service.get_authorized_org_ids(
+                db=db, workspace_id=workspace.id
+            ),
+            "session_id": analysis.session_id_vantage,
+            "features": features,
+            "patient_ids_by_org": patient_ids_by_org,
+            "workspace_id": workspace.id,
+            "cohort_name": cohort.cohort_name,
+        }
 
     def get_by_cohort_and_data_id(
         self, db: Session, *, cohort_id: int, data_id: list
@@ -278,11 +425,31 @@ class CohortResultService(
     def create_for_cohort(
         self, db: Session, *, obj_in: CohortResultCreate, access_token: str
     ) -> Optional[CohortResult]:
+        # The ingest is committed on its own so a failing V6 call does not
+        # lose the CoE's results; the dataframe step is a second unit.
+        with unit_of_work(db):
+            ingested = self._ingest_result(db, obj_in=obj_in)
+        if ingested is None:
+            return None
+        db_obj, cohort = ingested
+
+        self._maybe_create_dataframe(
+            db, cohort=cohort, data_id=db_obj.data_id, access_token=access_token
+        )
+        logger.info("[CREATE_COHORT_RESULT] END OK cohort_id=%s", obj_in.cohort_id)
+
+        return db_obj
+
+    def _ingest_result(
+        self, db: Session, *, obj_in: CohortResultCreate
+    ) -> Optional[tuple[CohortResult, Cohort]]:
+        """Store one CoE submission and update the cohort status (flush only)."""
         # logger.info(
         #     "[CREATE_COHORT_RESULT] START - full payload: %s", obj_in.model_dump()
         # )
 
-        cohort = db.query(Cohort).filter(Cohort.id == obj_in.cohort_id).first()
+        loader = get_loader(db)
+        cohort = loader.cohort(obj_in.cohort_id)
         if not cohort:
             logger.error("[CREATE_COHORT_RESULT] Cohort %s not found", obj_in.cohort_id)
             raise ValueError(f"Cohort with ID {obj_in.cohort_id} not found")
@@ -310,11 +477,7 @@ class CohortResultService(
             )
             raise ValueError(f"Unknown CoE token: {token}")
 
-        metadata = (
-            db.query(MetadataSearch)
-            .filter(MetadataSearch.workspace_id == cohort.workspace_id)
-            .first()
-        )
+        metadata = loader.metadata_search(cohort.workspace_id)
         disease_type = metadata.type_cancer if metadata else None
         expected_coes = self._get_expected_coes(db, cohort)
         if expected_coes and center not in expected_coes:
@@ -357,19 +520,20 @@ class CohortResultService(
         #         len(e.patient_ids),
         #     )
 
-        now_utc = datetime.now(timezone.utc)
-        now_iso = now_utc.isoformat()
-        new_executions = [
-            {
-                "token": token,
-                "execution_date": e.execution_date,
-                "patient_ids": e.patient_ids,
-                "received_at": now_iso,
-            }
-            for e in entries
-        ]
+        # Patient ids live in cohort_result_executions; data_id is derived
+        # from them (see CohortResult.data_id), so only this CoE's rows are
+        # written.
+        run_delta = self._replace_coe_executions(
+            db,
+            cohort_id=obj_in.cohort_id,
+            coe=center,
+            token=token,
+            entries=entries,
+        )
+        # Distinct patients of this submission, as stored (ids repeated in
+        # or across the CoE's executions count once).
+        total_patients = run_delta["retained"] + run_delta["added"]
 
-        total_patients = sum(len(e.patient_ids) for e in entries)
         log_event(
             "coe_result",
             "received",
@@ -378,32 +542,23 @@ class CohortResultService(
             cohort_size=total_patients,
             workspace_id=cohort.workspace_id,
             disease_type=disease_type,
+            extra={"previous_run": run_delta},
         )
 
-        existing = self.get_by_cohort_last(db, cohort_id=obj_in.cohort_id)
-        if existing:
-            current = existing.data_id or []
-            filtered = [e for e in current if e.get("token") != token]
-
+        db_obj = self.get_by_cohort_last(db, cohort_id=obj_in.cohort_id)
+        if db_obj:
             logger.info(
                 "[CREATE_COHORT_RESULT] Replacing data for token '%s' in record id=%s",
                 token,
-                existing.id,
+                db_obj.id,
             )
-
-            # upsert lógico: reemplazar por las nuevas ejecuciones
-            existing.data_id = filtered + new_executions
-
-            db.add(existing)
-            db.commit()
-            db.refresh(existing)
-            db_obj = existing
+            # Reload the manifest with this CoE's new executions.
+            db.expire(db_obj, ["data_id"])
         else:
             logger.info("[CREATE_COHORT_RESULT] Creating new CohortResult record")
-            db_obj = CohortResult(cohort_id=obj_in.cohort_id, data_id=new_executions)
+            db_obj = CohortResult(cohort_id=obj_in.cohort_id)
             db.add(db_obj)
-            db.commit()
-            db.refresh(db_obj)
+            db.flush()
 
         total_entries = len(db_obj.data_id or [])
 
@@ -450,20 +605,15 @@ class CohortResultService(
                 )
 
         db.add(cohort)
-        db.commit()
+        db.flush()
         logger.info(
             "[CREATE_COHORT_RESULT] Saved OK cohort_id=%s token=%s executions=%d total_stored=%d",
             obj_in.cohort_id,
             token,
-            len(new_executions),
+            len(entries),
             len(db_obj.data_id),
         )
-        self._maybe_create_dataframe(
-            db, cohort=cohort, data_id=db_obj.data_id, access_token=access_token
-        )
-        logger.info("[CREATE_COHORT_RESULT] END OK cohort_id=%s", obj_in.cohort_id)
-
-        return db_obj
+        return db_obj, cohort
 
     def update_cohort_result(
         self,
@@ -481,13 +631,27 @@ class CohortResultService(
                 f"CohortResult with cohort_id={cohort_id} and data_id={data_id} not found"
             )
 
-        update_data = obj_in.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_obj, field, value)
-
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        # data_id is derived from the executions: an update replaces the
+        # executions of each CoE token it contains, as a submission does.
+        executions = obj_in.model_dump(exclude_unset=True).get("data_id")
+        if executions is None:
+            return db_obj
+        if not isinstance(executions, dict):
+            raise ValueError("data_id must map CoE tokens to their executions")
+
+        with unit_of_work(db):
+            for token, entries in executions.items():
+                coe = COE_TOKEN_MAP.get(token)
+                if coe is None:
+                    raise ValueError(f"Unknown CoE token: {token}")
+                self._replace_coe_executions(
+                    db,
+                    cohort_id=cohort_id,
+                    coe=coe,
+                    token=token,
+                    entries=[ExecutionEntry.model_validate(e) for e in entries],
+                )
+            db.expire(db_obj, ["data_id"])
         return db_obj
 
     def delete_cohort_result(
@@ -501,19 +665,38 @@ class CohortResultService(
                 f"CohortResult with cohort_id={cohort_id} and data_id={data_id} not found"
             )
 
-        db.delete(db_obj)
-        db.commit()
+        tokens = {e.get("token") for e in (db_obj.data_id or []) if e.get("token")}
+        # The projection has one row per CoE, whichever token it last used.
+        coes = {COE_TOKEN_MAP[t] for t in tokens if t in COE_TOKEN_MAP}
+        with unit_of_work(db):
+            if tokens:
+                db.query(CohortResultExecution).filter(
+                    CohortResultExecution.cohort_id == cohort_id,
+                    CohortResultExecution.token.in_(tokens),
+                ).delete(synchronize_session=False)
+            if coes:
+                db.query(CohortCoeResponse).filter(
+                    CohortCoeResponse.cohort_id == cohort_id,
+                    CohortCoeResponse.coe.in_(coes),
+                ).delete(synchronize_session=False)
+            db.delete(db_obj)
         return True
 
     def delete_all_for_cohort(self, db: Session, *, cohort_id: int) -> int:
-        cohort = db.query(Cohort).filter(Cohort.id == cohort_id).first()
+        cohort = get_loader(db).cohort(cohort_id)
         if not cohort:
             raise ValueError(f"Cohort with ID {cohort_id} not found")
 
-        deleted_count = (
-            db.query(self.model).filter(self.model.cohort_id == cohort_id).delete()
-        )
-        db.commit()
+        with unit_of_work(db):
+            deleted_count = (
+                db.query(self.model).filter(self.model.cohort_id == cohort_id).delete()
+            )
+            db.query(CohortResultExecution).filter(
+                CohortResultExecution.cohort_id == cohort_id
+            ).delete(synchronize_session=False)
+            db.query(CohortCoeResponse).filter(
+                CohortCoeResponse.cohort_id == cohort_id
+            ).delete(synchronize_session=False)
         return deleted_count
 
     def get_data_ids_for_cohort(self, db: Session, *, cohort_id: int) -> List[Any]:
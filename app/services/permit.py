@@ -11,9 +11,9 @@ from sqlalchemy import func
 
 from app.models.permit import Permit
 from app.models.workspace import Workspace
-from app.models.workspace_history import WorkspaceHistory
 from app.schemas.permit import PermitCreate, PermitUpdate
 from app.services.base import BaseService
+from app.services.workspace_history import record_history
 from app.utils.constants import PermitStatus, DataAccessStatus
 
 logger = logging.getLogger(__name__)
@@ -58,15 +58,14 @@ class PermitService(BaseService[Permit, PermitCreate, PermitUpdate]):
         else:
             description = f"A new permit with status {db_obj.status} has been created"
 
-        workspace_history = WorkspaceHistory(
-            date=datetime.now(timezone.utc),
+        record_history(
+            db,
             action=action,
             phase="Data Permit",
             description=description,
             creator_id=user_id,
             workspace_id=obj_in.workspace_id,
         )
-        db.add(workspace_history)
         db.commit()
         db.refresh(db_obj)
 
@@ -134,17 +133,15 @@ class PermitService(BaseService[Permit, PermitCreate, PermitUpdate]):
             workspace.update_date = datetime.now(timezone.utc)
             db.add(workspace)
 
-        workspace_history = WorkspaceHistory(
-            date=datetime.now(timezone.utc),
+        record_history(
+            db,
             action=action,
             phase="Data Permit",
             description=description,
             creator_id=user_id,
             workspace_id=permit.workspace_id,
         )
-        db.add(workspace_history)
         db.commit()
-        db.refresh(workspace_history)
 
         return updated_permit
 
@@ -261,15 +258,14 @@ class PermitService(BaseService[Permit, PermitCreate, PermitUpdate]):
                 action = f"Permit updated"
                 description = f"Updated permit fields: {', '.join(changes)}"
 
-            workspace_history = WorkspaceHistory(
-                date=datetime.now(timezone.utc),
+            record_history(
+                db,
                 phase="Data Permit",
                 action=action,
                 description=description,
                 creator_id=user_id,
                 workspace_id=updated_permit.workspace_id,
             )
-            db.add(workspace_history)
 
             logger.info(f"[PERMIT] Permit update history: {action} - {description}")
             logger.info(
@@ -317,15 +313,14 @@ class PermitService(BaseService[Permit, PermitCreate, PermitUpdate]):
         deleted_permit = self.remove(db, id=permit_id)
 
         # Create workspace history entry
-        workspace_history = WorkspaceHistory(
-            date=datetime.now(timezone.utc),
+        record_history(
+            db,
             action=f"Permit deleted (was status {permit_status})",
             phase="Data Permit",
             description=f"A permit with status {permit_status} has been deleted",
             creator_id=user_id,
             workspace_id=workspace_id,
         )
-        db.add(workspace_history)
         db.commit()
 
         return deleted_permit
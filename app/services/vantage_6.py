@@ -6,21 +6,18 @@ Handles study registration and related orchestration
 from asyncio import tasks
 import base64
 import json
+import orjson
 from app import db
 from app.models import cohort
 from app.models import algorithm
 from app.models import workspace
-import requests
 import time
 import logging
-import pandas as pd
-import numpy as np
 
 from app.models.workspace import Workspace
 from app.models.algorithm import Algorithm
 from app.models.cohort import Cohort
 from app.models.cohort_algorithm import CohortAlgorithm
-from app.models.permit import Permit
 from datetime import datetime, timezone, timedelta
 from typing import Any, Optional, List
 import httpx
@@ -30,6 +27,8 @@ import asyncio
 logger = logging.getLogger(__name__)
 from sqlalchemy.orm import Session
 
+from app.db.loader import get_loader
+from app.utils.logging_config import LazyJSON
 from app.services.base import BaseService
 from app.schemas.data_preparation import (
     CrosstabPreparationRequest,
@@ -67,7 +66,6 @@ from app.utils.constants import (
     COLLABORATION_ID,
     ORGANIZATION_IDS,
     ALGORITHMS,
-    PermitStatus,
 )
 
 
@@ -378,9 +376,9 @@ class Vantage6Service(
                 }
 
             logger.info(
-                "[V6_get_organizations] All organizations: %s after API fetch %s",
-                organizations,
+                "[V6_get_organizations] All organizations: %s after API fetch "
                 "%s/organization?collaboration_id=%s",
+                organizations,
                 self.base_url,
                 collaboration_id,
             )
@@ -591,7 +589,7 @@ class Vantage6Service(
         )
 
         authorized_org_ids = None
-        authorized_org_ids = self._get_authorized_org_ids(
+        authorized_org_ids = self.get_authorized_org_ids(
             db=db,
             workspace_id=workspace_id,
         )
@@ -623,9 +621,7 @@ class Vantage6Service(
             db.query(Cohort).filter(Cohort.dataframe_vantage_id == dataframe_id).first()
         )
         if cohort:
-            workspace = (
-                db.query(Workspace).filter(Workspace.id == cohort.workspace_id).first()
-            )
+            workspace = get_loader(db).workspace(cohort.workspace_id)
             if workspace and workspace.v6_study_id:
 
                 return workspace.v6_study_id
@@ -909,6 +905,7 @@ class Vantage6Service(
         patient_ids_by_org: dict,
         workspace_id: int,
         cohort_name: str,
+        authorized_org_ids: Optional[set[int]] = None,
     ) -> V6CreateDataFrame:
         """
         Crea una nuevo cohort en Vantage 6
@@ -931,6 +928,7 @@ class Vantage6Service(
             access_token=access_token,
             db=db,
             workspace_id=workspace_id,
+            authorized_org_ids=authorized_org_ids,
         )
 
         logger.info("[V6] Retrieved organization IDs for cohort creation: %s", org_ids)
@@ -1082,32 +1080,20 @@ class Vantage6Service(
             return
 
         # Verificar que el workspace existe
-        workspace = (
-            db.query(Workspace)
-            .filter(Workspace.id == data_preparation_in.workspace_id)
-            .first()
-        )
+        workspace = get_loader(db).workspace(data_preparation_in.workspace_id)
         if not workspace:
             raise ValueError(
                 f"Workspace with id {data_preparation_in.workspace_id} not found"
             )
 
         # Verificar que el analysis existe
-        analysis = (
-            db.query(Analysis)
-            .filter(Analysis.id == data_preparation_in.analysis_id)
-            .first()
-        )
+        analysis = get_loader(db).analysis(data_preparation_in.analysis_id)
         if not analysis:
             raise ValueError(
                 f"Analysis with id {data_preparation_in.analysis_id} not found"
             )
 
-        cohorts = (
-            db.query(Cohort)
-            .filter(Cohort.id.in_(data_preparation_in.cohorts_ids))
-            .all()
-        )
+        cohorts = get_loader(db).cohorts(data_preparation_in.cohorts_ids)
         if not cohorts:
             raise ValueError("No cohorts found for the provided IDs")
 
@@ -1245,32 +1231,20 @@ class Vantage6Service(
             return
 
         # Verificar que el workspace existe
-        workspace = (
-            db.query(Workspace)
-            .filter(Workspace.id == crosstab_preparation_in.workspace_id)
-            .first()
-        )
+        workspace = get_loader(db).workspace(crosstab_preparation_in.workspace_id)
         if not workspace:
             raise ValueError(
                 f"Workspace with id {crosstab_preparation_in.workspace_id} not found"
             )
 
         # Verificar que el analysis existe
-        analysis = (
-            db.query(Analysis)
-            .filter(Analysis.id == crosstab_preparation_in.analysis_id)
-            .first()
-        )
+        analysis = get_loader(db).analysis(crosstab_preparation_in.analysis_id)
         if not analysis:
             raise ValueError(
                 f"Analysis with id {crosstab_preparation_in.analysis_id} not found"
             )
 
-        cohorts = (
-            db.query(Cohort)
-            .filter(Cohort.id.in_(crosstab_preparation_in.cohorts_ids))
-            .all()
-        )
+        cohorts = get_loader(db).cohorts(crosstab_preparation_in.cohorts_ids)
         if not cohorts:
             raise ValueError("No cohorts found for the provided IDs")
 
@@ -1400,20 +1374,16 @@ class Vantage6Service(
             return
 
         # Verificar que el workspace existe
-        workspace = (
-            db.query(Workspace).filter(Workspace.id == t_test_in.workspace_id).first()
-        )
+        workspace = get_loader(db).workspace(t_test_in.workspace_id)
         if not workspace:
             raise ValueError(f"Workspace with id {t_test_in.workspace_id} not found")
 
         # Verificar que el analysis existe
-        analysis = (
-            db.query(Analysis).filter(Analysis.id == t_test_in.analysis_id).first()
-        )
+        analysis = get_loader(db).analysis(t_test_in.analysis_id)
         if not analysis:
             raise ValueError(f"Analysis with id {t_test_in.analysis_id} not found")
 
-        cohorts = db.query(Cohort).filter(Cohort.id.in_(t_test_in.cohorts_ids)).all()
+        cohorts = get_loader(db).cohorts(t_test_in.cohorts_ids)
         if not cohorts:
             raise ValueError("No cohorts found for the provided IDs")
 
@@ -1978,9 +1948,7 @@ class Vantage6Service(
                         structured_results["_log"].append(log)
                     continue
 
-                decoded_json = json.loads(
-                    base64.b64decode(encoded_payload).decode("UTF-8")
-                )
+                decoded_json = orjson.loads(base64.b64decode(encoded_payload))
 
                 for node_name, node_data in decoded_json.items():
 
@@ -2020,19 +1988,15 @@ class Vantage6Service(
             logger.warning("External data_preparation URL not configured")
             return
 
-        workspace = (
-            db.query(Workspace).filter(Workspace.id == coxph_in.workspace_id).first()
-        )
+        workspace = get_loader(db).workspace(coxph_in.workspace_id)
         if not workspace:
             raise ValueError(f"Workspace with id {coxph_in.workspace_id} not found")
 
-        analysis = (
-            db.query(Analysis).filter(Analysis.id == coxph_in.analysis_id).first()
-        )
+        analysis = get_loader(db).analysis(coxph_in.analysis_id)
         if not analysis:
             raise ValueError(f"Analysis with id {coxph_in.analysis_id} not found")
 
-        cohorts = db.query(Cohort).filter(Cohort.id.in_(coxph_in.cohorts_ids)).all()
+        cohorts = get_loader(db).cohorts(coxph_in.cohorts_ids)
         if not cohorts:
             raise ValueError("No cohorts found for the provided IDs")
 
@@ -2089,7 +2053,7 @@ class Vantage6Service(
 
         logger.info(
             "[V6] Payload to send to Vantage6 for coxph:\n%s",
-            json.dumps(payload, indent=2),
+            LazyJSON(payload),
         )
 
         try:
@@ -2105,7 +2069,7 @@ class Vantage6Service(
             response_data = response.json()
 
             logger.debug(
-                "[V6] Full response data: %s", json.dumps(response_data, indent=2)
+                "[V6] Full response data: %s", LazyJSON(response_data)
             )
 
             task_id = response_data["id"]
@@ -2159,17 +2123,15 @@ class Vantage6Service(
             logger.warning("External data_preparation URL not configured")
             return
 
-        workspace = (
-            db.query(Workspace).filter(Workspace.id == glm_in.workspace_id).first()
-        )
+        workspace = get_loader(db).workspace(glm_in.workspace_id)
         if not workspace:
             raise ValueError(f"Workspace with id {glm_in.workspace_id} not found")
 
-        analysis = db.query(Analysis).filter(Analysis.id == glm_in.analysis_id).first()
+        analysis = get_loader(db).analysis(glm_in.analysis_id)
         if not analysis:
             raise ValueError(f"Analysis with id {glm_in.analysis_id} not found")
 
-        cohorts = db.query(Cohort).filter(Cohort.id.in_(glm_in.cohorts_ids)).all()
+        cohorts = get_loader(db).cohorts(glm_in.cohorts_ids)
         if not cohorts:
             raise ValueError("No cohorts found for the provided IDs")
 
@@ -2297,17 +2259,15 @@ class Vantage6Service(
             logger.warning("External data_preparation URL not configured")
             return
 
-        workspace = (
-            db.query(Workspace).filter(Workspace.id == km_in.workspace_id).first()
-        )
+        workspace = get_loader(db).workspace(km_in.workspace_id)
         if not workspace:
             raise ValueError(f"Workspace with id {km_in.workspace_id} not found")
 
-        analysis = db.query(Analysis).filter(Analysis.id == km_in.analysis_id).first()
+        analysis = get_loader(db).analysis(km_in.analysis_id)
         if not analysis:
             raise ValueError(f"Analysis with id {km_in.analysis_id} not found")
 
-        cohorts = db.query(Cohort).filter(Cohort.id.in_(km_in.cohorts_ids)).all()
+        cohorts = get_loader(db).cohorts(km_in.cohorts_ids)
         if not cohorts:
             raise ValueError("No cohorts found for the provided IDs")
 
@@ -2380,7 +2340,7 @@ class Vantage6Service(
             )
 
             logger.debug(
-                "[V6] Full response data: %s", json.dumps(response_data, indent=2)
+                "[V6] Full response data: %s", LazyJSON(response_data)
             )
 
             task_id = response_data["id"]
@@ -2440,11 +2400,7 @@ class Vantage6Service(
             logger.warning("External data_preparation URL not configured")
             return
 
-        analysis = (
-            db.query(Analysis)
-            .filter(Analysis.id == basic_arithmetic_in.analysis_id)
-            .first()
-        )
+        analysis = get_loader(db).analysis(basic_arithmetic_in.analysis_id)
 
         dataframe_ids = self._get_session_dataframe_ids(
             access_token=access_token,
@@ -2493,7 +2449,7 @@ class Vantage6Service(
 
                     logger.info(
                         "[V6] Payload to send to Vantage6 for basic_arithmetic:\n%s",
-                        json.dumps(payload, indent=2),
+                        LazyJSON(payload),
                     )
 
                     response = self._post_preprocess_with_retry(
@@ -2513,7 +2469,7 @@ class Vantage6Service(
 
                     logger.debug(
                         "[V6] Full response data: %s",
-                        json.dumps(response_data, indent=2),
+                        LazyJSON(response_data),
                     )
 
                     task_id = response_data["last_session_task"]["id"]
@@ -2569,11 +2525,7 @@ class Vantage6Service(
         #     dataframe_id=merge_categories_in.dataframe_id,
         # )
 
-        analysis = (
-            db.query(Analysis)
-            .filter(Analysis.id == merge_categories_in.analysis_id)
-            .first()
-        )
+        analysis = get_loader(db).analysis(merge_categories_in.analysis_id)
 
         dataframe_ids = self._get_session_dataframe_ids(
             access_token=access_token,
@@ -2622,7 +2574,7 @@ class Vantage6Service(
 
                     logger.info(
                         "[V6] Payload to send to Vantage6 for merge_categories:\n%s",
-                        json.dumps(payload, indent=2),
+                        LazyJSON(payload),
                     )
 
                     response = self._post_preprocess_with_retry(
@@ -2642,7 +2594,7 @@ class Vantage6Service(
                     )
                     logger.debug(
                         "[V6] Full response data: %s",
-                        json.dumps(response_data, indent=2),
+                        LazyJSON(response_data),
                     )
 
                     task_id = response_data["last_session_task"]["id"]
@@ -2698,9 +2650,7 @@ class Vantage6Service(
         #     dataframe_id=timedelta_in.dataframe_id,
         # )
 
-        analysis = (
-            db.query(Analysis).filter(Analysis.id == timedelta_in.analysis_id).first()
-        )
+        analysis = get_loader(db).analysis(timedelta_in.analysis_id)
 
         dataframe_ids = self._get_session_dataframe_ids(
             access_token=access_token,
@@ -2763,7 +2713,7 @@ class Vantage6Service(
 
                     logger.info(
                         "[V6] Payload to send to Vantage6 for timedelta:\n%s",
-                        json.dumps(payload, indent=2),
+                        LazyJSON(payload),
                     )
 
                     response = self._post_preprocess_with_retry(
@@ -2779,7 +2729,7 @@ class Vantage6Service(
 
                     logger.debug(
                         "[V6] Full response data: %s",
-                        json.dumps(response_data, indent=2),
+                        LazyJSON(response_data),
                     )
 
                     task_id = response_data["last_session_task"]["id"]
@@ -2842,9 +2792,7 @@ class Vantage6Service(
         #     dataframe_id=to_boolean_in.dataframe_id,
         # )
 
-        analysis = (
-            db.query(Analysis).filter(Analysis.id == to_boolean_in.analysis_id).first()
-        )
+        analysis = get_loader(db).analysis(to_boolean_in.analysis_id)
 
         dataframe_ids = self._get_session_dataframe_ids(
             access_token=access_token,
@@ -2900,7 +2848,7 @@ class Vantage6Service(
 
                     logger.info(
                         "[V6] Payload to send to Vantage6 for to_boolean:\n%s",
-                        json.dumps(payload, indent=2),
+                        LazyJSON(payload),
                     )
 
                     response = self._post_preprocess_with_retry(
@@ -2916,7 +2864,7 @@ class Vantage6Service(
 
                     logger.debug(
                         "[V6] Full response data: %s",
-                        json.dumps(response_data, indent=2),
+                        LazyJSON(response_data),
                     )
 
                     task_id = response_data["last_session_task"]["id"]
@@ -2974,11 +2922,7 @@ class Vantage6Service(
 
         # logger.info("[V6] Organization IDs fetched: %s", org_ids)
 
-        analysis = (
-            db.query(Analysis)
-            .filter(Analysis.id == one_hot_encoding_in.analysis_id)
-            .first()
-        )
+        analysis = get_loader(db).analysis(one_hot_encoding_in.analysis_id)
 
         dataframe_ids = self._get_session_dataframe_ids(
             access_token=access_token,
@@ -3026,7 +2970,7 @@ class Vantage6Service(
 
                     logger.info(
                         "[V6] Payload to send to Vantage6 for one_hot_encode:\n%s",
-                        json.dumps(payload, indent=2),
+                        LazyJSON(payload),
                     )
 
                     response = self._post_preprocess_with_retry(
@@ -3042,7 +2986,7 @@ class Vantage6Service(
 
                     logger.debug(
                         "[V6] Full response data: %s",
-                        json.dumps(response_data, indent=2),
+                        LazyJSON(response_data),
                     )
 
                     task_id = response_data["last_session_task"]["id"]
@@ -3101,11 +3045,7 @@ class Vantage6Service(
         #     dataframe_id=merge_variables_in.dataframe_id,
         # )
 
-        analysis = (
-            db.query(Analysis)
-            .filter(Analysis.id == merge_variables_in.analysis_id)
-            .first()
-        )
+        analysis = get_loader(db).analysis(merge_variables_in.analysis_id)
 
         dataframe_ids = self._get_session_dataframe_ids(
             access_token=access_token,
@@ -3156,7 +3096,7 @@ class Vantage6Service(
 
                     logger.info(
                         "[V6] Payload to send to Vantage6 for merge_variables:\n%s",
-                        json.dumps(payload, indent=2),
+                        LazyJSON(payload),
                     )
 
                     response = self._post_preprocess_with_retry(
@@ -3171,7 +3111,7 @@ class Vantage6Service(
 
                     logger.debug(
                         "[V6] Full response data: %s",
-                        json.dumps(response_data, indent=2),
+                        LazyJSON(response_data),
                     )
 
                     task_id = response_data["last_session_task"]["id"]
@@ -3313,7 +3253,13 @@ class Vantage6Service(
         access_token: str,
         db: Session,
         workspace_id: int,
+        authorized_org_ids: Optional[set[int]] = None,
     ) -> list[int]:
+        """
+        Online organizations of the collaboration that the workspace permit
+        grants. ``authorized_org_ids`` can be read beforehand so that no
+        query runs between the V6 calls.
+        """
 
         org_ids = list(
             self._get_online_organization_ids(
@@ -3328,12 +3274,11 @@ class Vantage6Service(
             org_ids,
         )
 
-        authorized_org_ids = None
-
-        authorized_org_ids = self._get_authorized_org_ids(
-            db=db,
-            workspace_id=workspace_id,
-        )
+        if authorized_org_ids is None:
+            authorized_org_ids = self.get_authorized_org_ids(
+                db=db,
+                workspace_id=workspace_id,
+            )
 
         if authorized_org_ids is not None:
             org_ids = [oid for oid in org_ids if oid in authorized_org_ids]
@@ -3386,21 +3331,14 @@ class Vantage6Service(
 
         return org_ids
 
-    def _get_authorized_org_ids(
+    def get_authorized_org_ids(
         self,
         *,
         db: Session,
         workspace_id: int,
     ) -> set[int]:
 
-        permit = (
-            db.query(Permit)
-            .filter(
-                Permit.workspace_id == workspace_id,
-                Permit.status == PermitStatus.GRANTED,
-            )
-            .first()
-        )
+        permit = get_loader(db).granted_permit(workspace_id)
         if not permit or not permit.coes_granted:
             logger.info(
                 "[V6] No granted permit found for workspace %s",
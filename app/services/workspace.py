@@ -7,11 +7,11 @@ from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 
 from app.models.workspace import Workspace
-from app.models.workspace_history import WorkspaceHistory
 from app.models.permit import Permit
 from app.models.metadata_search import MetadataSearch
 from app.schemas.workspace import WorkspaceCreate, WorkspaceUpdate, WorkspaceCreateV2
 from app.services.base import BaseService
+from app.services.workspace_history import record_history
 from app.utils.constants import PermitStatus, DataAccessStatus, MetadataStatus
 
 
@@ -92,15 +92,14 @@ class WorkspaceService(BaseService[Workspace, WorkspaceCreate, WorkspaceUpdate])
         def create_workspace_history(
             db, workspace_id, user_id, action, phase, description
         ):
-            history = WorkspaceHistory(
-                date=datetime.now(timezone.utc),
+            record_history(
+                db,
                 action=action,
                 phase=phase,
                 description=description,
                 workspace_id=workspace_id,
                 creator_id=user_id,
             )
-            db.add(history)
 
         def create_initial_permit(db, workspace_id, team_ids, user_id):
             permit = Permit(
@@ -193,17 +192,15 @@ class WorkspaceService(BaseService[Workspace, WorkspaceCreate, WorkspaceUpdate])
         else:
             description = f"Data access status has been changed to {data_access}"
 
-        workspace_history = WorkspaceHistory(
-            date=datetime.now(timezone.utc),
+        record_history(
+            db,
             action=action,
             phase="Data Access",
             description=description,
             creator_id=user_id,
             workspace_id=workspace_id,
         )
-        db.add(workspace_history)
         db.commit()
-        db.refresh(workspace_history)
 
         return updated_workspace
 
@@ -0,0 +1,177 @@
+"""
+Workspace history events.
+
+Services call ``record_history(db, ...)`` instead of adding
+``WorkspaceHistory`` rows one by one. Events are collected on the session
+and written with a single multi-row INSERT right before the request's
+transaction commits, so they commit (or roll back) with the change they
+describe.
+
+Phases listed in WORKSPACE_HISTORY_ASYNC_PHASES trade that guarantee for
+latency: their events are handed to a bounded in-process queue after the
+commit and written by a background thread in batches. When the queue is
+full the events are written synchronously instead of being dropped; events
+still queued when the process is killed are lost.
+"""
+
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.models.workspace_history import WorkspaceHistory
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "workspace_history_pending"
+_DEFERRED_KEY = "workspace_history_deferred"
+
+
+def record_history(
+    db: Session,
+    *,
+    workspace_id: Optional[int],
+    action: str,
+    phase: str,
+    description: str,
+    creator_id: Optional[int],
+    date: Optional[datetime] = None,
+) -> None:
+    """Queue a workspace history event for the current transaction."""
+    if not db.in_transaction():
+        # Make sure a rollback before any other statement still fires
+        # after_rollback and discards the event.
+        db.begin()
+    db.info.setdefault(_PENDING_KEY, []).append(
+        {
+            "workspace_id": workspace_id,
+            "action": action,
+            "phase": phase,
+            "description": description,
+            "creator_id": creator_id,
+            "date": date or datetime.now(timezone.utc),
+        }
+    )
+
+
+def _insert_events(connection, events: List[Dict[str, Any]]) -> None:
+    if events:
+        connection.execute(WorkspaceHistory.__table__.insert().values(events))
+
+
+class HistoryWriter:
+    """Background writer for history events of asynchronous phases."""
+
+    def __init__(self, *, max_queue: int, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _engine(self):
+        from app.db.session import engine
+
+        return engine
+
+    def submit(self, events: List[Dict[str, Any]]) -> None:
+        self._ensure_started()
+        overflow = []
+        for item in events:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                overflow.append(item)
+        if overflow:
+            logger.warning(
+                "[HISTORY] Queue full, writing %d events synchronously", len(overflow)
+            )
+            self._write(overflow)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="workspace-history-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _drain(self, first: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        batch = [first] if first is not None else []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            with self._engine().begin() as connection:
+                _insert_events(connection, batch)
+        except Exception:
+            logger.exception("[HISTORY] Failed to write %d history events", len(batch))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self._write(self._drain(first))
+
+    def flush(self) -> None:
+        """Write everything still queued (used on shutdown)."""
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            self._write(batch)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+
+
+history_writer = HistoryWriter(
+    max_queue=settings.WORKSPACE_HISTORY_QUEUE_SIZE,
+    batch_size=settings.WORKSPACE_HISTORY_BATCH_SIZE,
+    flush_interval=settings.WORKSPACE_HISTORY_FLUSH_INTERVAL,
+)
+
+
+@event.listens_for(Session, "before_commit")
+def _write_history_events(session):
+    events = session.info.pop(_PENDING_KEY, None)
+    if not events:
+        return
+    async_phases = set(settings.workspace_history_async_phases)
+    durable = [e for e in events if e["phase"] not in async_phases]
+    deferred = [e for e in events if e["phase"] in async_phases]
+    _insert_events(session.connection(), durable)
+    if deferred:
+        session.info.setdefault(_DEFERRED_KEY, []).extend(deferred)
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_deferred_events(session):
+    deferred = session.info.pop(_DEFERRED_KEY, None)
+    if deferred:
+        history_writer.submit(deferred)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_history_events(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_DEFERRED_KEY, None)
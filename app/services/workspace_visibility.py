@@ -0,0 +1,238 @@
+"""
+Workspace visibility: which workspaces a user can list.
+
+A user sees the workspaces they created and those whose ``team_ids`` hold
+one of their teams. Team membership is cached per user for
+TEAM_MEMBERSHIP_CACHE_TTL seconds and dropped as soon as a ``user_teams``
+change is committed in this process.
+
+The ``workspace_visibility`` table is kept in sync on every flush and every
+bulk ``update()``/``delete()`` that touches memberships or workspace teams,
+whether or not it is used, so WORKSPACE_VISIBILITY_TABLE can be switched on
+at any time; with it enabled, listings become a primary-key range scan on it.
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import ARRAY, String, cast, delete, event, inspect, or_, select
+from sqlalchemy.orm import Query, Session
+
+from app.config.settings import settings
+from app.models.team import Team
+from app.models.user import User
+from app.models.user_team import UserTeam
+from app.models.workspace import Workspace
+from app.models.workspace_visibility import WorkspaceVisibility
+
+_CHANGED_USERS_KEY = "membership_changed_users"
+_PENDING_SYNC_KEY = "workspace_visibility_pending"
+
+
+class TeamMembershipCache:
+    """TTL cache of user id -> team ids (as strings, like Workspace.team_ids)."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[int, Tuple[float, Tuple[str, ...]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: int) -> Tuple[str, ...]:
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        team_ids = tuple(
+            str(team_id)
+            for (team_id,) in db.query(UserTeam.team_id)
+            .filter(UserTeam.user_id == user_id)
+            .all()
+        )
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, team_ids)
+        return team_ids
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+team_membership = TeamMembershipCache(settings.TEAM_MEMBERSHIP_CACHE_TTL)
+
+
+def visible_workspaces_query(db: Session, user_id: int) -> Query:
+    """Workspaces the user created or shares a team with, ordered by id."""
+    if settings.WORKSPACE_VISIBILITY_TABLE:
+        return (
+            db.query(Workspace)
+            .join(WorkspaceVisibility, WorkspaceVisibility.workspace_id == Workspace.id)
+            .filter(WorkspaceVisibility.user_id == user_id)
+            .order_by(Workspace.id)
+        )
+
+    creator_filter = Workspace.creator_id == user_id
+    team_ids = team_membership.get(db, user_id)
+    if team_ids:
+        # Cast to varchar[] so the GIN index on team_ids can serve the &&.
+        team_filter = Workspace.team_ids.op("&&")(cast(list(team_ids), ARRAY(String)))
+        condition = or_(creator_filter, team_filter)
+    else:
+        condition = creator_filter
+    return db.query(Workspace).filter(condition).order_by(Workspace.id)
+
+
+def _visible_pairs():
+    """SELECT (user_id, workspace_id) for every visible pair."""
+    team_pairs = select(UserTeam.user_id, Workspace.id).join(
+        Workspace,
+        cast(UserTeam.team_id, String) == Workspace.team_ids.any_(),
+    )
+    creator_pairs = select(Workspace.creator_id, Workspace.id).where(
+        Workspace.creator_id.is_not(None)
+    )
+    return team_pairs.union(creator_pairs).subquery()
+
+
+def sync_visibility(
+    connection, *, user_ids: Iterable[int] = (), workspace_ids: Iterable[int] = ()
+) -> None:
+    """Rebuild the visibility rows of the given users and workspaces."""
+    user_ids, workspace_ids = list(user_ids), list(workspace_ids)
+    if not user_ids and not workspace_ids:
+        return
+
+    pairs = _visible_pairs()
+    user_col, workspace_col = pairs.c
+    scope = []
+    table_scope = []
+    if user_ids:
+        scope.append(user_col.in_(user_ids))
+        table_scope.append(WorkspaceVisibility.user_id.in_(user_ids))
+    if workspace_ids:
+        scope.append(workspace_col.in_(workspace_ids))
+        table_scope.append(WorkspaceVisibility.workspace_id.in_(workspace_ids))
+
+    connection.execute(delete(WorkspaceVisibility).where(or_(*table_scope)))
+    connection.execute(
+        WorkspaceVisibility.__table__.insert().from_select(
+            ["user_id", "workspace_id"],
+            select(user_col, workspace_col).where(or_(*scope)).distinct(),
+        )
+    )
+
+
+def _collect_changes(session: Session) -> Tuple[Set[int], List[Workspace]]:
+    """Users whose memberships and workspaces whose audience change."""
+    user_ids: Set[int] = set()
+    workspaces: List[Workspace] = []
+
+    for obj in session.new | session.deleted:
+        if isinstance(obj, UserTeam):
+            user_ids.add(obj.user_id)
+        elif isinstance(obj, Workspace) and obj in session.new:
+            workspaces.append(obj)
+
+    for obj in session.dirty:
+        state = inspect(obj)
+        if isinstance(obj, UserTeam):
+            user_ids.add(obj.user_id)
+            user_ids.update(state.attrs.user_id.history.deleted or ())
+        elif isinstance(obj, User):
+            if state.attrs.teams.history.has_changes():
+                user_ids.add(obj.id)
+        elif isinstance(obj, Team):
+            history = state.attrs.users.history
+            user_ids.update(
+                user.id for user in (history.added or ()) + (history.deleted or ())
+            )
+        elif isinstance(obj, Workspace):
+            if (
+                state.attrs.team_ids.history.has_changes()
+                or state.attrs.creator_id.history.has_changes()
+            ):
+                workspaces.append(obj)
+
+    user_ids.discard(None)
+    return user_ids, workspaces
+
+
+@event.listens_for(Session, "before_flush")
+def _remember_membership_changes(session, flush_context, instances):
+    user_ids, workspaces = _collect_changes(session)
+    if user_ids:
+        session.info.setdefault(_CHANGED_USERS_KEY, set()).update(user_ids)
+    if user_ids or workspaces:
+        session.info[_PENDING_SYNC_KEY] = (user_ids, workspaces)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _sync_visibility_after_flush(session, flush_context):
+    pending = session.info.pop(_PENDING_SYNC_KEY, None)
+    if not pending:
+        return
+    user_ids, workspaces = pending
+    # New workspaces only have their ids once flushed.
+    sync_visibility(
+        session.connection(),
+        user_ids=user_ids,
+        workspace_ids={w.id for w in workspaces if w.id is not None},
+    )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _sync_visibility_after_bulk_change(orm_execute_state):
+    """Bulk UPDATE/DELETE on user_teams or workspaces skips the flush hooks."""
+    state = orm_execute_state
+    if not (state.is_update or state.is_delete) or state.bind_mapper is None:
+        return None
+    entity = state.bind_mapper.class_
+    if entity not in (UserTeam, Workspace):
+        return None
+
+    session = state.session
+    where = state.statement.whereclause
+    if entity is UserTeam:
+        affected = select(UserTeam.user_id, UserTeam.team_id)
+    else:
+        affected = select(Workspace.id)
+    if where is not None:
+        affected = affected.where(where)
+    rows = session.execute(affected).all()
+
+    result = state.invoke_statement()
+
+    if entity is UserTeam:
+        user_ids = {user_id for user_id, _ in rows}
+        team_ids = {team_id for _, team_id in rows}
+        if state.is_update and team_ids:
+            # An UPDATE may have moved memberships to other users.
+            user_ids.update(
+                session.execute(
+                    select(UserTeam.user_id).where(UserTeam.team_id.in_(team_ids))
+                ).scalars()
+            )
+        session.info.setdefault(_CHANGED_USERS_KEY, set()).update(user_ids)
+        sync_visibility(session.connection(), user_ids=user_ids)
+    else:
+        sync_visibility(
+            session.connection(), workspace_ids={workspace_id for (workspace_id,) in rows}
+        )
+    return result
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_membership(session):
+    user_ids = session.info.pop(_CHANGED_USERS_KEY, None)
+    if user_ids:
+        team_membership.invalidate(user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_membership_changes(session):
+    session.info.pop(_CHANGED_USERS_KEY, None)
+    session.info.pop(_PENDING_SYNC_KEY, None)
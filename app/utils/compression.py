@@ -0,0 +1,187 @@
+"""
+Negotiated response compression.
+
+``CompressionMiddleware`` compresses complete response bodies of at least
+COMPRESSION_MINIMUM_SIZE bytes with the best encoding the client accepts:
+zstd (needs ``zstandard``), brotli (needs ``brotli``) or gzip. Optional
+codecs are imported lazily and simply not offered when missing.
+
+Streaming responses (exports, SSE), responses that already carry a
+Content-Encoding and already-compressed media types pass through untouched.
+The compression ratio and the CPU time spent compressing are exported per
+encoding.
+"""
+
+import gzip
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+COMPRESSION_RATIO = Histogram(
+    "raven_response_compression_ratio",
+    "Uncompressed size divided by compressed size of compressed responses",
+    ["encoding"],
+    buckets=(1, 1.5, 2, 3, 4, 6, 8, 12, 16, 32),
+)
+COMPRESSION_SECONDS = Histogram(
+    "raven_response_compression_cpu_seconds",
+    "CPU time spent compressing a response body",
+    ["encoding"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+COMPRESSION_BYTES = Counter(
+    "raven_response_compression_bytes_total",
+    "Response bytes before and after compression",
+    ["encoding", "stage"],
+)
+
+# Media types that are compressed already (or not worth compressing).
+SKIP_MEDIA_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "text/event-stream",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zstd",
+    "application/vnd.apache.parquet",
+)
+
+Compressor = Callable[[bytes], bytes]
+
+
+def available_codecs(
+    *, gzip_level: int, brotli_quality: int, zstd_level: int
+) -> Dict[str, Compressor]:
+    """Encoders by Content-Encoding token, in server preference order."""
+    codecs: Dict[str, Compressor] = {}
+    try:
+        import zstandard
+    except ImportError:
+        pass
+    else:
+        compressor = zstandard.ZstdCompressor(level=zstd_level)
+        codecs["zstd"] = compressor.compress
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        codecs["br"] = lambda data: brotli.compress(data, quality=brotli_quality)
+    codecs["gzip"] = lambda data: gzip.compress(data, compresslevel=gzip_level, mtime=0)
+    return codecs
+
+
+def negotiate(accept_encoding: str, offered: List[str]) -> Optional[str]:
+    """Pick the encoding with the highest q-value; ties go to server order."""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    best: Tuple[float, Optional[str]] = (0.0, None)
+    for encoding in offered:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best[0]:
+            best = (q, encoding)
+    return best[1]
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.codecs = available_codecs(
+            gzip_level=gzip_level, brotli_quality=brotli_quality, zstd_level=zstd_level
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate(accept, list(self.codecs)) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(
+            send, encoding, self.codecs[encoding], self.minimum_size
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(
+        self, send: Send, encoding: str, compress: Compressor, minimum_size: int
+    ) -> None:
+        self._send = send
+        self.encoding = encoding
+        self.compress = compress
+        self.minimum_size = minimum_size
+        self._start: Optional[Message] = None
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "")
+            if "content-encoding" in headers or media_type.startswith(SKIP_MEDIA_TYPES):
+                self._passthrough = True
+                await self._send(message)
+            else:
+                # Held until the first body chunk tells whether it streams.
+                self._start = message
+            return
+
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        start, self._start = self._start, None
+        body = message.get("body", b"")
+        if start is None or message.get("more_body", False) or len(body) < self.minimum_size:
+            self._passthrough = True
+            if start is not None:
+                await self._send(start)
+            await self._send(message)
+            return
+
+        began = time.thread_time()
+        compressed = self.compress(body)
+        COMPRESSION_SECONDS.labels(self.encoding).observe(time.thread_time() - began)
+        COMPRESSION_RATIO.labels(self.encoding).observe(len(body) / max(len(compressed), 1))
+        COMPRESSION_BYTES.labels(self.encoding, "in").inc(len(body))
+        COMPRESSION_BYTES.labels(self.encoding, "out").inc(len(compressed))
+
+        headers = MutableHeaders(raw=start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # The encoded bytes differ from the tagged representation.
+            headers["ETag"] = f"W/{etag}"
+        await self._send(start)
+        await self._send({"type": "http.response.body", "body": compressed})
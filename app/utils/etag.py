@@ -0,0 +1,92 @@
+"""
+Strong ETags and conditional GET.
+
+Entities get an ETag derived from their row version (``update_date``, or
+``creation_date`` for rows never updated), read with a single-column query
+before the row itself is loaded, so a matching ``If-None-Match`` answers
+304 without loading or serializing the entity. Finished Vantage6 task
+results never change, so their ETag only depends on the task id; lists
+without a row version are tagged with a hash of the serialized body.
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy.orm import Session
+
+ENTITY_CACHE_CONTROL = "private, no-cache"
+RESULT_CACHE_CONTROL = "private, max-age=86400, immutable"
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison.
+    candidates = (c.strip() for c in header.split(","))
+    return any(c.removeprefix("W/") == etag for c in candidates)
+
+
+def not_modified(etag: str, cache_control: str = ENTITY_CACHE_CONTROL) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
+
+
+def row_version_etag(db: Session, model: Any, row_id: int) -> Optional[str]:
+    """ETag of the row's current version, or None when the row is missing."""
+    row = (
+        db.query(model.update_date, model.creation_date)
+        .filter(model.id == row_id)
+        .first()
+    )
+    if row is None:
+        return None
+    version = row[0] or row[1]
+    return make_etag(model.__tablename__, row_id, version.isoformat() if version else "")
+
+
+def check_etag(
+    request: Request,
+    response: Response,
+    etag: Optional[str],
+    cache_control: str = ENTITY_CACHE_CONTROL,
+) -> Optional[Response]:
+    """
+    304 response when the client already has ``etag``; otherwise tag the
+    outgoing response and return None.
+    """
+    if etag is None:
+        return None
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return None
+
+
+def check_row_version(
+    request: Request, response: Response, db: Session, model: Any, row_id: int
+) -> Optional[Response]:
+    return check_etag(request, response, row_version_etag(db, model, row_id))
+
+
+def tagged_json(request: Request, body: bytes) -> Response:
+    """JSON response for an already serialized body, tagged by its hash."""
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": ENTITY_CACHE_CONTROL},
+    )
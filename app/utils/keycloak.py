@@ -2,19 +2,98 @@
 Utilidades para la integración con Keycloak
 """
 
+import asyncio
 import json
 import logging
 import base64
+import threading
+import time
 from typing import Dict, Optional, Any, List
 
-import requests
+import httpx
 from fastapi import HTTPException, status
+from jose import JWTError, jwk, jwt
+from jose.exceptions import JWKError
+from jose.backends.base import Key
+from prometheus_client import Histogram
 
 from app.config.settings import settings
 
 
 logger = logging.getLogger(__name__)
 
+TOKEN_ALGORITHMS = ["RS256"]
+
+KEYCLOAK_REQUEST_SECONDS = Histogram(
+    "raven_keycloak_request_seconds",
+    "Latency of calls to Keycloak",
+    ["operation"],
+)
+
+
+def _public_key_pem(value: str) -> str:
+    """Keycloak shows the realm key as bare base64; wrap it as a PEM."""
+    value = value.strip()
+    if value.startswith("-----BEGIN"):
+        return value
+    body = "\n".join(value[i:i + 64] for i in range(0, len(value), 64))
+    return f"-----BEGIN PUBLIC KEY-----\n{body}\n-----END PUBLIC KEY-----"
+
+
+class SigningKeys:
+    """
+    Realm signing keys by ``kid``, parsed once and kept in memory.
+
+    The JWKS is fetched on first use and again only when a token names an
+    unknown ``kid`` (key rotation), at most once per ``min_refresh``
+    seconds. KEYCLOAK_PUBLIC_KEY, when set, verifies tokens without any
+    network access.
+    """
+
+    def __init__(self, jwks_url: Optional[str], public_key: Optional[str], min_refresh: float):
+        self.jwks_url = jwks_url
+        self.min_refresh = min_refresh
+        self._keys: Dict[str, Key] = {}
+        self._static: Optional[Key] = None
+        if public_key:
+            try:
+                self._static = jwk.construct(_public_key_pem(public_key), TOKEN_ALGORITHMS[0])
+            except JWKError as e:
+                logger.error(f"KEYCLOAK_PUBLIC_KEY no es una clave RSA válida: {e}")
+        self._fetched_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get(self, kid: Optional[str]) -> Optional[Key]:
+        key = self._keys.get(kid) if kid else None
+        if key is not None:
+            return key
+        if self.jwks_url and self._refresh():
+            key = self._keys.get(kid) if kid else None
+            if key is not None:
+                return key
+        return self._static
+
+    def _refresh(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self._fetched_at is not None and now - self._fetched_at < self.min_refresh:
+                return False
+            self._fetched_at = now
+            try:
+                response = httpx.get(self.jwks_url, timeout=5)
+                response.raise_for_status()
+                keys = {}
+                for key_data in response.json().get("keys", []):
+                    if key_data.get("use", "sig") != "sig" or key_data.get("alg", "RS256") not in TOKEN_ALGORITHMS:
+                        continue
+                    keys[key_data["kid"]] = jwk.construct(key_data, key_data.get("alg", "RS256"))
+            except (httpx.HTTPError, ValueError, KeyError, JWKError) as e:
+                logger.error(f"Error al obtener las claves JWKS: {e}")
+                return False
+            self._keys = keys
+            logger.info(f"Claves JWKS cargadas: {', '.join(keys) or 'ninguna'}")
+            return True
+
 
 class KeycloakHandler:
     """
@@ -30,45 +109,175 @@ class KeycloakHandler:
         self.admin_username = settings.KEYCLOAK_ADMIN_USERNAME
         self.admin_password = settings.KEYCLOAK_ADMIN_PASSWORD
         self.admin_token = None
+        self._admin_expires_at = 0.0
+        self._admin_refresh_token: Optional[str] = None
+        self._admin_refresh_expires_at = 0.0
+        self._token_lock = threading.RLock()
+        self._async_token_lock: Optional[asyncio.Lock] = None
+        self._http: Optional[httpx.Client] = None
+        self._async_http: Optional[httpx.AsyncClient] = None
+        realm_url = (
+            f"{self.server_url.rstrip('/')}/realms/{self.realm_name}"
+            if self.server_url
+            else None
+        )
+        self.issuer = settings.KEYCLOAK_TOKEN_ISSUER or realm_url
+        self.signing_keys = SigningKeys(
+            f"{realm_url}/protocol/openid-connect/certs" if realm_url else None,
+            settings.KEYCLOAK_PUBLIC_KEY,
+            settings.KEYCLOAK_JWKS_MIN_REFRESH,
+        )
         
-    def _get_admin_token(self) -> Optional[str]:
-        """
-        Obtiene un token de administrador para realizar operaciones en Keycloak
-        """
-        url = f"{self.server_url}/realms/master/protocol/openid-connect/token"
-        data = {
+    # --- Clientes HTTP ---
+
+    def _client_options(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.server_url or "http://localhost",
+            "timeout": settings.KEYCLOAK_HTTP_TIMEOUT,
+            "limits": httpx.Limits(
+                max_connections=settings.KEYCLOAK_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.KEYCLOAK_MAX_CONNECTIONS,
+            ),
+        }
+
+    @property
+    def http(self) -> httpx.Client:
+        """Cliente compartido (pool de conexiones) para llamadas síncronas"""
+        if self._http is None:
+            with self._token_lock:
+                if self._http is None:
+                    self._http = httpx.Client(**self._client_options())
+        return self._http
+
+    @property
+    def async_http(self) -> httpx.AsyncClient:
+        """Cliente compartido para llamadas asíncronas"""
+        if self._async_http is None:
+            self._async_http = httpx.AsyncClient(**self._client_options())
+        return self._async_http
+
+    def close(self) -> None:
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+    async def aclose(self) -> None:
+        if self._async_http is not None:
+            await self._async_http.aclose()
+            self._async_http = None
+        self.close()
+
+    # --- Token de administrador ---
+
+    def _admin_token_request(self) -> Dict[str, str]:
+        """Refresca con el refresh token si sigue vigente; si no, usa la contraseña"""
+        if self._admin_refresh_token and time.time() < self._admin_refresh_expires_at:
+            return {
+                "grant_type": "refresh_token",
+                "client_id": "admin-cli",
+                "refresh_token": self._admin_refresh_token,
+            }
+        return {
             "grant_type": "password",
             "client_id": "admin-cli",
             "username": self.admin_username,
-            "password": self.admin_password
+            "password": self.admin_password,
         }
-        
-        try:
-            response = requests.post(url, data=data)
-            response.raise_for_status()
-            
-            token_data = response.json()
-            self.admin_token = token_data.get("access_token")
-            return self.admin_token
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error al obtener el token de administrador: {e}")
-            return None
-    
+
+    def _store_admin_token(self, token_data: Dict[str, Any]) -> str:
+        now = time.time()
+        self.admin_token = token_data.get("access_token")
+        self._admin_expires_at = now + token_data.get("expires_in", 60)
+        self._admin_refresh_token = token_data.get("refresh_token")
+        self._admin_refresh_expires_at = now + token_data.get("refresh_expires_in", 0)
+        return self.admin_token
+
+    def _admin_token_valid(self) -> bool:
+        # Se renueva antes de que caduque para no enviar tokens a punto de expirar
+        margin = settings.KEYCLOAK_TOKEN_REFRESH_MARGIN
+        return bool(self.admin_token) and time.time() < self._admin_expires_at - margin
+
+    def _get_admin_token(self, force: bool = False) -> Optional[str]:
+        """
+        Obtiene un token de administrador para realizar operaciones en Keycloak
+        """
+        with self._token_lock:
+            if not force and self._admin_token_valid():
+                return self.admin_token
+            try:
+                with KEYCLOAK_REQUEST_SECONDS.labels("admin_token").time():
+                    response = self.http.post(
+                        "/realms/master/protocol/openid-connect/token",
+                        data=self._admin_token_request(),
+                    )
+                response.raise_for_status()
+                return self._store_admin_token(response.json())
+            except httpx.HTTPError as e:
+                logger.error(f"Error al obtener el token de administrador: {e}")
+                self._admin_refresh_token = None
+                return None
+
+    async def _get_admin_token_async(self, force: bool = False) -> Optional[str]:
+        if self._async_token_lock is None:
+            self._async_token_lock = asyncio.Lock()
+        async with self._async_token_lock:
+            if not force and self._admin_token_valid():
+                return self.admin_token
+            try:
+                with KEYCLOAK_REQUEST_SECONDS.labels("admin_token").time():
+                    response = await self.async_http.post(
+                        "/realms/master/protocol/openid-connect/token",
+                        data=self._admin_token_request(),
+                    )
+                response.raise_for_status()
+                return self._store_admin_token(response.json())
+            except httpx.HTTPError as e:
+                logger.error(f"Error al obtener el token de administrador: {e}")
+                self._admin_refresh_token = None
+                return None
+
+    def _admin_request(self, operation: str, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        Llamada a la API de administración; si Keycloak responde 401 se
+        renueva el token y se reintenta una vez
+        """
+        response = None
+        for attempt in range(2):
+            token = self._get_admin_token(force=attempt > 0)
+            headers = {"Authorization": f"Bearer {token}"}
+            with KEYCLOAK_REQUEST_SECONDS.labels(operation).time():
+                response = self.http.request(method, path, headers=headers, **kwargs)
+            if response.status_code != 401:
+                break
+        response.raise_for_status()
+        return response
+
+    async def _admin_request_async(
+        self, operation: str, method: str, path: str, **kwargs
+    ) -> httpx.Response:
+        response = None
+        for attempt in range(2):
+            token = await self._get_admin_token_async(force=attempt > 0)
+            headers = {"Authorization": f"Bearer {token}"}
+            with KEYCLOAK_REQUEST_SECONDS.labels(operation).time():
+                response = await self.async_http.request(method, path, headers=headers, **kwargs)
+            if response.status_code != 401:
+                break
+        response.raise_for_status()
+        return response
+
+    # --- Usuarios ---
+
     def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """
         Obtiene información de un usuario por su ID
         """
-        if not self.admin_token:
-            self._get_admin_token()
-            
-        url = f"{self.server_url}/admin/realms/{self.realm_name}/users/{user_id}"
-        headers = {"Authorization": f"Bearer {self.admin_token}"}
-        
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
+            response = self._admin_request(
+                "get_user", "GET", f"/admin/realms/{self.realm_name}/users/{user_id}"
+            )
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error al obtener usuario por ID: {e}")
             return None
     
@@ -76,42 +285,27 @@ class KeycloakHandler:
         """
         Busca un usuario por email
         """
-        if not self.admin_token:
-            self._get_admin_token()
-            
-        url = f"{self.server_url}/admin/realms/{self.realm_name}/users"
-        headers = {"Authorization": f"Bearer {self.admin_token}"}
-        params = {"email": email, "exact": "true"}
-        
         try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
+            response = self._admin_request(
+                "find_user",
+                "GET",
+                f"/admin/realms/{self.realm_name}/users",
+                params={"email": email, "exact": "true"},
+            )
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error al obtener usuario por email: {e}")
             return None
-    
-    def create_user(
-        self, 
-        username: str, 
-        email: str, 
-        password: str, 
+
+    @staticmethod
+    def _user_payload(
+        username: str,
+        email: str,
+        password: str,
         first_name: Optional[str] = None,
         last_name: Optional[str] = None,
-        enabled: bool = True
-    ) -> Optional[str]:
-        """
-        Crea un usuario en Keycloak
-        """
-        if not self.admin_token:
-            self._get_admin_token()
-            
-        url = f"{self.server_url}/admin/realms/{self.realm_name}/users"
-        headers = {
-            "Authorization": f"Bearer {self.admin_token}",
-            "Content-Type": "application/json"
-        }
-        
+        enabled: bool = True,
+    ) -> Dict[str, Any]:
         payload = {
             "username": username,
             "email": email,
@@ -130,44 +324,102 @@ class KeycloakHandler:
             
         if last_name:
             payload["lastName"] = last_name
-        
+        return payload
+
+    @staticmethod
+    def _created_user_id(response: httpx.Response) -> Optional[str]:
+        # Keycloak devuelve el ID en la ubicación de la respuesta
+        location = response.headers.get("Location")
+        return location.rstrip("/").split("/")[-1] if location else None
+    
+    def create_user(
+        self, 
+        username: str, 
+        email: str, 
+        password: str, 
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        enabled: bool = True
+    ) -> Optional[str]:
+        """
+        Crea un usuario en Keycloak
+        """
+        payload = self._user_payload(username, email, password, first_name, last_name, enabled)
         try:
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            
-            # Keycloak devuelve el ID en la ubicación de la respuesta
-            location = response.headers.get("Location")
-            if location:
-                user_id = location.split("/")[-1]
+            response = self._admin_request(
+                "create_user", "POST", f"/admin/realms/{self.realm_name}/users", json=payload
+            )
+            user_id = self._created_user_id(response)
+            if user_id:
                 return user_id
-            
+
             # Si no podemos extraer la ID, busquemos al usuario por correo electrónico
             users = self.get_user_by_email(email)
             if users and len(users) > 0:
                 return users[0].get("id")
                 
             return None
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
+            logger.error(f"Error al crear usuario: {e}")
+            return None
+
+    async def create_user_async(self, **user: Any) -> Optional[str]:
+        """
+        Versión asíncrona de create_user (mismos argumentos)
+        """
+        payload = self._user_payload(**user)
+        try:
+            response = await self._admin_request_async(
+                "create_user", "POST", f"/admin/realms/{self.realm_name}/users", json=payload
+            )
+            return self._created_user_id(response)
+        except httpx.HTTPError as e:
             logger.error(f"Error al crear usuario: {e}")
             return None
+
+    async def create_users(self, users: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Crea varios usuarios en paralelo sobre el mismo pool de conexiones.
+        Devuelve los IDs en el mismo orden (None si falló)
+        """
+        semaphore = asyncio.Semaphore(settings.KEYCLOAK_PROVISION_CONCURRENCY)
+
+        async def create(user: Dict[str, Any]) -> Optional[str]:
+            async with semaphore:
+                return await self.create_user_async(**user)
+
+        return list(await asyncio.gather(*(create(user) for user in users)))
     
     def validate_token(self, token: str) -> Optional[Dict[str, Any]]:
         """
-        Valida un token y devuelve la información del usuario
+        Valida un token y devuelve la información del usuario.
+        La firma se verifica localmente con las claves del realm, sin
+        llamadas a Keycloak salvo al rotar las claves.
         """
-        # url = f"{self.server_url}/realms/{self.realm_name}/protocol/openid-connect/userinfo"
-        # headers = {"Authorization": f"Bearer {token}"}
-        
-        # try:
-        #     response = requests.get(url, headers=headers)
-        #     response.raise_for_status()
-        #     return response.json()
-        # except requests.exceptions.RequestException as e:
-        #     logger.error(f"Error al validar token: {e}")
-        #     # Como fallback, intentar decodificar el JWT directamente
-        #     return self._decode_jwt_payload(token)
-
-        return self._decode_jwt_payload(token)
+        if not settings.KEYCLOAK_VERIFY_TOKENS:
+            return self._decode_jwt_payload(token)
+        return self._verify_jwt(token)
+
+    def _verify_jwt(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verifica la firma, la expiración y el emisor de un JWT
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+            key = self.signing_keys.get(header.get("kid"))
+            if key is None:
+                logger.error(f"No hay clave para verificar el token (kid={header.get('kid')})")
+                return None
+            return jwt.decode(
+                token,
+                key,
+                algorithms=TOKEN_ALGORITHMS,
+                issuer=self.issuer,
+                options={"verify_aud": False},
+            )
+        except JWTError as e:
+            logger.warning(f"Token JWT rechazado: {e}")
+            return None
     
     def _decode_jwt_payload(self, token: str) -> Optional[Dict[str, Any]]:
         """
@@ -0,0 +1,165 @@
+"""
+Queue-based logging.
+
+``setup_logging`` routes every record through a ``QueueHandler`` to a
+``QueueListener`` thread that formats and writes it. Logger and handler
+filters (e.g. the V6 verbose filter, sampling) run first, so a dropped
+record is never rendered and ``LazyJSON`` arguments are only serialized
+for records that are kept. The message is rendered when the record is
+enqueued, capturing mutable arguments as they were at the logging call;
+only the final formatting and the write happen on the listener thread.
+
+Outside development lines are JSON objects (``JSONFormatter``) carrying
+the ``extra`` fields of the call. LOG_SAMPLING keeps only a fraction of
+the INFO/DEBUG records of the given loggers (``name=rate`` CSV, matched by
+logger name prefix); warnings and errors are never sampled out.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+import orjson
+
+# Attributes every LogRecord has; anything else came in through ``extra``.
+_RECORD_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None)).keys()
+) | {"message", "asctime", "taskName"}
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+
+class LazyJSON:
+    """Log argument rendered as indented JSON only if the record passes the filters."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        return json.dumps(self.value, indent=2, default=str)
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """Keep ``rate`` of the sub-WARNING records of the configured loggers."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Longest prefix first so the most specific logger wins.
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def rate_for(self, name: str) -> float:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that renders the message (and traceback) when the record
+    is enqueued. Only records dropped by its filters skip rendering; the
+    final formatting and the write happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render now: the arguments may be mutated before the listener runs.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Render the traceback now so its frames are not kept alive.
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_sampling(entries) -> Dict[str, float]:
+    rates: Dict[str, float] = {}
+    for entry in entries:
+        name, sep, rate = entry.partition("=")
+        if sep and name.strip():
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+_listener: Optional[QueueListener] = None
+_output: Optional[logging.Handler] = None
+
+
+def setup_logging(
+    *,
+    level: str = "INFO",
+    json_format: bool = False,
+    sampling: Optional[Dict[str, float]] = None,
+) -> QueueListener:
+    """Install the queue pipeline on the root logger (idempotent)."""
+    global _listener, _output
+    if _listener is not None:
+        return _listener
+
+    _output = output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JSONFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    if sampling:
+        handler.addFilter(SamplingFilter(sampling))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def restart_logging() -> None:
+    """Start a listener thread again in a forked child (threads do not survive fork)."""
+    if _listener is not None:
+        _listener._thread = None
+        _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records, stop the listener and log synchronously again."""
+    global _listener
+    if _listener is not None:
+        root = logging.getLogger()
+        root.handlers = [_output]
+        _listener.stop()
+        _listener = None
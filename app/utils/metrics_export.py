@@ -0,0 +1,131 @@
+"""
+Encoders for metric event exports.
+
+Each encoder turns an iterator of row batches (as produced by a streaming
+cursor) into an iterator of response chunks, so exports never hold more
+than one batch in memory. Parquet and Arrow IPC need ``pyarrow``, which is
+imported lazily so the API still starts without it.
+"""
+
+import csv
+import io
+import json
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Sequence
+
+from sqlalchemy import DateTime, Integer
+
+
+class ExportFormat(NamedTuple):
+    media_type: str
+    extension: str
+    encoder: Callable[[Sequence[str], Dict[str, Any], Iterator[List[Any]]], Iterator[Any]]
+    needs_pyarrow: bool = False
+
+
+def csv_chunks(columns, types, batches) -> Iterator[str]:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows(batch)
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+    if output.tell():
+        yield output.getvalue()
+
+
+def ndjson_chunks(columns, types, batches) -> Iterator[str]:
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in batch
+        )
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last take()."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_schema(columns, types):
+    import pyarrow as pa
+
+    fields = []
+    for name in columns:
+        column_type = types[name]
+        if isinstance(column_type, DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC")
+        elif isinstance(column_type, Integer):
+            arrow_type = pa.int64()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def _record_batches(schema, batches):
+    import pyarrow as pa
+
+    for batch in batches:
+        values = list(zip(*batch)) if batch else [()] * len(schema)
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(list(col), type=field.type) for col, field in zip(values, schema)],
+            schema=schema,
+        )
+
+
+def arrow_chunks(columns, types, batches) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    schema = _arrow_schema(columns, types)
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for record_batch in _record_batches(schema, batches):
+            writer.write_batch(record_batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def parquet_chunks(columns, types, batches) -> Iterator[bytes]:
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(columns, types)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for record_batch in _record_batches(schema, batches):
+            writer.write_batch(record_batch)
+            yield sink.take()
+    # The footer is written on close.
+    yield sink.take()
+
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "csv": ExportFormat("text/csv", "csv", csv_chunks),
+    "ndjson": ExportFormat("application/x-ndjson", "ndjson", ndjson_chunks),
+    "arrow": ExportFormat(
+        "application/vnd.apache.arrow.stream", "arrow", arrow_chunks, True
+    ),
+    "parquet": ExportFormat(
+        "application/vnd.apache.parquet", "parquet", parquet_chunks, True
+    ),
+}
@@ -2,25 +2,59 @@
 Metrics logger — writes usage events to an independent PostgreSQL database.
 All calls are fire-and-forget: exceptions are caught internally and never
 propagate to the caller.
+
+``log_event`` only appends the row to a bounded in-memory buffer. A
+background thread drains it with multi-row INSERTs every
+METRICS_FLUSH_INTERVAL_MS or as soon as METRICS_BATCH_SIZE events are
+waiting, so a slow metrics database never delays a request. When the
+buffer is full the oldest event is dropped and counted; the buffer is
+flushed on shutdown.
+
+Dashboards read ``metric_rollups``: per hour and per day, per module,
+action, center and disease type, the event count, the cohort size sum and
+``coe_response_time_ms`` percentiles. The writer remembers which time
+range it wrote and, at most every METRICS_ROLLUP_INTERVAL seconds,
+recomputes the rollup buckets of that range from the raw events (a BRIN
+index on ``metric_events.timestamp`` keeps that scan small). Missing
+dimensions are stored as '' so that buckets can be upserted.
+
+``metric_events`` is range partitioned by month on ``timestamp``.
+``maintain_partitions`` creates the partitions METRICS_PARTITIONS_AHEAD
+months in advance and drops those older than METRICS_RETENTION_MONTHS; it
+runs at startup and then hourly from the writer thread. A table created
+before partitioning is attached as the first partition.
 """
 
 import logging
-from datetime import datetime, timezone
-from typing import Any, Optional
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
 
 from sqlalchemy import (
+    BigInteger,
     Column,
     DateTime,
+    Float,
+    Index,
     Integer,
     MetaData,
     String,
     Table,
     Text,
+    UniqueConstraint,
     create_engine,
+    func,
+    literal,
+    literal_column,
+    select,
     text,
 )
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 
 from app.config.settings import settings
 
@@ -34,7 +68,13 @@ _metric_events_table = Table(
     "metric_events",
     _metadata,
     Column("id", Integer, primary_key=True, autoincrement=True),
-    Column("timestamp", DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)),
+    # Part of the primary key because it is the partition key.
+    Column(
+        "timestamp",
+        DateTime(timezone=True),
+        primary_key=True,
+        default=lambda: datetime.now(timezone.utc),
+    ),
     Column("module", String(50)),
     Column("action", String(50)),
     Column("user_id", String(100)),
@@ -47,6 +87,38 @@ _metric_events_table = Table(
     Column("coe_response_time_ms", Integer),
     Column("message", Text),
     Column("extra", JSONB),
+    postgresql_partition_by="RANGE (timestamp)",
+)
+
+_timestamp_brin = Index(
+    "ix_metric_events_timestamp_brin",
+    _metric_events_table.c.timestamp,
+    postgresql_using="brin",
+)
+
+ROLLUP_GRANULARITIES = ("hour", "day")
+ROLLUP_DIMENSIONS = ("module", "action", "center", "disease_type")
+
+_metric_rollups_table = Table(
+    "metric_rollups",
+    _metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("granularity", String(4), nullable=False),
+    Column("bucket", DateTime(timezone=True), nullable=False),
+    Column("module", String(50), nullable=False, server_default=""),
+    Column("action", String(50), nullable=False, server_default=""),
+    Column("center", String(50), nullable=False, server_default=""),
+    Column("disease_type", String(20), nullable=False, server_default=""),
+    Column("event_count", Integer, nullable=False),
+    Column("cohort_size_sum", BigInteger, nullable=False),
+    Column("response_time_count", Integer, nullable=False),
+    Column("response_time_avg_ms", Float),
+    Column("response_time_p50_ms", Float),
+    Column("response_time_p95_ms", Float),
+    Column("response_time_p99_ms", Float),
+    UniqueConstraint(
+        "granularity", "bucket", *ROLLUP_DIMENSIONS, name="uq_metric_rollups_bucket"
+    ),
 )
 
 
@@ -67,12 +139,359 @@ def create_metrics_tables() -> None:
         logger.warning("[METRICS] METRICS_DB_URL not configured — metrics disabled")
         return
     try:
+        with engine.begin() as conn:
+            _partition_legacy_table(conn)
         _metadata.create_all(engine, checkfirst=True)
+        with engine.begin() as conn:
+            maintain_partitions(conn)
+        # create_all skips the indexes of tables that already exist.
+        _timestamp_brin.create(engine, checkfirst=True)
+        with engine.begin() as conn:
+            if conn.execute(select(_metric_rollups_table.c.id).limit(1)).first() is None:
+                refresh_rollups(conn)
         logger.info("[METRICS] metrics_events table ready")
     except Exception as exc:
         logger.warning("[METRICS] Could not create metrics table: %s", exc)
 
 
+# Serializes partition DDL between workers sharing the metrics database.
+_PARTITION_LOCK_ID = 0x6D657472
+_BOUND = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+
+def _month_start(moment: datetime, offset: int = 0) -> datetime:
+    moment = moment.astimezone(timezone.utc)
+    month = moment.year * 12 + moment.month - 1 + offset
+    return datetime(month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    value = value.strip("'")
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value)
+
+
+def _partitions(conn) -> Dict[str, Tuple[Optional[datetime], Optional[datetime]]]:
+    """Name -> (lower, upper) bound of every metric_events partition."""
+    rows = conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'metric_events'::regclass"
+        )
+    ).all()
+    bounds = {}
+    for name, expr in rows:
+        match = _BOUND.search(expr or "")
+        if match:
+            bounds[name] = (_parse_bound(match.group(1)), _parse_bound(match.group(2)))
+    return bounds
+
+
+def _partition_legacy_table(conn) -> None:
+    """
+    Turn a pre-partitioning metric_events table into the partitioned
+    parent, keeping the old rows as a partition up to next month.
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _PARTITION_LOCK_ID})
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('metric_events')")
+    ).scalar()
+    if relkind != "r":
+        return
+    upper = _month_start(datetime.now(timezone.utc), 1)
+    logger.info("[METRICS] Partitioning metric_events (existing rows up to %s)", upper)
+    conn.execute(text("ALTER TABLE metric_events RENAME TO metric_events_legacy"))
+    conn.execute(
+        text("ALTER SEQUENCE IF EXISTS metric_events_id_seq RENAME TO metric_events_legacy_id_seq")
+    )
+    conn.execute(
+        text("ALTER INDEX IF EXISTS metric_events_pkey RENAME TO metric_events_legacy_pkey")
+    )
+    conn.execute(
+        text("ALTER INDEX IF EXISTS ix_metric_events_timestamp_brin RENAME TO ix_metric_events_legacy_timestamp_brin")
+    )
+    _metric_events_table.create(conn)
+    conn.execute(text("ALTER TABLE metric_events_legacy ALTER COLUMN timestamp SET NOT NULL"))
+    conn.execute(
+        text(
+            "ALTER TABLE metric_events ATTACH PARTITION metric_events_legacy "
+            f"FOR VALUES FROM (MINVALUE) TO ('{upper.isoformat()}')"
+        )
+    )
+    conn.execute(
+        text(
+            "SELECT setval('metric_events_id_seq', "
+            "(SELECT COALESCE(MAX(id), 0) + 1 FROM metric_events_legacy), false)"
+        )
+    )
+
+
+def maintain_partitions(conn, now: Optional[datetime] = None) -> None:
+    """Create upcoming monthly partitions and drop expired ones."""
+    now = now or datetime.now(timezone.utc)
+    conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _PARTITION_LOCK_ID})
+    existing = _partitions(conn)
+
+    def covered(moment: datetime) -> bool:
+        return any(
+            (lower is None or lower <= moment) and (upper is None or moment < upper)
+            for lower, upper in existing.values()
+        )
+
+    for offset in range(settings.METRICS_PARTITIONS_AHEAD + 1):
+        start, end = _month_start(now, offset), _month_start(now, offset + 1)
+        if covered(start):
+            continue
+        name = f"metric_events_{start:%Y%m}"
+        conn.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF metric_events "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+        existing[name] = (start, end)
+        logger.info("[METRICS] Created partition %s", name)
+
+    if settings.METRICS_RETENTION_MONTHS <= 0:
+        return
+    cutoff = _month_start(now, -settings.METRICS_RETENTION_MONTHS)
+    for name, (_, upper) in existing.items():
+        if upper is not None and upper <= cutoff:
+            conn.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+            logger.info("[METRICS] Dropped expired partition %s", name)
+
+
+class PartitionMaintainer:
+    """Runs maintain_partitions at most once per interval."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._ran_at = time.monotonic()
+
+    def run(self, engine) -> None:
+        if time.monotonic() - self._ran_at < self.interval:
+            return
+        self._ran_at = time.monotonic()
+        try:
+            with engine.begin() as conn:
+                maintain_partitions(conn)
+        except Exception as exc:
+            logger.warning("[METRICS] Partition maintenance failed: %s", exc)
+
+
+def _floor(moment: datetime, granularity: str) -> datetime:
+    moment = moment.astimezone(timezone.utc)
+    if granularity == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+_STEPS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+def refresh_rollups(
+    conn, since: Optional[datetime] = None, until: Optional[datetime] = None
+) -> None:
+    """
+    Recompute the rollup buckets overlapping [since, until] from the raw
+    events (all of them when no range is given) and upsert them.
+    """
+    t = _metric_events_table
+    rt = t.c.coe_response_time_ms
+    for granularity in ROLLUP_GRANULARITIES:
+        # Inline constants so the GROUP BY expressions match the select list.
+        bucket = func.date_trunc(
+            literal_column(f"'{granularity}'"),
+            func.timezone(literal_column("'UTC'"), t.c.timestamp),
+        )
+        dims = [func.coalesce(t.c[name], literal_column("''")) for name in ROLLUP_DIMENSIONS]
+        stmt = select(
+            literal(granularity),
+            func.timezone(literal_column("'UTC'"), bucket),
+            *dims,
+            func.count(),
+            func.coalesce(func.sum(t.c.cohort_size), 0),
+            func.count(rt),
+            func.avg(rt),
+            func.percentile_cont(0.5).within_group(rt),
+            func.percentile_cont(0.95).within_group(rt),
+            func.percentile_cont(0.99).within_group(rt),
+        ).group_by(bucket, *dims)
+        if since is not None:
+            stmt = stmt.where(t.c.timestamp >= _floor(since, granularity))
+        if until is not None:
+            stmt = stmt.where(t.c.timestamp < _floor(until, granularity) + _STEPS[granularity])
+
+        columns = [
+            "granularity", "bucket", *ROLLUP_DIMENSIONS, "event_count",
+            "cohort_size_sum", "response_time_count", "response_time_avg_ms",
+            "response_time_p50_ms", "response_time_p95_ms", "response_time_p99_ms",
+        ]
+        upsert = pg_insert(_metric_rollups_table).from_select(columns, stmt)
+        upsert = upsert.on_conflict_do_update(
+            constraint="uq_metric_rollups_bucket",
+            set_={name: upsert.excluded[name] for name in columns[6:]},
+        )
+        conn.execute(upsert)
+
+
+class RollupTracker:
+    """Time range written since the last rollup refresh."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._range: Optional[Tuple[datetime, datetime]] = None
+        self._refreshed_at = time.monotonic()
+
+    def mark(self, batch: List[Dict[str, Any]]) -> None:
+        stamps = [row["timestamp"] for row in batch if row.get("timestamp")]
+        if not stamps:
+            return
+        low, high = min(stamps), max(stamps)
+        if self._range is not None:
+            low, high = min(low, self._range[0]), max(high, self._range[1])
+        self._range = (low, high)
+
+    def refresh(self, engine, *, force: bool = False) -> None:
+        if self._range is None:
+            return
+        if not force and time.monotonic() - self._refreshed_at < self.interval:
+            return
+        since, until = self._range
+        try:
+            with engine.begin() as conn:
+                refresh_rollups(conn, since, until)
+        except Exception as exc:
+            logger.warning("[METRICS] Failed to refresh rollups: %s", exc)
+        else:
+            self._range = None
+        self._refreshed_at = time.monotonic()
+
+
+METRIC_EVENTS_WRITTEN = Counter(
+    "raven_metric_events_written_total",
+    "Metric events written to the metrics database",
+)
+METRIC_EVENTS_DROPPED = Counter(
+    "raven_metric_events_dropped_total",
+    "Metric events that were never written",
+    ["reason"],
+)
+METRIC_EVENTS_BUFFERED = Gauge(
+    "raven_metric_events_buffered",
+    "Metric events waiting in the in-memory buffer",
+)
+
+
+class MetricsBuffer:
+    """Bounded ring buffer of metric rows drained by a background thread."""
+
+    def __init__(self, *, capacity: int, batch_size: int, flush_interval: float):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows: deque = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.rollups = RollupTracker(settings.METRICS_ROLLUP_INTERVAL)
+        self.partitions = PartitionMaintainer(3600)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def put(self, row: Dict[str, Any]) -> None:
+        with self._cond:
+            if len(self._rows) >= self.capacity:
+                self._rows.popleft()
+                METRIC_EVENTS_DROPPED.labels(reason="buffer_full").inc()
+            self._rows.append(row)
+            METRIC_EVENTS_BUFFERED.set(len(self._rows))
+            if len(self._rows) >= self.batch_size:
+                self._cond.notify()
+        self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._stopping or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="metrics-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _take(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            batch = [
+                self._rows.popleft()
+                for _ in range(min(self.batch_size, len(self._rows)))
+            ]
+            METRIC_EVENTS_BUFFERED.set(len(self._rows))
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        engine = _get_engine()
+        if engine is None or not batch:
+            return
+        try:
+            with engine.begin() as conn:
+                conn.execute(_metric_events_table.insert().values(batch))
+            METRIC_EVENTS_WRITTEN.inc(len(batch))
+            self.rollups.mark(batch)
+        except Exception as exc:
+            METRIC_EVENTS_DROPPED.labels(reason="write_error").inc(len(batch))
+            logger.warning("[METRICS] Failed to write %d events: %s", len(batch), exc)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._rows) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._stopping:
+                    return
+            self._write(self._take())
+            engine = _get_engine()
+            if engine is not None:
+                self.partitions.run(engine)
+                self.rollups.refresh(engine)
+
+    def flush(self) -> None:
+        """Write every buffered event from the calling thread."""
+        while True:
+            batch = self._take()
+            if not batch:
+                return
+            self._write(batch)
+
+    def stop(self) -> None:
+        """Stop the writer thread and flush what is left."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+        engine = _get_engine()
+        if engine is not None:
+            self.rollups.refresh(engine, force=True)
+
+
+_buffer = MetricsBuffer(
+    capacity=settings.METRICS_BUFFER_SIZE,
+    batch_size=settings.METRICS_BATCH_SIZE,
+    flush_interval=settings.METRICS_FLUSH_INTERVAL_MS / 1000,
+)
+
+
+def flush_metrics() -> None:
+    """Stop the background writer and write pending events. Called at shutdown."""
+    _buffer.stop()
+
+
 def log_event(
     module: str,
     action: str,
@@ -88,9 +507,8 @@ def log_event(
     message: Optional[str] = None,
     extra: Optional[dict[str, Any]] = None,
 ) -> None:
-    """Insert a metric event. Never raises — safe to call from any service."""
-    engine = _get_engine()
-    if engine is None:
+    """Buffer a metric event. Never raises or blocks on the database."""
+    if not getattr(settings, "METRICS_DB_URL", None):
         return
     try:
         row = {
@@ -108,9 +526,6 @@ def log_event(
             "message": message,
             "extra": extra,
         }
-        with engine.begin() as conn:
-            conn.execute(_metric_events_table.insert().values(**row))
-    except SQLAlchemyError as exc:
-        logger.warning("[METRICS] Failed to write event %s.%s: %s", module, action, exc)
+        _buffer.put(row)
     except Exception as exc:
         logger.warning("[METRICS] Unexpected error logging event %s.%s: %s", module, action, exc)
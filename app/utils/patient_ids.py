@@ -0,0 +1,103 @@
+"""
+Vectorized helpers for patient-id sets sent by the CoEs.
+Patient ids are handled as NumPy arrays instead of Python lists: int64 for
+numeric ids, unicode for the text form they are stored in.
+
+Ids are stored as their JSON text, so a CoE's ids keep their type: "12"
+is stored as '"12"' and 12 as '12', and both come back unchanged.
+"""
+
+import json
+from typing import Any, Iterable, List, Optional
+
+import numpy as np
+
+
+def as_text_id(value: Any) -> str:
+    """
+    Stored (text) form of a patient id: its JSON, as Postgres renders a
+    jsonb scalar with ``::text``.
+    """
+    return json.dumps(value, ensure_ascii=False)
+
+
+def as_text_ids(ids: Iterable[Any]) -> List[str]:
+    return [as_text_id(value) for value in ids]
+
+
+def from_text_id(value: str) -> Any:
+    """Inverse of as_text_id: the id as the CoE sent it."""
+    return json.loads(value)
+
+
+def from_text_ids(ids: Iterable[str]) -> List[Any]:
+    return [from_text_id(value) for value in ids]
+
+
+def as_id_array(ids: Optional[Iterable[Any]]) -> np.ndarray:
+    """Convert any iterable of patient ids to a 1-D array."""
+    if ids is None:
+        return np.empty(0, dtype=np.int64)
+    if isinstance(ids, np.ndarray):
+        return ids.ravel()
+    ids = ids if isinstance(ids, (list, tuple)) else list(ids)
+    if not ids:
+        return np.empty(0, dtype=np.int64)
+    return np.asarray(ids).ravel()
+
+
+def _first_occurrences(sorted_ids: np.ndarray) -> np.ndarray:
+    """Boolean mask of the first element of each run in a sorted array."""
+    mask = np.empty(sorted_ids.size, dtype=bool)
+    mask[:1] = True
+    np.not_equal(sorted_ids[1:], sorted_ids[:-1], out=mask[1:])
+    return mask
+
+
+def unique_ids(ids: Iterable[Any], *, keep_order: bool = False) -> np.ndarray:
+    """
+    Drop duplicated ids. Sort-based, which is faster than np.unique for
+    plain arrays. With keep_order=True the first-seen order is
+    preserved, otherwise the result is sorted.
+    """
+    arr = as_id_array(ids)
+    if arr.size == 0:
+        return arr
+    if not keep_order:
+        sorted_ids = np.sort(arr)
+        return sorted_ids[_first_occurrences(sorted_ids)]
+    order = np.argsort(arr, kind="stable")
+    first = order[_first_occurrences(arr[order])]
+    return arr[np.sort(first)]
+
+
+def merge_unique(*id_sets: Iterable[Any], keep_order: bool = False) -> np.ndarray:
+    """Concatenate several id sets and drop duplicates (see unique_ids)."""
+    arrays = [as_id_array(ids) for ids in id_sets]
+    if not arrays:
+        return np.empty(0, dtype=np.int64)
+    return unique_ids(np.concatenate(arrays), keep_order=keep_order)
+
+
+def intersect(a: Iterable[Any], b: Iterable[Any]) -> np.ndarray:
+    """Sorted ids present in both sets."""
+    a_arr = as_id_array(a)
+    return unique_ids(a_arr[np.isin(a_arr, as_id_array(b))])
+
+
+def difference(a: Iterable[Any], b: Iterable[Any]) -> np.ndarray:
+    """Sorted ids present in a but not in b."""
+    a_arr = as_id_array(a)
+    return unique_ids(a_arr[~np.isin(a_arr, as_id_array(b))])
+
+
+def compare_runs(previous: Iterable[Any], current: Iterable[Any]) -> dict[str, int]:
+    """Count retained, added and removed patients between two runs."""
+    prev = unique_ids(previous)
+    curr = unique_ids(current)
+    retained = int(np.count_nonzero(np.isin(curr, prev)))
+    return {
+        "retained": int(retained),
+        "added": int(curr.size - retained),
+        "removed": int(prev.size - retained),
+    }
@@ -0,0 +1,50 @@
+"""
+orjson-backed JSON responses.
+
+Returning an ``ORJSONResponse`` from an endpoint skips FastAPI's
+``jsonable_encoder`` pass: datetimes, enums, UUIDs, dataclasses and numpy
+values are encoded natively by orjson straight to bytes. Endpoints with a
+``response_model`` keep FastAPI's own pydantic-core serialization.
+"""
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def serialize_rows(rows, fields) -> ORJSONResponse:
+    """List response of the given attributes of each row, omitting None values."""
+    return ORJSONResponse(
+        [
+            {
+                k: v
+                for k, v in ((k, getattr(row, k, None)) for k in fields)
+                if v is not None
+            }
+            for row in rows
+        ]
+    )
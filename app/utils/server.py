@@ -0,0 +1,93 @@
+"""
+Serving profile derived from the container's CPU limit.
+
+``cpu_limit`` reads the cgroup quota (v2 ``cpu.max``, else v1
+``cpu.cfs_quota_us``/``cpu.cfs_period_us``) and falls back to the CPUs the
+process may run on, so a 500m pod counts as half a core instead of the
+node's core count. ``gunicorn.conf.py`` sizes the worker processes from it
+and each worker sizes the threadpool used by sync endpoints at startup.
+SERVER_WORKERS / SERVER_THREADPOOL_SIZE override the derived values.
+"""
+
+import logging
+import math
+import os
+from typing import Optional
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_quota(root: str = CGROUP_ROOT) -> Optional[float]:
+    """CPUs allowed by the cgroup quota, or None when unlimited/unknown."""
+    cpu_max = _read(os.path.join(root, "cpu.max"))
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+    quota = _read(os.path.join(root, "cpu", "cpu.cfs_quota_us"))
+    period = _read(os.path.join(root, "cpu", "cpu.cfs_period_us"))
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def cpu_limit(root: str = CGROUP_ROOT) -> float:
+    try:
+        available = float(len(os.sched_getaffinity(0)))
+    except AttributeError:  # pragma: no cover - not available on macOS
+        available = float(os.cpu_count() or 1)
+    quota = cgroup_cpu_quota(root)
+    return min(quota, available) if quota else available
+
+
+def worker_count(cpus: Optional[float] = None) -> int:
+    if settings.SERVER_WORKERS:
+        return settings.SERVER_WORKERS
+    cpus = cpu_limit() if cpus is None else cpus
+    workers = math.ceil(cpus * settings.SERVER_WORKERS_PER_CORE)
+    return max(1, min(workers, settings.SERVER_MAX_WORKERS))
+
+
+def threadpool_size(cpus: Optional[float] = None, workers: Optional[int] = None) -> int:
+    """Threads for sync endpoints in one worker."""
+    if settings.SERVER_THREADPOOL_SIZE:
+        return settings.SERVER_THREADPOOL_SIZE
+    cpus = cpu_limit() if cpus is None else cpus
+    workers = worker_count(cpus) if workers is None else workers
+    threads = math.ceil(cpus / workers * settings.SERVER_THREADS_PER_CORE)
+    return max(4, min(threads, 64))
+
+
+def configure_threadpool() -> int:
+    """Resize the default anyio threadpool; call from the running event loop."""
+    import anyio.to_thread
+
+    size = threadpool_size()
+    anyio.to_thread.current_default_thread_limiter().total_tokens = size
+    logger.info("Sync endpoint threadpool size: %s", size)
+    return size
+
+
+def after_fork() -> None:
+    """Reset per-process state inherited from a preloading parent."""
+    from app.db.session import engine, replica_pool
+    from app.utils.logging_config import restart_logging
+
+    restart_logging()
+    # Connections opened by the parent must not be shared with it.
+    engine.dispose(close=False)
+    for replica_engine in replica_pool.engines:
+        replica_engine.dispose(close=False)
@@ -3,13 +3,6 @@ Telemetry and observability configuration using OpenTelemetry
 """
 
 import os
-from opentelemetry import trace
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.sdk.trace.sampling import TraceIdRatioBased
 
 from app.config.settings import settings
 
@@ -22,6 +15,16 @@ def setup_telemetry(app):
     if not settings.ENABLE_TELEMETRY:
         return
 
+    # Imported here: the OTLP/gRPC stack is slow to import and unused
+    # when telemetry is disabled.
+    from opentelemetry import trace
+    from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import TraceIdRatioBased
+
     # Create a resource with service metadata
     resource = Resource.create({
         "service.name": settings.PROJECT_NAME,
@@ -0,0 +1,132 @@
+"""
+Cache of authenticated tokens.
+
+Maps the SHA-256 of a bearer token to its decoded claims and a snapshot of
+the user's columns, so repeated requests with the same token skip both the
+token decoding and the ``users`` lookup. Entries live for at most
+AUTH_CACHE_TTL seconds and never past the token's ``exp``; the cache keeps
+the AUTH_CACHE_SIZE most recently used tokens.
+
+Any committed change to a user (deactivation included) or its deletion
+drops that user's entries in this process.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+from app.config.settings import settings
+from app.models.user import User
+
+_CHANGED_USERS_KEY = "token_cache_changed_users"
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenCache:
+    """LRU + TTL cache of token -> (claims, user column snapshot)."""
+
+    def __init__(self, *, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any], Dict[str, Any]]]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, token: str) -> Optional[Tuple[User, Dict[str, Any]]]:
+        """Cached (user, claims) for the token, with the user attached to db."""
+        key = _token_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, claims, snapshot = entry
+            if expires_at <= time.time():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+
+        user = db.identity_map.get(identity_key(User, snapshot["id"]))
+        if user is None:
+            # Attach without a SELECT; relationships still lazy load.
+            user = User(**snapshot)
+            make_transient_to_detached(user)
+            db.add(user)
+        return user, claims
+
+    def put(self, token: str, claims: Dict[str, Any], user: User) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        if expires_at <= time.time():
+            return
+        snapshot = {
+            attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs
+        }
+        key = _token_key(token)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (expires_at, claims, snapshot)
+            self._by_user.setdefault(snapshot["id"], set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            user_id = entry[2]["id"]
+            keys = self._by_user.get(user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[user_id]
+
+    def invalidate_users(self, user_ids) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                for key in list(self._by_user.get(user_id, ())):
+                    self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+
+token_cache = TokenCache(
+    max_size=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL
+)
+
+
+@event.listens_for(Session, "before_flush")
+def _remember_user_changes(session, flush_context, instances):
+    user_ids = {
+        obj.id
+        for obj in session.dirty | session.deleted
+        if isinstance(obj, User) and obj.id is not None
+    }
+    if user_ids:
+        session.info.setdefault(_CHANGED_USERS_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    user_ids = session.info.pop(_CHANGED_USERS_KEY, None)
+    if user_ids:
+        token_cache.invalidate_users(user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_user_changes(session):
+    session.info.pop(_CHANGED_USERS_KEY, None)
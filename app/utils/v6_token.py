@@ -0,0 +1,217 @@
+"""
+Vantage6 service token broker.
+
+Obtains the access token used for every Vantage6 call from the Vantage6
+Keycloak realm (password grant with V6_USERNAME / V6_PASSWORD, then the
+refresh_token grant while the refresh token lasts) and caches it per worker.
+
+Once a token is within V6_TOKEN_REFRESH_MARGIN seconds of its expiry (at most
+half of its lifetime, for short-lived tokens) a single background refresh is
+started and callers keep getting the current token (a failed refresh is
+retried after ``retry_interval`` seconds), so V6 calls never wait on
+authentication while a valid token exists. Only the first request of a
+worker (or one after the token actually expired) waits, and concurrent
+callers share that one refresh.
+
+Without V6 credentials the static V6_ACCESS_TOKEN (or the legacy TOKEN_V6
+constant) is returned as before.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+
+from app.config.settings import settings
+from app.utils.constants import TOKEN_V6
+
+logger = logging.getLogger(__name__)
+
+
+class V6AuthError(RuntimeError):
+    """No valid Vantage6 token could be obtained."""
+
+
+class V6TokenBroker:
+    """Per-process cache of the Vantage6 service token."""
+
+    def __init__(
+        self,
+        *,
+        auth_url: str,
+        realm: str,
+        client_id: str,
+        username: str,
+        password: str,
+        static_token: Optional[str] = None,
+        refresh_margin: float = 60.0,
+        retry_interval: float = 5.0,
+        timeout: float = 10.0,
+    ):
+        self.auth_url = auth_url.rstrip("/")
+        self.realm = realm
+        self.client_id = client_id
+        self.username = username
+        self.password = password
+        self.static_token = static_token
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+
+        self._access_token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._refresh_token: Optional[str] = None
+        self._refresh_usable_until = 0.0
+        self._failed_at = 0.0
+        self._last_error: Optional[Exception] = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._http: Optional[httpx.Client] = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.username and self.password)
+
+    def _margin(self, lifetime: float) -> float:
+        """Refresh margin for a token of the given lifetime."""
+        return min(self.refresh_margin, lifetime / 2)
+
+    @property
+    def token_path(self) -> str:
+        return f"/realms/{self.realm}/protocol/openid-connect/token"
+
+    @property
+    def http(self) -> httpx.Client:
+        if self._http is None:
+            self._http = httpx.Client(base_url=self.auth_url, timeout=self.timeout)
+        return self._http
+
+    def close(self) -> None:
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+    def request_token(self, username: str, password: str) -> Dict[str, Any]:
+        """Token response for the given credentials (password grant)."""
+        return self._token_request(
+            {"grant_type": "password", "username": username, "password": password}
+        )
+
+    def _token_request(self, data: Dict[str, str]) -> Dict[str, Any]:
+        response = self.http.post(
+            self.token_path, data={"client_id": self.client_id, **data}
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def get_token(self) -> str:
+        """A valid V6 access token; only blocks when none is cached."""
+        if not self.configured:
+            return self.static_token or TOKEN_V6
+
+        now = time.time()
+        token = self._access_token
+        if token and now < self._expires_at:
+            if now >= self._refresh_at:
+                self._refresh_in_background()
+            return token
+
+        with self._lock:
+            # Another caller may have refreshed while we waited.
+            now = time.time()
+            if self._access_token and now < self._expires_at:
+                return self._access_token
+            if self._last_error and now - self._failed_at < self.retry_interval:
+                raise V6AuthError(
+                    f"Vantage6 authentication failed: {self._last_error}"
+                )
+            self._refresh()
+            return self._access_token
+
+    async def get_token_async(self) -> str:
+        token = self._access_token
+        if self.configured and token and time.time() < self._refresh_at:
+            return token
+        return await run_in_threadpool(self.get_token)
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(
+            target=self._background_refresh, name="v6-token-refresh", daemon=True
+        ).start()
+
+    def _background_refresh(self) -> None:
+        try:
+            with self._lock:
+                if time.time() < self._refresh_at:
+                    return
+                self._refresh()
+        except Exception as e:
+            # The current token stays in use until it expires; try again
+            # after retry_interval rather than on the next call.
+            with self._lock:
+                self._refresh_at = min(
+                    time.time() + self.retry_interval, self._expires_at
+                )
+            logger.warning("[V6] Background token refresh failed: %s", e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _refresh(self) -> None:
+        """Fetch a new token; caller holds the lock."""
+        now = time.time()
+        try:
+            if self._refresh_token and now < self._refresh_usable_until:
+                try:
+                    payload = self._token_request(
+                        {"grant_type": "refresh_token", "refresh_token": self._refresh_token}
+                    )
+                except httpx.HTTPStatusError:
+                    # Session ended on the server side; log in again.
+                    payload = self.request_token(self.username, self.password)
+            else:
+                payload = self.request_token(self.username, self.password)
+        except Exception as e:
+            self._failed_at = time.time()
+            self._last_error = e
+            raise V6AuthError(f"Vantage6 authentication failed: {e}") from e
+
+        expires_in = float(payload.get("expires_in", 300))
+        refresh_expires_in = float(payload.get("refresh_expires_in", 0))
+        self._access_token = payload["access_token"]
+        self._expires_at = now + expires_in
+        self._refresh_at = self._expires_at - self._margin(expires_in)
+        self._refresh_token = payload.get("refresh_token")
+        self._refresh_usable_until = (
+            now + refresh_expires_in - self._margin(refresh_expires_in)
+        )
+        self._last_error = None
+        logger.info("[V6] Obtained service token valid for %ss", payload.get("expires_in"))
+
+
+v6_token_broker = V6TokenBroker(
+    auth_url=settings.V6_AUTH_URL,
+    realm=settings.V6_AUTH_REALM,
+    client_id=settings.V6_AUTH_CLIENT_ID,
+    username=settings.V6_USERNAME,
+    password=settings.V6_PASSWORD,
+    static_token=settings.V6_ACCESS_TOKEN,
+    refresh_margin=settings.V6_TOKEN_REFRESH_MARGIN,
+    timeout=settings.KEYCLOAK_HTTP_TIMEOUT,
+)
+
+
+def get_v6_token() -> str:
+    return v6_token_broker.get_token()
+
+
+async def get_v6_token_async() -> str:
+    return await v6_token_broker.get_token_async()
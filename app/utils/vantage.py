@@ -1,12 +1,9 @@
 from typing import Optional, Dict, Any
 import logging
 
-import requests
 import json
 import base64
 
-from vantage6.client import UserClient
-
 logger = logging.getLogger(__name__)
 
 # def get_vantage_token(
@@ -59,22 +56,11 @@ def create_vantage_client(username: str, password: str) -> Optional[Any]:
         return None
 
 
-def create_vantage_user_client(username: str, password: str):
-    from vantage6.client import UserClient
-
-    client = UserClient(
-        host="https://vantage6-core.orchestrator.idea.lst.tfo.upm.es",
-        port=443,
-        path="/server",
-        auth_url="https://vantage6-auth.orchestrator.idea.lst.tfo.upm.es:443",
-        auth_client="public_client",
-        auth_realm="vantage6",
-        log_level="INFO",
-    )
-
-    client.authenticate(username=username, password=password)
+def create_vantage_user_client(username: str, password: str) -> str:
+    """Vantage6 access token for the given user, straight from the V6 realm."""
+    from app.utils.v6_token import v6_token_broker
 
-    return client._access_token
+    return v6_token_broker.request_token(username, password)["access_token"]
 
 
 def create_vantage_organization(organization_data: Dict[str, Any]) -> Optional[dict]:
@@ -0,0 +1,45 @@
+"""
+Gunicorn configuration for production.
+
+Run with: gunicorn main:app -c gunicorn.conf.py
+
+All values come from the SERVER_* settings. The app is preloaded in the
+master so imports and module-level caches are shared copy-on-write; each
+forked worker then restarts its logging thread and drops inherited DB
+connections.
+"""
+
+from app.config.settings import settings
+from app.utils.server import after_fork, cpu_limit, threadpool_size, worker_count
+
+_cpus = cpu_limit()
+
+bind = settings.SERVER_BIND
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = worker_count(_cpus)
+preload_app = settings.SERVER_PRELOAD
+
+# Recycle workers gradually to bound memory growth; the jitter keeps them
+# from restarting all at once.
+max_requests = settings.SERVER_MAX_REQUESTS
+max_requests_jitter = settings.SERVER_MAX_REQUESTS_JITTER
+
+timeout = settings.SERVER_TIMEOUT
+graceful_timeout = settings.SERVER_GRACEFUL_TIMEOUT
+keepalive = settings.SERVER_KEEPALIVE
+
+accesslog = None  # requests are logged by the app (app.access)
+errorlog = "-"
+
+
+def when_ready(server):
+    server.log.info(
+        "CPU limit %.2f: %s workers, %s sync threads each",
+        _cpus,
+        workers,
+        threadpool_size(_cpus, workers),
+    )
+
+
+def post_fork(server, worker):
+    after_fork()
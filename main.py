@@ -2,7 +2,6 @@
 Main FastAPI application instance.
 """
 
-import json
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
@@ -12,17 +11,36 @@ from prometheus_client import make_asgi_app
 
 from app.api.routes import api_router
 from app.config.settings import settings
+from app.db.query_stats import (
+    DB_QUERIES_PER_REQUEST,
+    QUERY_COUNT_HEADER,
+    start_counting,
+)
+from app.db.routing import READ_YOUR_WRITES_COOKIE, user_key_from_authorization
+from app.db.session import read_your_writes, replica_pool
+from app.services.workspace_history import history_writer
+from app.utils.compression import CompressionMiddleware
+from app.utils.keycloak import keycloak_handler
+from app.utils.logging_config import parse_sampling, setup_logging
+from app.utils.server import configure_threadpool
 from app.utils.telemetry import setup_telemetry
-from app.utils.metrics_logger import create_metrics_tables, log_event
+from app.utils.metrics_logger import create_metrics_tables, flush_metrics, log_event
+from app.utils.v6_token import v6_token_broker
 
 import logging
-import sys
+
+access_logger = logging.getLogger("app.access")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    configure_threadpool()
     create_metrics_tables()
     yield
+    history_writer.stop()
+    flush_metrics()
+    await keycloak_handler.aclose()
+    v6_token_broker.close()
 
 
 app = FastAPI(
@@ -74,13 +92,18 @@ async def log_requests(request: Request, call_next):
     response = await call_next(request)
 
     if settings.ENVIRONMENT != "development":
-        log_data = {
-            "request_path": request.url.path,
-            "request_method": request.method,
-            "status_code": response.status_code,
-            "client_host": request.client.host if request.client else None,
-        }
-        print(json.dumps(log_data))
+        access_logger.info(
+            "%s %s %s",
+            request.method,
+            request.url.path,
+            response.status_code,
+            extra={
+                "request_path": request.url.path,
+                "request_method": request.method,
+                "status_code": response.status_code,
+                "client_host": request.client.host if request.client else None,
+            },
+        )
 
     # Log algorithm launches from data-preparation endpoints
     if (
@@ -93,6 +116,48 @@ async def log_requests(request: Request, call_next):
 
     return response
 
+# Middleware counting SQL statements per request
+@app.middleware("http")
+async def count_db_queries(request: Request, call_next):
+    counter = start_counting()
+    response = await call_next(request)
+
+    route = request.scope.get("route")
+    DB_QUERIES_PER_REQUEST.labels(
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+    ).observe(counter.count)
+    if settings.DB_QUERY_COUNT_HEADER:
+        response.headers[QUERY_COUNT_HEADER] = str(counter.count)
+    return response
+
+# Read-your-writes: after a write, the user's reads stay on the primary
+@app.middleware("http")
+async def pin_writes_to_primary(request: Request, call_next):
+    response = await call_next(request)
+    if not replica_pool or not getattr(request.state, "db_wrote", False):
+        return response
+    user_key = user_key_from_authorization(request.headers.get("authorization"))
+    if user_key:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            read_your_writes.issue(user_key),
+            max_age=int(read_your_writes.window) + 1,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+# Compress large complete responses (outermost, so it sees the final body)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+    )
+
 # Include API routes
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -100,11 +165,12 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 async def root():
     return {"message": "Welcome to the RAVEN API v1. For documentation, visit /docs or /redoc."}
 
-# Configurar logging global
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    stream=sys.stdout
+# Configurar logging global: records are formatted and written by a
+# background listener thread
+setup_logging(
+    level=settings.LOG_LEVEL,
+    json_format=settings.log_json,
+    sampling=parse_sampling(settings.LOG_SAMPLING),
 )
 
 # Suppress noisy third-party loggers
@@ -0,0 +1,107 @@
+"""cohort_results: move patient ids to cohort_result_executions
+
+Revision ID: d4a8e1f3b6c2
+Revises: c7e2f84d9a1b
+Create Date: 2026-10-19 12:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "d4a8e1f3b6c2"
+down_revision = "c7e2f84d9a1b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "cohort_result_executions",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "cohort_id",
+            sa.Integer(),
+            sa.ForeignKey("cohorts.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("token", sa.String(length=32), nullable=False),
+        sa.Column("execution_date", sa.String(), nullable=True),
+        sa.Column(
+            "received_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column(
+            "patient_ids",
+            sa.ARRAY(sa.Text()),
+            server_default="{}",
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_cohort_result_executions_cohort_token",
+        "cohort_result_executions",
+        ["cohort_id", "token"],
+    )
+
+    # Backfill one row per stored execution. Each id is stored as its JSON
+    # text, so alphanumeric ids survive and "12" stays distinct from 12.
+    op.execute(
+        """
+        INSERT INTO cohort_result_executions
+            (cohort_id, token, execution_date, received_at, patient_ids)
+        SELECT
+            cr.cohort_id,
+            e->>'token',
+            e->>'execution_date',
+            COALESCE((e->>'received_at')::timestamptz, now()),
+            ARRAY(
+                SELECT pid::text
+                FROM jsonb_array_elements(
+                    COALESCE(e->'patient_ids', '[]'::jsonb)
+                ) WITH ORDINALITY AS ids(pid, n)
+                ORDER BY n
+            )
+        FROM cohort_results cr, jsonb_array_elements(cr.data_id) AS e
+        WHERE e ? 'token'
+        """
+    )
+
+    # data_id is now derived from the executions (see CohortResult.data_id)
+    op.execute("UPDATE cohort_results SET data_id = '[]'::jsonb")
+
+
+def downgrade():
+    op.execute(
+        """
+        UPDATE cohort_results cr
+        SET data_id = COALESCE(
+            (
+                SELECT jsonb_agg(
+                    jsonb_build_object(
+                        'token', x.token,
+                        'execution_date', x.execution_date,
+                        'patient_ids', (
+                            SELECT COALESCE(
+                                jsonb_agg(pid::jsonb ORDER BY n),
+                                '[]'::jsonb
+                            )
+                            FROM unnest(x.patient_ids) WITH ORDINALITY AS ids(pid, n)
+                        ),
+                        'received_at', x.received_at
+                    )
+                    ORDER BY x.id
+                )
+                FROM cohort_result_executions x
+                WHERE x.cohort_id = cr.cohort_id
+            ),
+            '[]'::jsonb
+        )
+        """
+    )
+    op.drop_index(
+        "ix_cohort_result_executions_cohort_token",
+        table_name="cohort_result_executions",
+    )
+    op.drop_table("cohort_result_executions")
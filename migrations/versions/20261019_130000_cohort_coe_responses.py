@@ -0,0 +1,107 @@
+"""cohort_coe_responses: per-cohort CoE response projection
+
+Revision ID: e5b9f2a4c7d3
+Revises: d4a8e1f3b6c2
+Create Date: 2026-10-19 13:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "e5b9f2a4c7d3"
+down_revision = "d4a8e1f3b6c2"
+branch_labels = None
+depends_on = None
+
+# CoE token -> CoE name when this revision was written (app.utils.constants
+# may change later; the backfill must not).
+COE_TOKENS = {
+    "X7K2P9QR": "INT",
+    "M4NZ8WVT": "UDEUSTO",
+    "B6JY3FHL": "MME",
+    "Q1RT5DCG": "UPM",
+    "W9KM2XPN": "HL7 Europe",
+    "H3VB7LZQ": "ECCP",
+    "F8TG4YNK": "ENG",
+    "R2WX6JPM": "CERTH",
+    "L5QN9HCB": "UU",
+    "T7PK1ZVF": "DIGICOR",
+    "N4XH8GYW": "FBK",
+    "C9MZ3RBJ": "IKNL",
+    "J6LV5TQP": "CLB",
+    "G1BK7WNH": "APHP",
+    "Y8FX2MCR": "IIS-FJD",
+    "P3ZT9QKL": "VGR",
+    "V7NW4HBG": "MSCI",
+    "K2JM6YXF": "MUH",
+    "D5RC1PLT": "OUS",
+    "Z9BG8WNQ": "MMCI",
+    "S4KP7VHM": "CLN",
+    "E1XN3ZJY": "FPNS",
+    "U6MW9FBR": "TNO",
+    "A8TZ5QKG": "INF",
+    "I3HY7LVN": "UKE",
+}
+
+
+def upgrade():
+    op.create_table(
+        "cohort_coe_responses",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "cohort_id",
+            sa.Integer(),
+            sa.ForeignKey("cohorts.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("coe", sa.String(length=50), nullable=False),
+        sa.Column("token", sa.String(length=32), nullable=False),
+        sa.Column("responded_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("patient_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_execution_date", sa.String(), nullable=True),
+        sa.UniqueConstraint(
+            "cohort_id", "coe", name="uq_cohort_coe_responses_cohort_coe"
+        ),
+    )
+
+    # Backfill from the stored executions, mapping tokens to CoE names
+    # through a scratch table.
+    op.create_table(
+        "_coe_response_tokens",
+        sa.Column("token", sa.String(length=32), primary_key=True),
+        sa.Column("coe", sa.String(length=50), nullable=False),
+    )
+    op.bulk_insert(
+        sa.table(
+            "_coe_response_tokens",
+            sa.column("token", sa.String),
+            sa.column("coe", sa.String),
+        ),
+        [{"token": token, "coe": coe} for token, coe in COE_TOKENS.items()],
+    )
+    op.execute(
+        """
+        INSERT INTO cohort_coe_responses
+            (cohort_id, coe, token, responded_at, patient_count, last_execution_date)
+        SELECT DISTINCT ON (x.cohort_id, m.coe)
+            x.cohort_id,
+            m.coe,
+            x.token,
+            COALESCE(max(x.received_at) OVER w, now()),
+            (
+                SELECT count(DISTINCT pid)
+                FROM cohort_result_executions y, unnest(y.patient_ids) AS pid
+                WHERE y.cohort_id = x.cohort_id AND y.token = x.token
+            ),
+            max(x.execution_date) OVER w
+        FROM cohort_result_executions x
+        JOIN _coe_response_tokens m ON m.token = x.token
+        WINDOW w AS (PARTITION BY x.cohort_id, x.token)
+        ORDER BY x.cohort_id, m.coe, x.received_at DESC NULLS LAST
+        """
+    )
+    op.drop_table("_coe_response_tokens")
+
+
+def downgrade():
+    op.drop_table("cohort_coe_responses")
@@ -0,0 +1,54 @@
+"""algorithms: add indexed cohort_signature
+
+Revision ID: f6c1a3d5e8b4
+Revises: e5b9f2a4c7d3
+Create Date: 2026-10-19 14:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "f6c1a3d5e8b4"
+down_revision = "e5b9f2a4c7d3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "algorithms", sa.Column("cohort_signature", sa.String(length=64), nullable=True)
+    )
+
+    # Same canonical form as app.models.algorithm.cohort_signature:
+    # sha256 hex of the sorted cohort ids joined by commas.
+    op.execute(
+        """
+        UPDATE algorithms a
+        SET cohort_signature = s.signature
+        FROM (
+            SELECT
+                algorithm_id,
+                encode(
+                    sha256(
+                        convert_to(
+                            string_agg(cohort_id::text, ',' ORDER BY cohort_id),
+                            'UTF8'
+                        )
+                    ),
+                    'hex'
+                ) AS signature
+            FROM cohort_algorithms
+            GROUP BY algorithm_id
+        ) s
+        WHERE s.algorithm_id = a.id
+        """
+    )
+
+    op.create_index(
+        "ix_algorithms_cohort_signature", "algorithms", ["cohort_signature"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_algorithms_cohort_signature", table_name="algorithms")
+    op.drop_column("algorithms", "cohort_signature")
@@ -0,0 +1,66 @@
+"""workspaces: GIN index on team_ids and workspace_visibility table
+
+Revision ID: a7d2b4e6f9c5
+Revises: f6c1a3d5e8b4
+Create Date: 2026-10-19 15:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "a7d2b4e6f9c5"
+down_revision = "f6c1a3d5e8b4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_workspaces_team_ids_gin",
+        "workspaces",
+        ["team_ids"],
+        postgresql_using="gin",
+    )
+
+    op.create_table(
+        "workspace_visibility",
+        sa.Column(
+            "user_id",
+            sa.Integer(),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "workspace_id",
+            sa.Integer(),
+            sa.ForeignKey("workspaces.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+    )
+    op.create_index(
+        "ix_workspace_visibility_workspace_id",
+        "workspace_visibility",
+        ["workspace_id"],
+    )
+
+    # Backfill: creators plus members of any team listed in team_ids
+    op.execute(
+        """
+        INSERT INTO workspace_visibility (user_id, workspace_id)
+        SELECT ut.user_id, w.id
+        FROM user_teams ut
+        JOIN workspaces w ON ut.team_id::text = ANY (w.team_ids)
+        UNION
+        SELECT w.creator_id, w.id
+        FROM workspaces w
+        WHERE w.creator_id IS NOT NULL
+        """
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ix_workspace_visibility_workspace_id", table_name="workspace_visibility"
+    )
+    op.drop_table("workspace_visibility")
+    op.drop_index("ix_workspaces_team_ids_gin", table_name="workspaces")
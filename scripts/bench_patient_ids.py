@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for patient-id merging: Python lists + dict.fromkeys
+versus the NumPy helpers in app.utils.patient_ids.
+
+Usage: python scripts/bench_patient_ids.py [--coes 3] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.patient_ids import intersect, merge_unique  # noqa: E402
+
+
+def _python_merge(id_sets):
+    merged = []
+    for ids in id_sets:
+        merged = list(dict.fromkeys(merged + ids))
+    return merged
+
+
+def _python_intersect(a, b):
+    b_set = set(b)
+    return [x for x in a if x in b_set]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--coes", type=int, default=3, help="executions per org")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"{'ids/CoE':>10} {'op':>10} {'python (ms)':>12} {'numpy (ms)':>12} {'speedup':>8}")
+    for size in (100_000, 1_000_000):
+        arrays = [rng.integers(0, size * 2, size, dtype=np.int64) for _ in range(args.coes)]
+        lists = [a.tolist() for a in arrays]
+
+        cases = {
+            "merge": (
+                lambda: _python_merge(lists),
+                lambda: merge_unique(*arrays, keep_order=True),
+            ),
+            "intersect": (
+                lambda: _python_intersect(lists[0], lists[1]),
+                lambda: intersect(arrays[0], arrays[1]),
+            ),
+        }
+        for name, (py_fn, np_fn) in cases.items():
+            py_t = min(timeit.repeat(py_fn, number=1, repeat=args.repeat)) * 1000
+            np_t = min(timeit.repeat(np_fn, number=1, repeat=args.repeat)) * 1000
+            print(f"{size:>10} {name:>10} {py_t:>12.1f} {np_t:>12.1f} {py_t / np_t:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Import-time audit of the API process.
+
+Runs ``python -X importtime -c "import main"`` in a fresh interpreter,
+prints the slowest modules by cumulative time and fails when the total
+exceeds the budget or when a module that must stay lazy (pandas, numpy,
+pyarrow, the OTLP exporter, ...) was imported at startup.
+
+Usage: python scripts/import_time.py [--budget 3.0] [--top 20] [--module main]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy or optional modules only needed by some requests.
+LAZY_MODULES = (
+    "numpy",
+    "pandas",
+    "pyarrow",
+    "alembic",
+    "requests",
+    "vantage6",
+    "opentelemetry.sdk",
+    "opentelemetry.exporter",
+)
+
+
+def measure(module: str) -> List[Tuple[str, int, int]]:
+    """(name, self_us, cumulative_us) for every module imported by ``module``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def audit(module: str = "main") -> Tuple[float, List[str], List[Tuple[str, int, int]]]:
+    """Total seconds, eagerly imported lazy modules, and the raw rows."""
+    rows = measure(module)
+    cumulative: Dict[str, int] = {name: cum for name, _, cum in rows}
+    total = cumulative.get(module, 0) / 1e6
+    eager = sorted(
+        name
+        for name in cumulative
+        if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+    )
+    return total, eager, rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget", type=float, default=3.0, help="seconds")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    total, eager, rows = audit(args.module)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    slowest = sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]
+    for name, self_us, cumulative_us in slowest:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+    print(f"\nimport {args.module}: {total:.3f}s (budget {args.budget:.3f}s)")
+
+    failed = False
+    if eager:
+        print("Imported at startup but should be lazy: " + ", ".join(eager))
+        failed = True
+    if total > args.budget:
+        print("Import time over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
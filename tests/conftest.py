@@ -42,8 +42,14 @@ class FakeQuery:
 
 
 class FakeSession:
-    def query(self, model):
-        return FakeQuery(model)
+    def __init__(self):
+        self.info = {}
+
+    def query(self, *entities):
+        return FakeQuery(entities[0])
+
+    def get(self, model, ident):
+        return None
 
     def add(self, obj):
         return None
@@ -57,6 +63,9 @@ class FakeSession:
     def flush(self):
         return None
 
+    def rollback(self):
+        return None
+
     def close(self):
         return None
 
@@ -0,0 +1,77 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models import Algorithm, Base, Cohort
+from app.models.algorithm import cohort_signature
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(
+        engine,
+        tables=[
+            Base.metadata.tables[name]
+            for name in ("cohorts", "algorithms", "cohort_algorithms")
+        ],
+    )
+    return Session(engine)
+
+
+def test_signature_is_order_and_duplicate_insensitive():
+    assert cohort_signature([3, 1, 1]) == cohort_signature([1, 3])
+    assert cohort_signature([1, 3]) != cohort_signature([1, 2, 3])
+    assert cohort_signature([]) is None
+
+
+def test_signature_follows_cohort_links():
+    db = _session()
+    c1, c2 = Cohort(id=1, cohort_name="a"), Cohort(id=2, cohort_name="b")
+    algorithm = Algorithm(method_name="summary", cohorts=[c1])
+    db.add_all([c1, c2, algorithm])
+    db.commit()
+    assert algorithm.cohort_signature == cohort_signature([1])
+
+    c2.algorithms.append(algorithm)
+    db.commit()
+    assert algorithm.cohort_signature == cohort_signature([1, 2])
+
+    algorithm.cohorts.remove(c1)
+    db.commit()
+    assert algorithm.cohort_signature == cohort_signature([2])
+
+
+def test_signature_includes_cohorts_inserted_in_the_same_flush():
+    db = _session()
+    existing = Cohort(id=1, cohort_name="a")
+    db.add(existing)
+    db.commit()
+
+    algorithm = Algorithm(
+        method_name="summary", cohorts=[existing, Cohort(cohort_name="new")]
+    )
+    db.add(algorithm)
+    db.commit()
+
+    ids = [cohort.id for cohort in algorithm.cohorts]
+    assert None not in ids
+    assert algorithm.cohort_signature == cohort_signature(ids)
+    db.expire_all()
+    assert db.get(Algorithm, algorithm.id).cohort_signature == cohort_signature(ids)
+
+
+def test_deleting_a_cohort_updates_remaining_signatures():
+    db = _session()
+    c1, c2 = Cohort(id=1, cohort_name="a"), Cohort(id=2, cohort_name="b")
+    algorithm = Algorithm(method_name="summary", cohorts=[c1, c2])
+    db.add_all([c1, c2, algorithm])
+    db.commit()
+    assert algorithm.cohort_signature == cohort_signature([1, 2])
+
+    # cohort_results (JSONB) does not exist on SQLite; nothing to unlink.
+    set_committed_value(c1, "results", [])
+    db.delete(c1)
+    db.commit()
+
+    db.expire_all()
+    assert db.get(Algorithm, algorithm.id).cohort_signature == cohort_signature([2])
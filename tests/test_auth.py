@@ -1,3 +1,6 @@
+import asyncio
+
+import pytest
 from fastapi.testclient import TestClient
 import types
 
@@ -5,7 +8,7 @@ from app.services import auth as auth_module
 
 
 def test_login_success(client: TestClient, monkeypatch):
-    def fake_authenticate(username, password):
+    async def fake_authenticate(username, password):
         return {"access_token": "fake-token", "token_type": "bearer"}
 
     monkeypatch.setattr(auth_module.AuthService, "authenticate", staticmethod(fake_authenticate))
@@ -13,6 +16,9 @@ def test_login_success(client: TestClient, monkeypatch):
     from app.utils import keycloak as keycloak_module
 
     def fake_validate_token(token: str):
+        # Runs in the threadpool, not on the event loop (may fetch JWKS).
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
         return {"sub": "fake-sub", "email": "u@example.com"}
 
     monkeypatch.setattr(keycloak_module.keycloak_handler, "validate_token", fake_validate_token)
@@ -23,7 +29,7 @@ def test_login_success(client: TestClient, monkeypatch):
 
 
 def test_refresh_token_success(client: TestClient, monkeypatch):
-    def fake_refresh(refresh_token):
+    async def fake_refresh(refresh_token):
         return {"access_token": "new-token", "token_type": "bearer"}
 
     monkeypatch.setattr(auth_module.AuthService, "refresh_token", staticmethod(fake_refresh))
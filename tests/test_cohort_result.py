@@ -1,5 +1,7 @@
 from fastapi.testclient import TestClient
+from app.api.deps import get_db
 from app.api.endpoints import cohort_result as cr_ep
+from main import app
 
 
 def test_get_cohort_results_by_cohort_ok(client: TestClient, monkeypatch):
@@ -24,3 +26,43 @@ def test_count_cohort_results_ok(client: TestClient, monkeypatch):
     r = client.get("/raven-api/v1/cohort-results/cohort/1/count")
     assert r.status_code == 200
     assert r.json() == 3
+
+
+def test_centers_cohort_results_reads_projection(client: TestClient, monkeypatch):
+    class FakeCohort:
+        id = 1
+        workspace_id = 2
+
+    class FakeQuery:
+        def filter(self, *args, **kwargs):
+            return self
+
+        def all(self):
+            return [("INT", 120), ("MME", 45)]
+
+    class FakeDB:
+        info = {}
+
+        def query(self, *args):
+            return FakeQuery()
+
+        def commit(self):
+            pass
+
+        def rollback(self):
+            pass
+
+    monkeypatch.setattr(cr_ep.cohort_service, "get", lambda db, id: FakeCohort())
+    monkeypatch.setattr(
+        cr_ep.cohort_result_service,
+        "_get_expected_coes",
+        lambda db, cohort: {"INT", "MME", "UDEUSTO"},
+    )
+    app.dependency_overrides[get_db] = lambda: FakeDB()
+    r = client.get("/raven-api/v1/cohort-results/centers_cohort_results/1")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["responded"] == ["INT", "MME"]
+    assert body["missing"] == ["UDEUSTO"]
+    assert body["patient_counts"] == {"INT": 120, "MME": 45}
+    assert body["counts"] == {"responded": 2, "missing": 1, "expected": 3}
@@ -0,0 +1,280 @@
+import importlib.util
+import json
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import ARRAY, Text, create_engine, text
+
+from app.models.cohort_result_execution import CohortResultExecution
+from app.schemas.cohort_result import CohortResultCreate
+from app.services import cohort_result as cohort_result_module
+from app.services.cohort_result import cohort_result_service
+from app.utils.patient_ids import from_text_ids
+
+MIGRATION = os.path.join(
+    os.path.dirname(__file__),
+    "..",
+    "migrations",
+    "versions",
+    "20261019_120000_normalize_cohort_result_executions.py",
+)
+# A scratch Postgres database for the migration round trip (optional).
+POSTGRES_URI = os.environ.get("TEST_POSTGRES_URI")
+
+
+class StoringSession:
+    def __init__(self, stored=()):
+        self.stored = list(stored)
+        self.added = []
+
+    def query(self, *entities):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def order_by(self, *args):
+        return self
+
+    def all(self):
+        return self.stored
+
+    def delete(self, synchronize_session=None):
+        return 0
+
+    def add_all(self, objs):
+        self.added.extend(objs)
+
+    def flush(self):
+        pass
+
+
+def test_create_accepts_alphanumeric_patient_ids():
+    obj = CohortResultCreate(
+        cohort_id=1,
+        data_id={"tok": [{"execution_date": "2026-01-01", "patient_ids": ["AB1", 7]}]},
+    )
+    assert obj.data_id["tok"][0].patient_ids == ["AB1", 7]
+
+
+def test_store_executions_keeps_ids_as_text():
+    db = StoringSession(stored=[("tok", ["7", '"X9"'])])
+    entry = CohortResultCreate(
+        cohort_id=1,
+        data_id={"tok": [{"execution_date": "d", "patient_ids": ["AB1", 7, "AB1"]}]},
+    ).data_id["tok"][0]
+
+    stats = cohort_result_service._store_executions(
+        db,
+        cohort_id=1,
+        token="tok",
+        entries=[entry],
+        received_at=datetime.now(timezone.utc),
+    )
+
+    assert [row.patient_ids for row in db.added] == [['"AB1"', "7"]]
+    assert stats == {"retained": 1, "added": 1, "removed": 1}
+
+
+def test_patient_counts_use_the_deduplicated_ids():
+    entries = CohortResultCreate(
+        cohort_id=1,
+        data_id={"tok": [
+            {"execution_date": "d1", "patient_ids": [1, 2, 2]},
+            {"execution_date": "d2", "patient_ids": [2, 3]},
+        ]},
+    ).data_id["tok"]
+    db = StoringSession()
+
+    stats = cohort_result_service._store_executions(
+        db,
+        cohort_id=1,
+        token="tok",
+        entries=entries,
+        received_at=datetime.now(timezone.utc),
+    )
+
+    # The data_id manifest counts the stored arrays (cardinality).
+    assert [len(row.patient_ids) for row in db.added] == [2, 2]
+    # The submission total (projection and metrics) counts distinct ids.
+    assert stats["retained"] + stats["added"] == 3
+
+
+def test_stored_ids_come_back_with_their_type_in_first_seen_order(monkeypatch):
+    entries = CohortResultCreate(
+        cohort_id=1,
+        data_id={"tok": [
+            {"execution_date": "d1", "patient_ids": ["12", 12, "b"]},
+            {"execution_date": "d2", "patient_ids": ["a", 12, "12"]},
+        ]},
+    ).data_id["tok"]
+    writer = StoringSession()
+    cohort_result_service._store_executions(
+        writer,
+        cohort_id=1,
+        token="tok",
+        entries=entries,
+        received_at=datetime.now(timezone.utc),
+    )
+    reader = StoringSession(
+        stored=[(row.token, row.patient_ids) for row in writer.added]
+    )
+    monkeypatch.setattr(cohort_result_module, "COE_TOKEN_ORG_MAP", {"tok": 5})
+
+    expected = ["12", 12, "b", "a"]
+    assert cohort_result_service._collect_patient_ids_for_cohort(reader, cohort_id=1) == expected
+    assert cohort_result_service._collect_patient_ids_by_org(reader, cohort_id=1) == {5: expected}
+
+
+class RecordingOp:
+    def __init__(self):
+        self.tables = {}
+        self.sql = []
+
+    def create_table(self, name, *columns):
+        self.tables[name] = {c.name: c for c in columns}
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def execute(self, sql):
+        self.sql.append(str(sql))
+
+
+def _load_migration():
+    spec = importlib.util.spec_from_file_location("normalize_executions", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    return migration
+
+
+def test_migration_keeps_every_patient_id_as_text():
+    migration = _load_migration()
+    op = RecordingOp()
+    migration.op = op
+
+    migration.upgrade()
+
+    column_type = op.tables["cohort_result_executions"]["patient_ids"].type
+    assert isinstance(column_type, ARRAY) and isinstance(column_type.item_type, Text)
+    assert isinstance(CohortResultExecution.__table__.c.patient_ids.type.item_type, Text)
+    backfill = op.sql[0]
+    assert "pid::text" in backfill and "jsonb_array_elements_text" not in backfill
+    assert "WHERE pid" not in backfill and "::bigint" not in backfill
+
+
+@pytest.mark.skipif(not POSTGRES_URI, reason="TEST_POSTGRES_URI not set")
+def test_migration_round_trips_patient_ids():
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    patient_ids = ["12", 12, "AB1", None, 12.5, "12"]
+    data_id = [{"token": "tok", "execution_date": "d", "patient_ids": patient_ids}]
+    migration = _load_migration()
+
+    with create_engine(POSTGRES_URI).connect() as conn:
+        transaction = conn.begin()
+        try:
+            conn.execute(text("CREATE SCHEMA cohort_result_round_trip"))
+            conn.execute(text("SET LOCAL search_path TO cohort_result_round_trip"))
+            conn.execute(text("CREATE TABLE cohorts (id integer PRIMARY KEY)"))
+            conn.execute(
+                text(
+                    "CREATE TABLE cohort_results (id serial PRIMARY KEY,"
+                    " cohort_id integer REFERENCES cohorts(id),"
+                    " data_id jsonb NOT NULL DEFAULT '[]')"
+                )
+            )
+            conn.execute(text("INSERT INTO cohorts VALUES (1)"))
+            conn.execute(
+                text("INSERT INTO cohort_results (cohort_id, data_id) VALUES (1, CAST(:d AS jsonb))"),
+                {"d": json.dumps(data_id)},
+            )
+
+            with Operations.context(MigrationContext.configure(conn)):
+                migration.upgrade()
+                stored = conn.execute(
+                    text("SELECT patient_ids FROM cohort_result_executions")
+                ).scalar_one()
+                assert from_text_ids(stored) == patient_ids
+                migration.downgrade()
+
+            restored = conn.execute(text("SELECT data_id FROM cohort_results")).scalar_one()
+            assert restored[0]["token"] == "tok"
+            assert restored[0]["patient_ids"] == patient_ids
+        finally:
+            transaction.rollback()
+
+
+class ProjectionSession(StoringSession):
+    def __init__(self):
+        super().__init__()
+        self.info = {}
+        self.executed = []
+        self.deleted = []
+        self.expired = []
+
+    def filter(self, *criteria):
+        self.criteria = criteria
+        return self
+
+    def delete(self, obj=None, synchronize_session=None):
+        # Query.delete() and Session.delete(obj) on the same double.
+        if obj is None:
+            self.deleted.append(self.criteria)
+        return 0
+
+    def execute(self, stmt):
+        self.executed.append(stmt)
+
+    def expire(self, obj, attrs=None):
+        self.expired.append(attrs)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_update_replaces_executions_and_projection(monkeypatch):
+    from app.schemas.cohort_result import CohortResultUpdate
+
+    token = next(iter(cohort_result_module.COE_TOKEN_MAP))
+    db = ProjectionSession()
+    monkeypatch.setattr(
+        cohort_result_service, "get_by_cohort_and_data_id", lambda db, **kw: object()
+    )
+
+    cohort_result_service.update_cohort_result(
+        db,
+        cohort_id=1,
+        data_id=[],
+        obj_in=CohortResultUpdate(
+            data_id={token: [{"execution_date": "d", "patient_ids": [1, 1, 2]}]}
+        ),
+    )
+
+    assert [row.patient_ids for row in db.added] == [["1", "2"]]
+    (upsert,) = db.executed
+    values = upsert.compile().params
+    assert values["coe"] == cohort_result_module.COE_TOKEN_MAP[token]
+    assert values["patient_count"] == 2
+    assert db.expired == [["data_id"]]
+
+
+def test_delete_removes_projection_rows_by_coe(monkeypatch):
+    token = next(iter(cohort_result_module.COE_TOKEN_MAP))
+    db = ProjectionSession()
+    result = SimpleNamespace(data_id=[{"token": token}])
+    monkeypatch.setattr(
+        cohort_result_service, "get_by_cohort_and_data_id", lambda db, **kw: result
+    )
+
+    cohort_result_service.delete_cohort_result(db, cohort_id=1, data_id=[])
+
+    executions_filter, projection_filter = (str(c[1]) for c in db.deleted)
+    assert "cohort_result_executions.token IN" in executions_filter
+    assert "cohort_coe_responses.coe IN" in projection_filter
@@ -0,0 +1,65 @@
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.utils.compression import CompressionMiddleware, negotiate
+
+
+def _client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse("x" * 5000)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("x" * 10)
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"x" * 5000, b"y" * 5000]), media_type="text/csv")
+
+    return TestClient(app)
+
+
+def test_negotiate_prefers_q_then_server_order():
+    assert negotiate("gzip, br", ["zstd", "br", "gzip"]) == "br"
+    assert negotiate("gzip;q=1, br;q=0.5", ["br", "gzip"]) == "gzip"
+    assert negotiate("br;q=0, *", ["br", "gzip"]) == "gzip"
+    assert negotiate("identity", ["gzip"]) is None
+
+
+def test_large_response_is_gzipped():
+    client = _client()
+    r = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert int(r.headers["content-length"]) < 5000
+    assert r.text == "x" * 5000
+
+
+def test_small_streaming_and_unaccepted_responses_are_not_compressed():
+    client = _client()
+    assert "content-encoding" not in client.get(
+        "/small", headers={"Accept-Encoding": "gzip"}
+    ).headers
+    r = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert len(r.content) == 10000
+    assert "content-encoding" not in client.get(
+        "/big", headers={"Accept-Encoding": "identity"}
+    ).headers
+
+
+def test_strong_etag_is_weakened_when_compressing():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/tagged")
+    def tagged():
+        return PlainTextResponse("x" * 5000, headers={"ETag": '"abc"'})
+
+    r = TestClient(app).get("/tagged", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["etag"] == 'W/"abc"'
@@ -0,0 +1,95 @@
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.db.routing import ReadYourWrites, ReplicaPool, RoutingSession
+
+Base = declarative_base()
+
+
+class Row(Base):
+    __tablename__ = "routing_rows"
+    id = Column(Integer, primary_key=True)
+    source = Column(String)
+
+
+def _session_factory(tmp_path, replica_uri=None):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    Base.metadata.create_all(primary)
+    with primary.begin() as conn:
+        conn.execute(Row.__table__.insert().values(id=1, source="primary"))
+
+    replica_uri = replica_uri or f"sqlite:///{tmp_path / 'replica.db'}"
+    pool = ReplicaPool([replica_uri], health_interval=60)
+    if replica_uri.startswith("sqlite"):
+        Base.metadata.create_all(pool.engines[0])
+        with pool.engines[0].begin() as conn:
+            conn.execute(Row.__table__.insert().values(id=1, source="replica"))
+
+    return sessionmaker(class_=RoutingSession, bind=primary, replicas=pool)
+
+
+def _read(factory, method, sticky=False):
+    db = factory()
+    try:
+        db.bind_request(method=method, sticky=sticky)
+        return db.get(Row, 1).source
+    finally:
+        db.close()
+
+
+def test_get_reads_replica_until_user_writes(tmp_path):
+    factory = _session_factory(tmp_path)
+    cookies = ReadYourWrites("secret", 60)
+    issued = {}
+
+    assert _read(factory, "GET") == "replica"
+    assert _read(factory, "POST") == "primary"
+
+    db = factory()
+    db.bind_request(
+        method="POST", on_write=lambda: issued.update(alice=cookies.issue("alice"))
+    )
+    db.add(Row(id=2, source="primary"))
+    db.commit()
+    db.close()
+
+    sticky = cookies.is_sticky("alice", issued["alice"])
+    assert sticky
+    assert _read(factory, "GET", sticky) == "primary"
+    assert not cookies.is_sticky("bob", issued["alice"])
+
+
+def test_read_your_writes_cookie_is_signed_and_expires():
+    cookies = ReadYourWrites("secret", 10)
+    cookie = cookies.issue("alice")
+    written_at, _, signature = cookie.partition(".")
+
+    assert cookies.is_sticky("alice", cookie)
+    # Another worker with the same secret accepts it.
+    assert ReadYourWrites("secret", 10).is_sticky("alice", cookie)
+    assert not ReadYourWrites("other", 10).is_sticky("alice", cookie)
+    assert not cookies.is_sticky("alice", f"{int(written_at) + 60}.{signature}")
+    assert not cookies.is_sticky("alice", cookies.issue("alice", written_at=0))
+    assert not cookies.is_sticky("alice", "garbage")
+
+
+def test_core_write_during_get_uses_primary(tmp_path):
+    factory = _session_factory(tmp_path)
+    wrote = []
+
+    db = factory()
+    db.bind_request(method="GET", on_write=lambda: wrote.append(True))
+    assert db.get(Row, 1).source == "replica"
+    db.connection().execute(Row.__table__.insert().values(id=3, source="core"))
+    db.commit()
+    db.close()
+
+    assert wrote == [True]
+    primary = factory.kw["bind"]
+    with primary.connect() as conn:
+        assert conn.execute(Row.__table__.select().where(Row.id == 3)).one().source == "core"
+
+
+def test_unhealthy_replica_falls_back_to_primary(tmp_path):
+    factory = _session_factory(tmp_path, "postgresql://u:p@127.0.0.1:1/none")
+    assert _read(factory, "GET") == "primary"
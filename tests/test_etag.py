@@ -0,0 +1,56 @@
+import datetime
+
+from fastapi.testclient import TestClient
+
+from app.api.endpoints import algorithms as alg_ep
+from app.api.endpoints import workspace as ws_ep
+from app.utils import etag as etag_module
+
+
+def test_workspace_not_modified_skips_loading(client: TestClient, monkeypatch):
+    etag = etag_module.make_etag("workspaces", 7, "2024-01-01T00:00:00+00:00")
+    monkeypatch.setattr(etag_module, "row_version_etag", lambda db, model, row_id: etag)
+
+    def fail_get(db=None, id=None):
+        raise AssertionError("workspace should not be loaded")
+
+    monkeypatch.setattr(ws_ep.workspace_service, "get", fail_get)
+    r = client.get("/raven-api/v1/workspaces/7", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["etag"] == etag
+
+
+def test_workspace_response_carries_etag(client: TestClient, monkeypatch):
+    etag = etag_module.make_etag("workspaces", 7, "v1")
+    monkeypatch.setattr(etag_module, "row_version_etag", lambda db, model, row_id: etag)
+
+    class FakeWS:
+        id = 7
+        name = "W"
+        description = None
+        version = None
+        creator_id = 1
+        team_ids = []
+        creation_date = datetime.datetime(2024, 1, 1)
+        update_date = None
+        metadata_search = 0
+        data_access = 0
+        data_analysis = 0
+        result_report = 0
+        v6_study_id = None
+        status = None
+
+    monkeypatch.setattr(ws_ep.workspace_service, "get", lambda db=None, id=None: FakeWS())
+    r = client.get("/raven-api/v1/workspaces/7", headers={"If-None-Match": '"other"'})
+    assert r.status_code == 200
+    assert r.headers["etag"] == etag
+
+
+def test_algorithm_list_is_tagged_by_body(client: TestClient, monkeypatch):
+    monkeypatch.setattr(alg_ep.algorithm_service, "get_all_algorithm", lambda db=None: [])
+    r = client.get("/raven-api/v1/algorithms/")
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+
+    r = client.get("/raven-api/v1/algorithms/", headers={"If-None-Match": f"W/{etag}"})
+    assert r.status_code == 304
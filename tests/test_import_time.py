@@ -0,0 +1,20 @@
+import importlib.util
+import os
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+spec = importlib.util.spec_from_file_location(
+    "import_time", os.path.join(ROOT, "scripts", "import_time.py")
+)
+import_time = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(import_time)
+
+# Generous enough for a cold CI runner; scripts/import_time.py reports the
+# detail when it is exceeded.
+STARTUP_BUDGET_SECONDS = 10.0
+
+
+def test_app_startup_imports_stay_lazy_and_within_budget():
+    total, eager, _ = import_time.audit("main")
+    assert eager == []
+    assert total < STARTUP_BUDGET_SECONDS
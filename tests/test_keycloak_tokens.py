@@ -0,0 +1,126 @@
+import asyncio
+import json
+import time
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.utils import keycloak as keycloak_module
+from app.utils.keycloak import KeycloakHandler, SigningKeys
+
+
+def _key_pair():
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public_pem = private.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    return private_pem, public_pem
+
+
+def test_tokens_are_verified_offline_with_the_public_key(monkeypatch):
+    private_pem, public_pem = _key_pair()
+    other_private, _ = _key_pair()
+    bare_key = "".join(public_pem.strip().splitlines()[1:-1])
+
+    handler = KeycloakHandler()
+    handler.issuer = "https://kc/realms/idea4rc"
+    handler.signing_keys = SigningKeys(None, bare_key, min_refresh=30)
+    monkeypatch.setattr(keycloak_module.httpx, "get", lambda *a, **k: 1 / 0)
+
+    claims = {"sub": "kc-1", "iss": handler.issuer, "exp": int(time.time()) + 60}
+    assert handler.validate_token(jwt.encode(claims, private_pem, algorithm="RS256"))["sub"] == "kc-1"
+
+    assert handler.validate_token(jwt.encode(claims, other_private, algorithm="RS256")) is None
+    expired = dict(claims, exp=int(time.time()) - 60)
+    assert handler.validate_token(jwt.encode(expired, private_pem, algorithm="RS256")) is None
+
+
+def test_unknown_kid_refreshes_the_key_set_once(monkeypatch):
+    private_pem, public_pem = _key_pair()
+    jwk_data = jwk.construct(public_pem, "RS256").to_dict()
+    fetches = []
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"keys": [dict(jwk_data, kid="new", use="sig")]}
+
+    monkeypatch.setattr(
+        keycloak_module.httpx, "get", lambda url, timeout: fetches.append(url) or Response()
+    )
+    keys = SigningKeys("https://kc/certs", None, min_refresh=30)
+
+    assert keys.get("new") is not None
+    assert keys.get("new") is not None
+    assert keys.get("unknown") is None
+    assert fetches == ["https://kc/certs"]
+
+
+def _admin_handler(monkeypatch, routes):
+    calls = []
+
+    def handle(request):
+        calls.append((request.method, request.url.path, dict(request.headers)))
+        return routes(request, len(calls))
+
+    handler = KeycloakHandler()
+    handler.server_url = "https://kc"
+    options = handler._client_options()
+    monkeypatch.setattr(
+        handler,
+        "_client_options",
+        lambda: dict(options, base_url="https://kc", transport=httpx.MockTransport(handle)),
+    )
+    return handler, calls
+
+
+def test_admin_token_is_reused_until_expiry_and_retried_on_401(monkeypatch):
+    issued = []
+
+    def routes(request, n):
+        if request.url.path.endswith("/token"):
+            issued.append(n)
+            return httpx.Response(200, json={"access_token": f"t{len(issued)}", "expires_in": 300})
+        if request.headers["Authorization"] == "Bearer t1" and len(issued) == 1 and n > 3:
+            return httpx.Response(401)
+        return httpx.Response(200, json={"id": "u1"})
+
+    handler, calls = _admin_handler(monkeypatch, routes)
+
+    assert handler.get_user_by_id("u1") == {"id": "u1"}
+    assert handler.get_user_by_id("u1") == {"id": "u1"}
+    assert len(issued) == 1
+
+    # Keycloak revoked the token: one refresh and one retry.
+    assert handler.get_user_by_id("u1") == {"id": "u1"}
+    assert len(issued) == 2
+    assert calls[-1][2]["authorization"] == "Bearer t2"
+
+    handler._admin_expires_at = time.time() + 5  # within the refresh margin
+    handler.get_user_by_id("u1")
+    assert len(issued) == 3
+
+
+def test_bulk_provisioning_runs_concurrently_over_one_client(monkeypatch):
+    def routes(request, n):
+        if request.url.path.endswith("/token"):
+            return httpx.Response(200, json={"access_token": "t", "expires_in": 300})
+        username = json.loads(request.content)["username"]
+        return httpx.Response(201, headers={"Location": f"https://kc/admin/realms/r/users/id-{username}"})
+
+    handler, calls = _admin_handler(monkeypatch, routes)
+    users = [{"username": f"u{i}", "email": f"u{i}@x.org", "password": "p"} for i in range(5)]
+
+    ids = asyncio.run(handler.create_users(users))
+
+    assert ids == [f"id-u{i}" for i in range(5)]
+    assert sum(path.endswith("/token") for _, path, _ in calls) == 1
@@ -0,0 +1,57 @@
+import json
+import logging
+
+from app.utils.logging_config import (
+    JSONFormatter,
+    LazyJSON,
+    SamplingFilter,
+    parse_sampling,
+)
+
+
+def _record(name="app.test", level=logging.INFO, msg="hello %s", args=("world",), **kw):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(kw)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JSONFormatter().format(_record(status_code=200, request_path="/x"))
+    entry = json.loads(line)
+    assert entry["message"] == "hello world"
+    assert entry["logger"] == "app.test"
+    assert entry["status_code"] == 200
+    assert entry["request_path"] == "/x"
+
+
+def test_lazy_json_renders_only_when_formatted():
+    class Tracked:
+        calls = 0
+
+        def __str__(self):
+            Tracked.calls += 1
+            return "t"
+
+    lazy = LazyJSON({"a": Tracked()})
+    assert Tracked.calls == 0
+    assert '"a": "t"' in str(lazy)
+    assert Tracked.calls == 1
+
+
+def test_sampling_filter_never_drops_warnings():
+    sampler = SamplingFilter(parse_sampling(["app.noisy=0", "app.noisy.keep=1"]))
+    assert sampler.filter(_record(name="app.noisy.sub")) is False
+    assert sampler.filter(_record(name="app.noisy.keep")) is True
+    assert sampler.filter(_record(name="app.other")) is True
+    assert sampler.filter(_record(name="app.noisy", level=logging.WARNING)) is True
+
+
+def test_queue_handler_renders_arguments_when_logged():
+    from app.utils.logging_config import DeferredQueueHandler
+
+    state = {"status": "running"}
+    record = _record(msg="state=%s", args=(state,))
+    prepared = DeferredQueueHandler(None).prepare(record)
+    state["status"] = "done"
+    assert prepared.getMessage() == "state={'status': 'running'}"
+    assert prepared.args is None
@@ -0,0 +1,164 @@
+import contextlib
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app.utils import metrics_logger
+from app.utils.metrics_logger import METRIC_EVENTS_DROPPED, MetricsBuffer
+
+
+def test_buffer_drops_oldest_when_full_and_flushes_in_batches(monkeypatch):
+    batches = []
+    buffer = MetricsBuffer(capacity=3, batch_size=2, flush_interval=60)
+    monkeypatch.setattr(buffer, "_ensure_started", lambda: None)
+    monkeypatch.setattr(buffer, "_write", batches.append)
+    dropped = METRIC_EVENTS_DROPPED.labels(reason="buffer_full")
+    before = dropped._value.get()
+
+    for i in range(5):
+        buffer.put({"action": i})
+
+    assert len(buffer) == 3
+    assert dropped._value.get() - before == 2
+
+    buffer.flush()
+    assert batches == [[{"action": 2}, {"action": 3}], [{"action": 4}]]
+
+
+def test_log_event_only_buffers(monkeypatch):
+    rows = []
+    monkeypatch.setattr(metrics_logger.settings, "METRICS_DB_URL", "postgresql://metrics")
+    monkeypatch.setattr(metrics_logger._buffer, "put", rows.append)
+    monkeypatch.setattr(
+        metrics_logger, "_get_engine", lambda: (_ for _ in ()).throw(AssertionError)
+    )
+
+    metrics_logger.log_event("auth", "login", user_id="7")
+
+    assert [(r["module"], r["action"], r["user_id"]) for r in rows] == [
+        ("auth", "login", "7")
+    ]
+
+
+def test_rollup_tracker_refreshes_the_written_range(monkeypatch):
+    refreshed = []
+    tracker = metrics_logger.RollupTracker(interval=3600)
+    monkeypatch.setattr(
+        metrics_logger, "refresh_rollups", lambda conn, since, until: refreshed.append((since, until))
+    )
+
+    class Engine:
+        def begin(self):
+            return contextlib.nullcontext()
+
+    t1 = datetime(2026, 1, 1, 10, tzinfo=timezone.utc)
+    t2 = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+    tracker.mark([{"timestamp": t2}])
+    tracker.mark([{"timestamp": t1}])
+    tracker.refresh(Engine())
+    assert refreshed == []
+
+    tracker.refresh(Engine(), force=True)
+    tracker.refresh(Engine(), force=True)
+    assert refreshed == [(t1, t2)]
+
+
+def test_aggregate_rejects_unknown_granularity(client):
+    r = client.get("/raven-api/v1/metrics/aggregate", params={"granularity": "week"})
+    assert r.status_code == 422
+
+
+def _sqlite_metrics(monkeypatch):
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import StaticPool
+
+    from app.api.endpoints import metrics
+
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE metric_events ("
+            + ", ".join(f"{col} {'INTEGER' if col == 'id' else 'TEXT'}" for col in metrics.EXPORT_COLUMNS)
+            + ")"
+        ))
+        for i in range(5):
+            conn.execute(
+                text("INSERT INTO metric_events (id, timestamp, module) VALUES (:i, :ts, 'auth')"),
+                {"i": i, "ts": f"2026-01-01 10:0{i}:00"},
+            )
+    monkeypatch.setattr(metrics, "_get_engine", lambda: engine)
+    monkeypatch.setattr(metrics, "EXPORT_BATCH_SIZE", 2)
+
+
+def test_export_streams_csv_in_batches(client, monkeypatch):
+    _sqlite_metrics(monkeypatch)
+
+    with client.stream("GET", "/raven-api/v1/metrics/export") as r:
+        assert r.status_code == 200
+        chunks = list(r.iter_text())
+
+    lines = "".join(chunks).splitlines()
+    assert lines[0].startswith("id,timestamp,module")
+    assert [line.split(",")[0] for line in lines[1:]] == ["0", "1", "2", "3", "4"]
+
+
+def test_export_ndjson_with_projection(client, monkeypatch):
+    _sqlite_metrics(monkeypatch)
+
+    r = client.get(
+        "/raven-api/v1/metrics/export", params={"format": "ndjson", "columns": "id,module"}
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert rows[0] == {"id": 0, "module": "auth"}
+    assert len(rows) == 5
+
+    r = client.get("/raven-api/v1/metrics/export", params={"columns": "id,password"})
+    assert r.status_code == 422
+
+
+def test_parquet_encoder_round_trips():
+    pq = pytest.importorskip("pyarrow.parquet")
+    from app.utils.metrics_export import parquet_chunks
+
+    types = {"id": metrics_logger._metric_events_table.c.id.type,
+             "module": metrics_logger._metric_events_table.c.module.type}
+    data = b"".join(parquet_chunks(["id", "module"], types, iter([[(1, "a"), (2, "b")], [(3, None)]])))
+    table = pq.read_table(io.BytesIO(data))
+    assert table.to_pydict() == {"id": [1, 2, 3], "module": ["a", "b", None]}
+
+
+def test_maintain_partitions_creates_ahead_and_drops_expired(monkeypatch):
+    executed = []
+
+    class Conn:
+        def execute(self, stmt, params=None):
+            sql = str(stmt)
+            executed.append(sql)
+
+            class Result:
+                def all(self):
+                    if "pg_inherits" not in sql:
+                        return []
+                    return [
+                        ("metric_events_legacy", "FOR VALUES FROM (MINVALUE) TO ('2024-02-01 00:00:00+00')"),
+                        ("metric_events_202610", "FOR VALUES FROM ('2026-10-01 00:00:00+00') TO ('2026-11-01 00:00:00+00')"),
+                    ]
+
+            return Result()
+
+    monkeypatch.setattr(metrics_logger.settings, "METRICS_PARTITIONS_AHEAD", 2)
+    monkeypatch.setattr(metrics_logger.settings, "METRICS_RETENTION_MONTHS", 24)
+    metrics_logger.maintain_partitions(
+        Conn(), now=datetime(2026, 10, 19, tzinfo=timezone.utc)
+    )
+
+    created = [sql.split()[5] for sql in executed if sql.startswith("CREATE TABLE")]
+    dropped = [sql for sql in executed if sql.startswith("DROP TABLE")]
+    assert created == ["metric_events_202611", "metric_events_202612"]
+    assert dropped == ['DROP TABLE IF EXISTS "metric_events_legacy"']
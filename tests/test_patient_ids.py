@@ -0,0 +1,34 @@
+from app.utils.patient_ids import compare_runs, intersect, merge_unique
+
+
+def test_merge_unique_keeps_first_seen_order():
+    merged = merge_unique([5, 3, 5, 1], [3, 9, 1], keep_order=True)
+    assert merged.tolist() == [5, 3, 1, 9]
+
+
+def test_merge_unique_sorted_by_default():
+    assert merge_unique([5, 3], [3, 1]).tolist() == [1, 3, 5]
+
+
+def test_intersect_and_compare_runs():
+    assert intersect([1, 2, 3], [2, 3, 4]).tolist() == [2, 3]
+    assert compare_runs([1, 2, 3], [2, 3, 4, 5]) == {
+        "retained": 2,
+        "added": 2,
+        "removed": 1,
+    }
+
+
+def test_text_ids_round_trip_keeping_the_type():
+    from app.utils.patient_ids import as_text_ids, from_text_ids
+
+    ids = [12, "12", "AB-7", "0042", -3, None]
+    stored = as_text_ids(ids)
+    assert stored == ["12", '"12"', '"AB-7"', '"0042"', "-3", "null"]
+    assert from_text_ids(stored) == ids
+
+
+def test_merge_unique_on_text_ids():
+    merged = merge_unique(["b", "a", "b"], ["c", "a"], keep_order=True)
+    assert merged.tolist() == ["b", "a", "c"]
+    assert merge_unique([], ["x"]).tolist() == ["x"]
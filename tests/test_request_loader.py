@@ -0,0 +1,74 @@
+from sqlalchemy import Column, Integer, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from app.config.settings import settings
+from app.db.loader import get_loader
+from app.db.query_stats import QUERY_COUNT_HEADER
+from app.models.permit import Permit
+
+
+def test_loader_memoizes_workspace_lookups():
+    calls = []
+
+    class CountingQuery:
+        def __init__(self, model):
+            self.model = model
+
+        def filter(self, *args, **kwargs):
+            return self
+
+        def first(self):
+            calls.append(self.model)
+            return None
+
+    class Session:
+        info = {}
+
+        def query(self, model):
+            return CountingQuery(model)
+
+    db = Session()
+    loader = get_loader(db)
+    assert get_loader(db) is loader
+
+    assert loader.granted_permit(7) is None
+    assert loader.granted_permit(7) is None
+    loader.metadata_search(7)
+    loader.metadata_search(7)
+
+    assert calls.count(Permit) == 1
+    assert len(calls) == 2
+
+
+def test_loader_forgets_misses_after_flush():
+    Base = declarative_base()
+
+    class Row(Base):
+        __tablename__ = "loader_rows"
+        id = Column(Integer, primary_key=True)
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    loader = get_loader(db)
+    calls = []
+    assert loader._memoize(("permit", 1), lambda: calls.append(1)) is None
+    assert loader._memoize(("permit", 1), lambda: calls.append(2)) is None
+
+    db.add(Row(id=1))
+    db.flush()
+    loader._memoize(("permit", 1), lambda: calls.append(3))
+    db.commit()
+    loader._memoize(("permit", 1), lambda: calls.append(4))
+
+    assert calls == [1, 3, 4]
+
+
+def test_query_count_header_only_when_enabled(client, monkeypatch):
+    r = client.get("/raven-api/v1")
+    assert r.status_code == 200
+    assert QUERY_COUNT_HEADER not in r.headers
+
+    monkeypatch.setattr(settings, "DB_QUERY_COUNT_HEADER", True)
+    r = client.get("/raven-api/v1")
+    assert r.headers[QUERY_COUNT_HEADER] == "0"
@@ -0,0 +1,55 @@
+from app.config.settings import settings
+from app.utils import server
+
+
+def _cgroup(tmp_path, files):
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return str(tmp_path)
+
+
+def test_cgroup_v2_quota(tmp_path):
+    root = _cgroup(tmp_path, {"cpu.max": "50000 100000\n"})
+    assert server.cgroup_cpu_quota(root) == 0.5
+
+
+def test_cgroup_v2_unlimited(tmp_path):
+    root = _cgroup(tmp_path, {"cpu.max": "max 100000\n"})
+    assert server.cgroup_cpu_quota(root) is None
+
+
+def test_cgroup_v1_quota(tmp_path):
+    root = _cgroup(
+        tmp_path,
+        {"cpu/cpu.cfs_quota_us": "200000", "cpu/cpu.cfs_period_us": "100000"},
+    )
+    assert server.cgroup_cpu_quota(root) == 2.0
+
+
+def test_cpu_limit_without_cgroup_uses_affinity(tmp_path):
+    assert server.cpu_limit(str(tmp_path)) >= 1
+
+
+def test_worker_count_derived_and_capped(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_WORKERS", None)
+    monkeypatch.setattr(settings, "SERVER_WORKERS_PER_CORE", 1.0)
+    monkeypatch.setattr(settings, "SERVER_MAX_WORKERS", 4)
+    assert server.worker_count(0.5) == 1
+    assert server.worker_count(2.0) == 2
+    assert server.worker_count(16.0) == 4
+
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 3)
+    assert server.worker_count(16.0) == 3
+
+
+def test_threadpool_size_per_worker(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_THREADPOOL_SIZE", None)
+    monkeypatch.setattr(settings, "SERVER_THREADS_PER_CORE", 16)
+    assert server.threadpool_size(0.5, 1) == 8
+    assert server.threadpool_size(4.0, 4) == 16
+    assert server.threadpool_size(0.1, 1) == 4
+
+    monkeypatch.setattr(settings, "SERVER_THREADPOOL_SIZE", 10)
+    assert server.threadpool_size(4.0, 4) == 10
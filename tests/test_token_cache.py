@@ -0,0 +1,58 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.models import Base, User
+from app.utils.token_cache import TokenCache
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables["users"]])
+    selects = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_selects(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT"):
+            selects.append(statement)
+
+    db = Session(engine)
+    db.add(User(id=1, keycloak_id="kc-1", username="ana", email="ana@example.org", is_active=True))
+    db.commit()
+    selects.clear()
+    return db, selects
+
+
+def test_cached_token_skips_decoding_and_user_lookup(monkeypatch):
+    db, selects = _session()
+    cache = TokenCache(max_size=10, ttl=60)
+    decoded = []
+    monkeypatch.setattr(deps, "token_cache", cache)
+    monkeypatch.setattr(
+        deps.keycloak_handler, "validate_token", lambda token: decoded.append(token) or {"sub": "kc-1"}
+    )
+
+    user, claims = deps._authenticate(db, "token")
+    assert (user.id, claims) == (1, {"sub": "kc-1"})
+    assert len(selects) == 1
+
+    other = Session(db.get_bind())
+    user, _ = deps._authenticate(other, "token")
+    assert user.username == "ana"
+    assert decoded == ["token"]
+    assert len(selects) == 1
+
+
+def test_expired_or_deactivated_entries_are_dropped(monkeypatch):
+    db, _ = _session()
+    cache = TokenCache(max_size=10, ttl=60)
+    user = db.get(User, 1)
+
+    cache.put("old", {"exp": 1}, user)
+    assert cache.get(db, "old") is None
+
+    cache.put("token", {}, user)
+    monkeypatch.setattr("app.utils.token_cache.token_cache", cache)
+    user.is_active = False
+    db.commit()
+    assert cache.get(db, "token") is None
@@ -0,0 +1,98 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from app.db.unit_of_work import unit_of_work
+
+
+class RecordingSession:
+    def __init__(self):
+        self.info = {}
+        self.calls = []
+
+    def commit(self):
+        self.calls.append("commit")
+
+    def flush(self):
+        self.calls.append("flush")
+
+    def rollback(self):
+        self.calls.append("rollback")
+
+    def close(self):
+        pass
+
+    @contextmanager
+    def begin_nested(self):
+        self.calls.append("savepoint")
+        yield
+        self.calls.append("release")
+
+
+def test_nested_units_commit_once():
+    db = RecordingSession()
+    with unit_of_work(db):
+        with unit_of_work(db):
+            pass
+        with unit_of_work(db):
+            pass
+    assert db.calls == ["flush", "flush", "commit"]
+
+
+def test_outer_unit_rolls_back_on_error():
+    db = RecordingSession()
+    with pytest.raises(ValueError):
+        with unit_of_work(db):
+            with unit_of_work(db):
+                raise ValueError("boom")
+    assert db.calls == ["rollback"]
+    assert db.info["unit_of_work_depth"] == 0
+
+
+def test_request_commits_once(client, monkeypatch):
+    from app.api.deps import get_db
+    from app.api.endpoints import cohort as cohort_ep
+    from main import app
+
+    db = RecordingSession()
+
+    def fake_delete(db, *, cohort_id, user_id):
+        with unit_of_work(db):
+            db.calls.append("delete")
+        with unit_of_work(db):
+            db.calls.append("history")
+
+    monkeypatch.setattr(cohort_ep.cohort_service, "delete_cohort", fake_delete)
+    app.dependency_overrides[get_db] = lambda: db
+    r = client.delete("/raven-api/v1/cohorts/1")
+    assert r.status_code == 204
+    assert db.calls == ["delete", "flush", "history", "flush", "commit"]
+
+
+def test_v6_call_runs_after_checkpoint_and_keeps_ingest(monkeypatch):
+    from app.services import cohort_result as cr
+
+    db = RecordingSession()
+    db.add = lambda obj: None
+    cohort = SimpleNamespace(status=None)
+
+    def fake_request(db, *, cohort):
+        db.calls.append("read")
+        return {}
+
+    def fake_create_new_cohort(*, db, access_token):
+        db.calls.append("v6")
+        return SimpleNamespace(dataframe_id=None)
+
+    monkeypatch.setattr(cr.cohort_result_service, "_v6_dataframe_request", fake_request)
+    monkeypatch.setattr(cr.vantage6_service, "create_new_cohort", fake_create_new_cohort)
+
+    with pytest.raises(RuntimeError):
+        with unit_of_work(db):  # the request unit
+            cr.cohort_result_service._update_cohort_execution_and_v6(
+                db, cohort=cohort, access_token="t"
+            )
+    assert cohort.status == cr.CohortStatus.EXECUTED.value
+    # Results and status are committed before V6; only later work rolls back.
+    assert db.calls == ["flush", "savepoint", "read", "release", "commit", "v6", "rollback"]
@@ -0,0 +1,165 @@
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.utils import v6_token as v6_module
+from app.utils.v6_token import V6AuthError, V6TokenBroker
+
+
+def _broker(handler, **kwargs):
+    broker = V6TokenBroker(
+        auth_url="https://v6-auth.test",
+        realm="vantage6",
+        client_id="public_client",
+        username="svc",
+        password="secret",
+        **kwargs,
+    )
+    broker._http = httpx.Client(
+        base_url=broker.auth_url, transport=httpx.MockTransport(handler)
+    )
+    return broker
+
+
+def test_static_token_without_credentials():
+    broker = V6TokenBroker(
+        auth_url="https://v6-auth.test",
+        realm="vantage6",
+        client_id="public_client",
+        username="",
+        password="",
+        static_token="static",
+    )
+    assert broker.get_token() == "static"
+
+
+def test_token_is_cached_and_concurrent_callers_share_one_login():
+    calls = []
+
+    def handler(request):
+        calls.append(request.content)
+        time.sleep(0.05)
+        return httpx.Response(
+            200,
+            json={
+                "access_token": "t1",
+                "expires_in": 300,
+                "refresh_token": "r1",
+                "refresh_expires_in": 1800,
+            },
+        )
+
+    broker = _broker(handler)
+    tokens = []
+    threads = [
+        threading.Thread(target=lambda: tokens.append(broker.get_token()))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert tokens == ["t1"] * 8
+    assert len(calls) == 1
+    assert b"grant_type=password" in calls[0]
+
+
+def test_refreshes_in_background_before_expiry():
+    grants = []
+    refreshed = threading.Event()
+
+    def handler(request):
+        body = request.content.decode()
+        grants.append(body)
+        if "grant_type=refresh_token" in body:
+            refreshed.set()
+            return httpx.Response(200, json={"access_token": "t2", "expires_in": 300})
+        return httpx.Response(
+            200,
+            json={
+                "access_token": "t1",
+                "expires_in": 30,
+                "refresh_token": "r1",
+                "refresh_expires_in": 1800,
+            },
+        )
+
+    broker = _broker(handler, refresh_margin=60)
+    assert broker.get_token() == "t1"
+    # Reach the refresh window (at most half of the 30s lifetime).
+    assert broker._refresh_at <= broker._expires_at - 15
+    broker._refresh_at = time.time()
+    # Inside the margin the current token is served while a refresh runs.
+    assert broker.get_token() == "t1"
+    assert refreshed.wait(2)
+    for _ in range(100):
+        if broker._access_token == "t2":
+            break
+        time.sleep(0.01)
+    assert broker.get_token() == "t2"
+
+
+def test_short_lived_token_is_not_refreshed_on_every_call():
+    grants = []
+
+    def handler(request):
+        grants.append(request.content.decode())
+        return httpx.Response(200, json={"access_token": "t1", "expires_in": 30})
+
+    broker = _broker(handler, refresh_margin=60)
+    for _ in range(5):
+        assert broker.get_token() == "t1"
+    assert len(grants) == 1
+    assert not broker._refreshing
+
+
+def test_failed_background_refresh_backs_off():
+    grants = []
+    failed = threading.Event()
+
+    def handler(request):
+        grants.append(request.content.decode())
+        if len(grants) == 1:
+            return httpx.Response(200, json={"access_token": "t1", "expires_in": 300})
+        failed.set()
+        return httpx.Response(503)
+
+    broker = _broker(handler, retry_interval=30)
+    assert broker.get_token() == "t1"
+    broker._refresh_at = time.time()
+    assert broker.get_token() == "t1"
+    assert failed.wait(2)
+    for _ in range(100):
+        if not broker._refreshing:
+            break
+        time.sleep(0.01)
+
+    # Callers within retry_interval keep the current token without new logins.
+    for _ in range(5):
+        assert broker.get_token() == "t1"
+    assert len(grants) == 2
+    assert broker._refresh_at > time.time() + 25
+
+
+def test_failed_login_is_not_retried_by_every_caller():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(401, json={"error": "invalid_grant"})
+
+    broker = _broker(handler)
+    with pytest.raises(V6AuthError):
+        broker.get_token()
+    with pytest.raises(V6AuthError):
+        broker.get_token()
+    assert len(calls) == 1
+
+
+def test_get_v6_token_uses_module_broker(monkeypatch):
+    monkeypatch.setattr(v6_module.v6_token_broker, "username", "")
+    monkeypatch.setattr(v6_module.v6_token_broker, "static_token", "static")
+    assert v6_module.get_v6_token() == "static"
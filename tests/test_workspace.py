@@ -33,3 +33,20 @@ def test_get_workspace_404(client: TestClient, monkeypatch):
     monkeypatch.setattr(ws_ep.workspace_service, "get", fake_get)
     r = client.get("/raven-api/v1/workspaces/999")
     assert r.status_code == 404
+
+
+def test_get_workspaces_encodes_rows_and_omits_none(client: TestClient, monkeypatch):
+    import datetime
+
+    class FakeWS:
+        id = 2
+        name = "W"
+        description = None
+        creation_date = datetime.datetime(2024, 1, 1, 12, 30)
+
+    monkeypatch.setattr(
+        ws_ep.workspace_service, "get_multi", lambda db=None, skip=0, limit=100: [FakeWS()]
+    )
+    r = client.get("/raven-api/v1/workspaces/")
+    assert r.status_code == 200
+    assert r.json() == [{"id": 2, "name": "W", "creation_date": "2024-01-01T12:30:00"}]
@@ -0,0 +1,67 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.models import Base
+from app.models.workspace_history import WorkspaceHistory
+from app.services import workspace_history
+from app.services.workspace_history import record_history
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(
+        engine, tables=[Base.metadata.tables["workspace_histories"]]
+    )
+    inserts = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO workspace_histories"):
+            inserts.append(statement)
+
+    return Session(engine), inserts
+
+
+def _record(db, action, phase="Data Permit"):
+    record_history(
+        db,
+        workspace_id=1,
+        action=action,
+        phase=phase,
+        description=action,
+        creator_id=None,
+    )
+
+
+def test_events_are_written_in_one_insert_on_commit():
+    db, inserts = _session()
+    for action in ("a", "b", "c"):
+        _record(db, action)
+    assert db.query(WorkspaceHistory).count() == 0
+
+    db.commit()
+    assert len(inserts) == 1
+    assert sorted(h.action for h in db.query(WorkspaceHistory)) == ["a", "b", "c"]
+
+
+def test_events_are_discarded_on_rollback():
+    db, inserts = _session()
+    _record(db, "a")
+    db.rollback()
+    db.commit()
+    assert inserts == []
+
+
+def test_async_phases_go_to_the_writer(monkeypatch):
+    db, inserts = _session()
+    submitted = []
+    monkeypatch.setattr(settings, "WORKSPACE_HISTORY_ASYNC_PHASES", ["Data Analysis"])
+    monkeypatch.setattr(workspace_history.history_writer, "submit", submitted.extend)
+
+    _record(db, "durable")
+    _record(db, "deferred", phase="Data Analysis")
+    db.commit()
+
+    assert [h.action for h in db.query(WorkspaceHistory)] == ["durable"]
+    assert [e["action"] for e in submitted] == ["deferred"]
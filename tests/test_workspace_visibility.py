@@ -0,0 +1,49 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models import Base, UserTeam
+from app.services import workspace_visibility
+from app.services.workspace_visibility import team_membership
+
+
+def _session(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables["user_teams"]])
+    synced = []
+    # The rebuild itself is Postgres SQL; record which users it would cover.
+    monkeypatch.setattr(
+        workspace_visibility,
+        "sync_visibility",
+        lambda connection, user_ids=(), workspace_ids=(): synced.append(set(user_ids)),
+    )
+    team_membership.clear()
+    return Session(engine), synced
+
+
+def test_membership_cache_invalidated_on_user_teams_commit(monkeypatch):
+    db, synced = _session(monkeypatch)
+
+    assert team_membership.get(db, 1) == ()
+    db.add(UserTeam(user_id=1, team_id=7))
+    db.commit()
+
+    assert team_membership.get(db, 1) == ("7",)
+    # Maintained even while listings do not read the table.
+    assert synced == [{1}]
+
+
+def test_bulk_membership_changes_sync_visibility(monkeypatch):
+    db, synced = _session(monkeypatch)
+    db.add_all([UserTeam(user_id=1, team_id=7), UserTeam(user_id=2, team_id=8)])
+    db.commit()
+    synced.clear()
+    assert team_membership.get(db, 1) == ("7",)
+
+    db.query(UserTeam).filter(UserTeam.user_id == 1).delete()
+    db.commit()
+    assert synced == [{1}]
+    assert team_membership.get(db, 1) == ()
+
+    db.query(UserTeam).filter(UserTeam.user_id == 2).update({"user_id": 3})
+    db.commit()
+    assert synced[-1] == {2, 3}